@@ -1,156 +1,159 @@
 import json
+import os
 from datetime import datetime
 
 import pandas as pd
 
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import emit_output_summary, serialize_json, write_serialized_json
+from utils.year_windows import check_year_window_in_data, get_program_years
+
+
+def round_amounts(amounts):
+    # Every amount is rounded with Python's round, as the amounts were before they were merged as columns, Series.round
+    # uses np.round, which differs on halfway values
+    return pd.Series([round(amount, 2) for amount in amounts.tolist()], index=amounts.index, dtype="float64")
+
 
 class AllProgramsParser:
-    def __init__(self, start_year, end_year, topline_csv_filepath, all_programs_json_filepath, summary_json_filepath):
+    def __init__(self, start_year, end_year, topline_csv_filepath, all_programs_json_filepath, summary_json_filepath,
+                 output_folder=None):
         self.start_year = start_year
         self.end_year = end_year
         self.topline_csv_filepath = topline_csv_filepath
         self.all_programs_json_filepath = all_programs_json_filepath
         self.summary_json_filepath = summary_json_filepath
+        # Output files are written next to the summary file unless another folder is given
+        self.output_folder = os.path.dirname(summary_json_filepath) if output_folder is None else output_folder
 
         self.all_programs_data = None
         self.all_programs_dict = None
         self.summary_data = None
 
+        # Topline columns that update the all programs data (by program name) and the summary data (by title)
+        self.program_topline_columns_map = {
+            "Title I": "titlei"
+        }
+        self.title_topline_columns_map = {
+            "Title I: Commodities": "titlei"
+        }
+
     def parse_and_process(self):
         # Import JSON files into a Pandas DataFrame
-        self.all_programs_data = pd.read_json(self.all_programs_json_filepath)
-        self.summary_data = pd.read_json(self.summary_json_filepath)
-        self.summary_data["Average Monthly Participation"] = self.summary_data["Average Monthly Participation"].astype(
-            "Int64")
+        with measure_stage("all-programs", "load"):
+            self.all_programs_data = pd.read_json(self.all_programs_json_filepath)
+            self.summary_data = pd.read_json(self.summary_json_filepath)
+            self.summary_data["Average Monthly Participation"] = \
+                self.summary_data["Average Monthly Participation"].astype("Int64")
 
-        topline_data = pd.read_csv(self.topline_csv_filepath)
+            topline_data = pd.read_csv(self.topline_csv_filepath)
 
-        # Additional check to filter data for only required years
-        topline_data = topline_data[topline_data["year"].between(self.start_year, self.end_year, inclusive="both")]
-
-        title_i_grand_total = topline_data["titlei"].sum()
-        title_ii_grand_total = topline_data["title_ii"].sum()
-        crop_insurance_grand_total = topline_data["ci_net_benefit"].sum()
-        snap_grand_total = topline_data["snap_cost"].sum()
-
-        for index, row in self.all_programs_data.iterrows():
-            crop_insurance_total_amount = 0.0
-            snap_total_amount = 0.0
-            title_i_total_amount = 0.0
-            title_ii_total_amount = 0.0
-            for year in range(self.start_year, self.end_year + 1):
-
-                if row["State"] == "Total":
-                    topline_data_year = topline_data[(topline_data["year"] == year)]
-                    title_i_total_for_year = topline_data_year["titlei"].sum()
-                    title_ii_total_for_year = topline_data_year["title_ii"].sum()
-                    crop_insurance_total_for_year = topline_data_year["ci_net_benefit"].sum()
-                    snap_total_for_year = topline_data_year["snap_cost"].sum()
-
-                    self.all_programs_data.at[index, "Title I " + str(year)] = round(
-                        title_i_total_for_year, 2)
-                    # TODO: Uncomment below code for different programs as accurate raw data becomes available.
-                    # self.all_programs_data.at[index, "Title II " + str(year)] = round(
-                    #     title_ii_total_for_year, 2)
-                    # self.all_programs_data.at[index, "Crop Insurance " + str(year)] = round(
-                    #     crop_insurance_total_for_year, 2)
-                    # self.all_programs_data.at[index, "SNAP " + str(year)] = round(
-                    #     snap_total_for_year, 2)
-                else:
-                    topline_data_state_year = topline_data[(topline_data["abbreviation"] == row["State"]) &
-                                                           (topline_data["year"] == year)]
-                    if topline_data_state_year.size != 0:
-                        title_i_amount = topline_data_state_year["titlei"].item()
-                        title_i_total_amount += title_i_amount
-                        self.all_programs_data.at[index, "Title I " + str(year)] = round(title_i_amount, 2)
-
-                        # TODO: Uncomment below code for different programs as accurate raw data becomes available.
-                        # title_ii_amount = topline_data_state_year["title_ii"].item()
-                        # title_ii_total_amount += title_ii_amount
-                        # self.all_programs_data.at[index, "Title II " + str(year)] = round(title_ii_amount, 2)
-                        #
-                        # crop_insurance_amount = topline_data_state_year["ci_net_benefit"].item()
-                        # crop_insurance_total_amount += crop_insurance_amount
-                        # self.all_programs_data.at[index, "Crop Insurance " + str(year)] = round(crop_insurance_amount,
-                        #                                                                         2)
-                        #
-                        # snap_amount = topline_data_state_year["snap_cost"].item()
-                        # snap_total_amount += snap_amount
-                        # self.all_programs_data.at[index, "SNAP " + str(year)] = round(snap_amount, 2)
-
-            if row["State"] == "Total":
-                self.all_programs_data.at[index, "Title I Total"] = round(title_i_grand_total, 2)
-                # TODO: Uncomment below code for different programs as accurate raw data becomes available.
-                # self.all_programs_data.at[index, "Title II Total"] = round(title_ii_grand_total, 2)
-                # self.all_programs_data.at[index, "Crop Insurance Total"] = round(crop_insurance_grand_total, 2)
-                # self.all_programs_data.at[index, "SNAP Total"] = round(snap_grand_total, 2)
-            else:
-                self.all_programs_data.at[index, "Title I Total"] = round(title_i_total_amount, 2)
-                # TODO: Uncomment below code for different programs as accurate raw data becomes available.
-                # self.all_programs_data.at[index, "Title II Total"] = round(title_ii_total_amount, 2)
-                # self.all_programs_data.at[index, "Crop Insurance Total"] = round(crop_insurance_total_amount, 2)
-                # self.all_programs_data.at[index, "SNAP Total"] = round(snap_total_amount, 2)
-
-        # Programs list
+        # Every year needs a column for every program in the all programs file
         programs_list = ["Crop Insurance", "SNAP", "Title I", "Title II"]
+        check_year_window_in_data(self.start_year, self.end_year,
+                                  get_program_years(self.all_programs_data.columns, programs_list),
+                                  "the all programs file")
 
-        start_year_obj = datetime(self.start_year, 1, 1)
-        end_year_obj = datetime(self.end_year, 1, 1)
-
-        self.all_programs_dict = json.loads(
-            self.all_programs_data.to_json(indent=2, orient="records", double_precision=2))
-        # Update totals
-        for item in self.all_programs_dict:
-            year_range_all_programs_total = 0
-            for year in range(self.start_year, self.end_year + 1):
-                year_all_programs_total = 0
-                for program in programs_list:
-                    if item[program + " " + str(year)]:
-                        year_all_programs_total += item[program + " " + str(year)]
-                item[str(year) + " All Programs Total"] = round(year_all_programs_total, 2)
-                year_range_all_programs_total += year_all_programs_total
-
-            key = start_year_obj.strftime("%y") + "-" + end_year_obj.strftime("%y") + " All Programs Total"
-            item[key] = round(year_range_all_programs_total, 2)
-
-        for index, row in self.summary_data.iterrows():
-            for year in range(self.start_year, self.end_year + 1):
-                if row["Title"] == "Title I: Commodities" and row["Fiscal Year"] == year:
-                    topline_data_state_year = topline_data[(topline_data["abbreviation"] == row["State"]) &
-                                                           (topline_data["year"] == year)]
-                    if topline_data_state_year.size != 0:
-                        title_i_amount = topline_data_state_year["titlei"].item()
-                        self.summary_data.at[index, "Amount"] = round(title_i_amount, 2)
-                # TODO: Uncomment below code for different programs as accurate raw data becomes available.
-                # elif row["Title"] == "Title II: Commodities" and row["Fiscal Year"] == year:
-                #     topline_data_state_year = topline_data[(topline_data["abbreviation"] == row["State"]) &
-                #                                            (topline_data["year"] == year)]
-                #     if topline_data_state_year.size != 0:
-                #         title_ii_amount = topline_data_state_year["snap_cost"].item()
-                #         self.summary_data.at[index, "Amount"] = round(title_ii_amount, 2)
-                # elif row["Title"] == "Crop Insurance" and row["Fiscal Year"] == year:
-                #     topline_data_state_year = topline_data[(topline_data["abbreviation"] == row["State"]) &
-                #                                            (topline_data["year"] == year)]
-                #     if topline_data_state_year.size != 0:
-                #         crop_insurance_amount = topline_data_state_year["ci_net_benefit"].item()
-                #         self.summary_data.at[index, "Amount"] = round(crop_insurance_amount, 2)
-                # elif row["Title"] == "Supplemental Nutrition Assistance Program (SNAP)" and row["Fiscal Year"] == year:
-                #     topline_data_state_year = topline_data[(topline_data["abbreviation"] == row["State"]) &
-                #                                            (topline_data["year"] == year)]
-                #     if topline_data_state_year.size != 0:
-                #         snap_amount = topline_data_state_year["snap_cost"].item()
-                #         self.summary_data.at[index, "Amount"] = round(snap_amount, 2)
+        # Additional check to filter data for only required years
+        with measure_stage("all-programs", "filter"):
+            topline_data = topline_data[topline_data["year"].between(self.start_year, self.end_year, inclusive="both")]
+
+        with measure_stage("all-programs", "aggregate"):
+            # Index topline by state and year once, both files are then updated from it with keyed joins instead of
+            # filtering topline again for every state and year
+            topline_columns = list(dict.fromkeys(list(self.program_topline_columns_map.values()) +
+                                                 list(self.title_topline_columns_map.values())))
+            topline_by_state_and_year = topline_data.groupby(["abbreviation", "year"])[topline_columns].sum()
+
+            for program_name, topline_column_name in self.program_topline_columns_map.items():
+                self.__merge_topline_into_all_programs(topline_data, topline_by_state_and_year, program_name,
+                                                       topline_column_name)
+            for title, topline_column_name in self.title_topline_columns_map.items():
+                self.__merge_topline_into_summary(topline_by_state_and_year, title, topline_column_name)
+
+        with measure_stage("all-programs", "build JSON"):
+            start_year_obj = datetime(self.start_year, 1, 1)
+            end_year_obj = datetime(self.end_year, 1, 1)
+
+            self.all_programs_dict = json.loads(
+                self.all_programs_data.to_json(indent=2, orient="records", double_precision=2))
+            # Update totals
+            for item in self.all_programs_dict:
+                year_range_all_programs_total = 0
+                for year in range(self.start_year, self.end_year + 1):
+                    year_all_programs_total = 0
+                    for program in programs_list:
+                        if item[program + " " + str(year)]:
+                            year_all_programs_total += item[program + " " + str(year)]
+                    item[str(year) + " All Programs Total"] = round(year_all_programs_total, 2)
+                    year_range_all_programs_total += year_all_programs_total
+
+                key = start_year_obj.strftime("%y") + "-" + end_year_obj.strftime("%y") + " All Programs Total"
+                item[key] = round(year_range_all_programs_total, 2)
+
+    def __merge_topline_into_all_programs(self, topline_data, topline_by_state_and_year, program_name,
+                                          topline_column_name):
+        # Pivot to one row per state and one column per year, in the row order of the all programs data. States and
+        # years without topline data are NaN and keep their current values.
+        years = list(range(self.start_year, self.end_year + 1))
+        amounts_by_state = topline_by_state_and_year[topline_column_name].unstack("year").reindex(
+            index=self.all_programs_data["State"], columns=years)
+        amounts_by_state.index = self.all_programs_data.index
+        is_total_row = self.all_programs_data["State"] == "Total"
+
+        # The total row gets the sum of every topline row, each year is summed on its own like a filtered column sum
+        # so that the rounded values do not change
+        total_by_year = topline_data.groupby("year")[topline_column_name].agg(lambda values: values.sum())
+
+        # Years are added one after another, in the same order as the yearly values
+        state_total_amounts = pd.Series(0.0, index=self.all_programs_data.index)
+        for year in years:
+            column_name = program_name + " " + str(year)
+            state_total_amounts += amounts_by_state[year].fillna(0.0)
+            amounts = round_amounts(amounts_by_state[year]).where(amounts_by_state[year].notna(),
+                                                                  self.all_programs_data[column_name])
+            amounts[is_total_row] = round(total_by_year.get(year, 0.0), 2)
+            self.all_programs_data[column_name] = amounts
+
+        total_amounts = round_amounts(state_total_amounts)
+        total_amounts[is_total_row] = round(topline_data[topline_column_name].sum(), 2)
+        self.all_programs_data[program_name + " Total"] = total_amounts
+
+    def __merge_topline_into_summary(self, topline_by_state_and_year, title, topline_column_name):
+        amounts = self.summary_data[["State", "Fiscal Year"]].merge(
+            topline_by_state_and_year[[topline_column_name]], how="left", left_on=["State", "Fiscal Year"],
+            right_index=True)[topline_column_name]
+        amounts.index = self.summary_data.index
+
+        # Rows without topline data for their state and year keep their current amount
+        is_updated_row = (self.summary_data["Title"] == title) & amounts.notna()
+        self.summary_data.loc[is_updated_row, "Amount"] = round_amounts(amounts[is_updated_row])
 
     def write_updated_json_files(self):
-        with open(self.summary_json_filepath + ".updated.json", "w") as summary_file_new:
-            summary_file_new.write(
-                json.dumps([row.dropna().to_dict() for index, row in self.summary_data.iterrows()], indent=2))
-
-        with open(self.all_programs_json_filepath + ".updated.json", "w") as all_programs_file_new:
-            all_programs_file_new.write(json.dumps(self.all_programs_dict, indent=2))
+        with measure_stage("all-programs", "serialize"):
+            # Missing values, e.g. the participation of the titles without one, are left out of their record
+            summary_records = [{column_name: value for column_name, value in record.items() if not pd.isna(value)}
+                               for record in self.summary_data.to_dict("records")]
+            summary_json = serialize_json(summary_records, indent=2)
+        with measure_stage("all-programs", "write"):
+            write_serialized_json(os.path.join(self.output_folder,
+                                               os.path.basename(self.summary_json_filepath) + ".updated.json"),
+                                  summary_json, summary_records)
+
+        with measure_stage("all-programs", "serialize"):
+            all_programs_json = serialize_json(self.all_programs_dict, indent=2)
+        with measure_stage("all-programs", "write"):
+            write_serialized_json(os.path.join(self.output_folder,
+                                               os.path.basename(self.all_programs_json_filepath) + ".updated.json"),
+                                  all_programs_json, self.all_programs_dict)
 
 
 if __name__ == '__main__':
-    all_programs_parser = AllProgramsParser(2018, 2022, "topline.csv", "allprograms.json", "summary.json")
+    data_folder = "all-programs-summary"
+    all_programs_parser = AllProgramsParser(2018, 2022, os.path.join(data_folder, "topline.csv"),
+                                            os.path.join(data_folder, "allprograms.json"),
+                                            os.path.join(data_folder, "summary.json"))
     all_programs_parser.parse_and_process()
     all_programs_parser.write_updated_json_files()
+    emit_report()
+    emit_output_summary()
@@ -0,0 +1,371 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic_data
+from main import PARSER_JOBS, REPOSITORY_FOLDER, create_parser
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_HISTORY_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_history.json")
+
+# Inputs with one record per state, year and program are scaled by repeating records, inputs with one row or column
+# per state and year are scaled by extending the year range, since the parsers expect exactly one value per state
+# and year there
+BENCHMARKS = {
+    "commodities": {
+        "scaling": "years",
+        "start_year": 2014,
+        "template_years": 8,
+        "outputs": [os.path.join("title-1-commodities", filename)
+                    for filename in PARSER_JOBS["commodities"]["output_filenames"]]
+    },
+    "crop-insurance": {
+        "scaling": "records",
+        "outputs": [os.path.join("crop-insurance", filename)
+                    for filename in PARSER_JOBS["crop-insurance"]["output_filenames"]]
+    },
+    "crp": {
+        "scaling": "records",
+        "outputs": [os.path.join("title-2-conservation", "crp", filename)
+                    for filename in PARSER_JOBS["crp"]["output_filenames"]]
+    },
+    "acep": {
+        "scaling": "records",
+        "outputs": [os.path.join("title-2-conservation", "acep", filename)
+                    for filename in PARSER_JOBS["acep"]["output_filenames"]]
+    },
+    "rcpp": {
+        "scaling": "records",
+        "outputs": [os.path.join("title-2-conservation", "rcpp", filename)
+                    for filename in PARSER_JOBS["rcpp"]["output_filenames"]]
+    },
+    "dairy-disaster": {
+        "scaling": "records",
+        "outputs": [os.path.join("title-1-commodities", filename)
+                    for filename in PARSER_JOBS["dairy-disaster"]["output_filenames"]]
+    },
+    "csp": {
+        "scaling": "records",
+        "outputs": [os.path.join("title-2-conservation", "csp", filename)
+                    for filename in PARSER_JOBS["csp"]["output_filenames"]]
+    },
+    "eqip": {
+        "scaling": "records",
+        "copied_files": [os.path.join("title-2-conservation", "eqip", "summary.json"),
+                         os.path.join("title-2-conservation", "eqip", "allPrograms.json")],
+        "outputs": [os.path.join("title-2-conservation", "eqip", filename)
+                    for filename in PARSER_JOBS["eqip"]["output_filenames"]]
+    },
+    "snap": {
+        "scaling": "years",
+        "start_year": 2018,
+        "template_years": 5,
+        "outputs": [os.path.join("snap", filename) for filename in PARSER_JOBS["snap"]["output_filenames"]]
+    },
+    "all-programs": {
+        "scaling": "years",
+        "start_year": 2018,
+        "template_years": 5,
+        "outputs": [os.path.join("all-programs-summary", filename)
+                    for filename in PARSER_JOBS["all-programs"]["output_filenames"]]
+    }
+}
+
+
+# Start-up benchmarks run main.py with these arguments, the dry run checks the manifests of the repository's own data
+# folders
+STARTUP_COMMANDS = {
+    "list": ["--list"],
+    "dry-run": ["--dry-run"]
+}
+
+
+def get_years(benchmark_name, scale):
+    benchmark = BENCHMARKS[benchmark_name]
+    return range(benchmark["start_year"], benchmark["start_year"] + benchmark["template_years"] * scale)
+
+
+def prepare_inputs(benchmark_name, scale, workspace_folder, rng):
+    # Writes the synthetic inputs of one benchmark into the workspace and returns the number of input rows
+    benchmark = BENCHMARKS[benchmark_name]
+    for output_filepath in benchmark["outputs"]:
+        os.makedirs(os.path.join(workspace_folder, os.path.dirname(output_filepath)), exist_ok=True)
+    for copied_filepath in benchmark.get("copied_files", []):
+        shutil.copy(os.path.join(REPOSITORY_FOLDER, copied_filepath), os.path.join(workspace_folder, copied_filepath))
+
+    if benchmark["scaling"] == "records":
+        job = PARSER_JOBS[benchmark_name]
+        csv_filepath = os.path.join(job["data_folder"], job["program_csv_filename"])
+        return synthetic_data.write_scaled_records(os.path.join(REPOSITORY_FOLDER, csv_filepath),
+                                                   os.path.join(workspace_folder, csv_filepath), scale, rng)
+
+    years = get_years(benchmark_name, scale)
+    if benchmark_name == "commodities":
+        row_count = 0
+        for csv_filename in PARSER_JOBS["commodities"]["parser_kwargs"].values():
+            csv_filepath = os.path.join("title-1-commodities", csv_filename)
+            row_count += synthetic_data.write_scaled_year_columns(os.path.join(REPOSITORY_FOLDER, csv_filepath),
+                                                                  os.path.join(workspace_folder, csv_filepath),
+                                                                  "State Name", years, rng)
+        return row_count
+
+    if benchmark_name == "snap":
+        row_count = 0
+        for csv_filename in ["snap_costs.csv", "snap_monthly_participation.csv"]:
+            csv_filepath = os.path.join("snap", csv_filename)
+            row_count += synthetic_data.write_scaled_year_columns(os.path.join(REPOSITORY_FOLDER, csv_filepath),
+                                                                  os.path.join(workspace_folder, csv_filepath),
+                                                                  "State", years, rng)
+        snap_costs_data = pd.read_csv(os.path.join(REPOSITORY_FOLDER, "snap", "snap_costs.csv"))
+        state_abbreviations = [state for state in snap_costs_data["State"] if not state.startswith("Total")]
+        row_count += synthetic_data.write_summary_json(os.path.join(workspace_folder, "snap", "summary.json"),
+                                                       state_abbreviations, years, rng)
+        row_count += synthetic_data.write_all_programs_json(
+            os.path.join(workspace_folder, "snap", "allPrograms.json"), state_abbreviations, years, rng)
+        return row_count
+
+    topline_filepath = os.path.join("all-programs-summary", "topline.csv")
+    row_count = synthetic_data.write_scaled_year_rows(os.path.join(REPOSITORY_FOLDER, topline_filepath),
+                                                      os.path.join(workspace_folder, topline_filepath), "year", years,
+                                                      rng)
+    topline_data = pd.read_csv(os.path.join(REPOSITORY_FOLDER, topline_filepath))
+    state_abbreviations = sorted(topline_data["abbreviation"].dropna().unique().tolist())
+    row_count += synthetic_data.write_summary_json(
+        os.path.join(workspace_folder, "all-programs-summary", "summary.json"), state_abbreviations, years, rng)
+    row_count += synthetic_data.write_all_programs_json(
+        os.path.join(workspace_folder, "all-programs-summary", "allprograms.json"), state_abbreviations, years, rng)
+    return row_count
+
+
+def run_benchmark(benchmark_name, scale, workspace_folder):
+    # Runs one parser the same way as its main.py job does, in the current process
+    job = dict(PARSER_JOBS[benchmark_name])
+    job["data_folder"] = os.path.join(workspace_folder, job["data_folder"])
+    if BENCHMARKS[benchmark_name]["scaling"] == "years":
+        job["end_year"] = get_years(benchmark_name, scale)[-1]
+    parser = create_parser(job)
+    for parse_method in job["parse_methods"]:
+        getattr(parser, parse_method)()
+
+
+def get_peak_rss_in_bytes():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def measure_benchmark(benchmark_name, scale, workspace_folder, timeout):
+    # Each benchmark runs in a fresh process so that its peak RSS is not inflated by earlier runs
+    command = [sys.executable, "-m", "benchmarks.run_benchmarks", "--run-benchmark", benchmark_name, "--scales",
+               str(scale), "--workspace", workspace_folder]
+    try:
+        completed_process = subprocess.run(command, cwd=REPOSITORY_FOLDER, capture_output=True, text=True,
+                                           timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "TIMEOUT", "wallTimeSeconds": None, "peakRssBytes": None, "outputBytes": None}
+
+    if completed_process.returncode != 0:
+        print(completed_process.stderr, file=sys.stderr)
+        return {"status": "FAILED", "wallTimeSeconds": None, "peakRssBytes": None, "outputBytes": None}
+
+    result = json.loads(completed_process.stdout.strip().splitlines()[-1])
+    result["status"] = "OK"
+    result["outputBytes"] = sum(os.path.getsize(os.path.join(workspace_folder, output_filepath))
+                                for output_filepath in BENCHMARKS[benchmark_name]["outputs"])
+    return result
+
+
+def measure_startup(startup_command_name, timeout):
+    # main.py runs in a fresh interpreter with -X importtime, which prints the time spent importing every module to
+    # stderr as "import time: SELF_US | CUMULATIVE_US | MODULE"
+    command = [sys.executable, "-X", "importtime", os.path.join(REPOSITORY_FOLDER, "main.py")] + \
+        STARTUP_COMMANDS[startup_command_name]
+    start_time = time.perf_counter()
+    try:
+        completed_process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"command": startup_command_name, "status": "TIMEOUT", "wallTimeSeconds": None,
+                "importTimeSeconds": None, "importedModules": None, "importsPandas": None}
+    wall_time = time.perf_counter() - start_time
+
+    if completed_process.returncode != 0:
+        print(completed_process.stderr, file=sys.stderr)
+        return {"command": startup_command_name, "status": "FAILED", "wallTimeSeconds": None,
+                "importTimeSeconds": None, "importedModules": None, "importsPandas": None}
+
+    import_times = dict()
+    for line in completed_process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and not line.endswith("imported package"):
+            self_time, cumulative_time, module_name = line[len("import time:"):].split("|")
+            import_times[module_name.strip()] = int(self_time)
+    return {"command": startup_command_name, "status": "OK", "wallTimeSeconds": wall_time,
+            "importTimeSeconds": sum(import_times.values()) / 1000000, "importedModules": len(import_times),
+            "importsPandas": "pandas" in import_times}
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY_FOLDER, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_filepath):
+    if not os.path.exists(history_filepath):
+        return []
+    with open(history_filepath) as history_file:
+        return json.load(history_file)
+
+
+def find_previous_result(history, benchmark_name, scale):
+    for history_entry in reversed(history):
+        for result in history_entry.get("results", []):
+            if result["benchmark"] == benchmark_name and result["scale"] == scale and result["status"] == "OK":
+                return result
+    return None
+
+
+def find_previous_startup_result(history, startup_command_name):
+    for history_entry in reversed(history):
+        for result in history_entry.get("startupResults", []):
+            if result["command"] == startup_command_name and result["status"] == "OK":
+                return result
+    return None
+
+
+def format_change(value, previous_value):
+    if value is None or not previous_value:
+        return "-"
+    return "{:+.1f}%".format((value - previous_value) / previous_value * 100)
+
+
+def print_results_header():
+    print("{:<16} {:>6} {:>10} {:<8} {:>10} {:>8} {:>10} {:>8} {:>12}".format(
+        "Benchmark", "Scale", "Rows", "Status", "Seconds", "Change", "Peak MB", "Change", "Output KB"))
+
+
+def print_result(result, history):
+    # Changes are relative to the last successful run of the same benchmark and scale in the history file
+    previous_result = find_previous_result(history, result["benchmark"], result["scale"]) or dict()
+    print("{:<16} {:>6} {:>10} {:<8} {:>10} {:>8} {:>10} {:>8} {:>12}".format(
+        result["benchmark"], str(result["scale"]) + "x", result["inputRows"], result["status"],
+        "-" if result["wallTimeSeconds"] is None else "{:.2f}".format(result["wallTimeSeconds"]),
+        format_change(result["wallTimeSeconds"], previous_result.get("wallTimeSeconds")),
+        "-" if result["peakRssBytes"] is None else "{:.1f}".format(result["peakRssBytes"] / 1024 / 1024),
+        format_change(result["peakRssBytes"], previous_result.get("peakRssBytes")),
+        "-" if result["outputBytes"] is None else "{:.1f}".format(result["outputBytes"] / 1024)), flush=True)
+
+
+def print_startup_results_header():
+    print("{:<16} {:<8} {:>10} {:>8} {:>10} {:>8} {:>8} {:>8}".format(
+        "Start-up", "Status", "Seconds", "Change", "Import s", "Change", "Modules", "pandas"))
+
+
+def print_startup_result(result, history):
+    previous_result = find_previous_startup_result(history, result["command"]) or dict()
+    print("{:<16} {:<8} {:>10} {:>8} {:>10} {:>8} {:>8} {:>8}".format(
+        result["command"], result["status"],
+        "-" if result["wallTimeSeconds"] is None else "{:.3f}".format(result["wallTimeSeconds"]),
+        format_change(result["wallTimeSeconds"], previous_result.get("wallTimeSeconds")),
+        "-" if result["importTimeSeconds"] is None else "{:.3f}".format(result["importTimeSeconds"]),
+        format_change(result["importTimeSeconds"], previous_result.get("importTimeSeconds")),
+        "-" if result["importedModules"] is None else result["importedModules"],
+        "-" if result["importsPandas"] is None else ("yes" if result["importsPandas"] else "no")), flush=True)
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description="Benchmark the parsers against synthetic scaled-up inputs.")
+    argument_parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                                 help="benchmarks to run (default: all)")
+    argument_parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES,
+                                 help="multiples of the real input size to generate (default: 1 10 100 1000)")
+    argument_parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data generator")
+    argument_parser.add_argument("--timeout", type=float, default=None,
+                                 help="seconds after which a single benchmark run is stopped")
+    argument_parser.add_argument("--history-file", default=DEFAULT_HISTORY_FILEPATH,
+                                 help="JSON file the results are appended to")
+    argument_parser.add_argument("--keep-data", action="store_true",
+                                 help="keep the generated inputs and outputs and print where they are")
+    argument_parser.add_argument("--startup", action="store_true",
+                                 help="measure the start-up time of main.py --list and --dry-run with -X importtime "
+                                      "instead of the parsers")
+    argument_parser.add_argument("--run-benchmark", choices=list(BENCHMARKS), help=argparse.SUPPRESS)
+    argument_parser.add_argument("--workspace", help=argparse.SUPPRESS)
+    arguments = argument_parser.parse_args()
+
+    if any(scale < 1 for scale in arguments.scales):
+        argument_parser.error("--scales must be at least 1")
+
+    # Child process started by measure_benchmark, only the timing and memory of the parser itself are reported
+    if arguments.run_benchmark:
+        start_time = time.perf_counter()
+        run_benchmark(arguments.run_benchmark, arguments.scales[0], arguments.workspace)
+        print(json.dumps({"wallTimeSeconds": time.perf_counter() - start_time,
+                          "peakRssBytes": get_peak_rss_in_bytes()}))
+        sys.exit(0)
+
+    history = load_history(arguments.history_file)
+    if arguments.startup:
+        startup_results = []
+        print_startup_results_header()
+        for startup_command_name in STARTUP_COMMANDS:
+            startup_result = measure_startup(startup_command_name, arguments.timeout)
+            startup_results.append(startup_result)
+            print_startup_result(startup_result, history)
+
+        history.append({
+            "commit": get_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "startupResults": startup_results
+        })
+        with open(arguments.history_file, "w") as history_file:
+            history_file.write(json.dumps(history, indent=2))
+        sys.exit(0)
+
+    results = []
+    print_results_header()
+    for scale in arguments.scales:
+        workspace_folder = tempfile.mkdtemp(prefix="benchmark-" + str(scale) + "x-")
+        for benchmark_name in arguments.benchmarks:
+            rng = np.random.default_rng(arguments.seed)
+            input_rows = prepare_inputs(benchmark_name, scale, workspace_folder, rng)
+            result = {"benchmark": benchmark_name, "scale": scale, "inputRows": input_rows}
+            result.update(measure_benchmark(benchmark_name, scale, workspace_folder, arguments.timeout))
+            results.append(result)
+            print_result(result, history)
+
+        if arguments.keep_data:
+            print("Generated data for " + str(scale) + "x kept in " + workspace_folder)
+        else:
+            shutil.rmtree(workspace_folder)
+
+    history.append({
+        "commit": get_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "seed": arguments.seed,
+        "results": results
+    })
+    with open(arguments.history_file, "w") as history_file:
+        history_file.write(json.dumps(history, indent=2))
@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+SNAP_TITLE = "Supplemental Nutrition Assistance Program (SNAP)"
+SUMMARY_TITLES = ["Title I: Commodities", "Title II: Conservation", "Crop Insurance", SNAP_TITLE]
+ALL_PROGRAMS_NAMES = ["Crop Insurance", "SNAP", "Title I", "Title II"]
+
+
+def is_key_column(column_name):
+    # Years, codes and other identifiers are copied as they are, only the measured values are randomized
+    return "year" in column_name.lower() or "code" in column_name.lower()
+
+
+def perturb_values(data, rng):
+    data = data.copy()
+    for column_name in data.columns:
+        if is_key_column(column_name) or not pd.api.types.is_numeric_dtype(data[column_name]):
+            continue
+        factors = rng.uniform(0.5, 1.5, len(data))
+        if pd.api.types.is_integer_dtype(data[column_name]):
+            data[column_name] = np.round(data[column_name] * factors).astype(data[column_name].dtype)
+        else:
+            data[column_name] = np.round(data[column_name] * factors, 2)
+    return data
+
+
+def write_scaled_records(template_filepath, output_filepath, scale, rng):
+    # Every template row is repeated scale times with randomized values, as if the source reported scale records for
+    # each state, year and program. Copies are appended one at a time so that large scales do not need the whole
+    # dataset in memory.
+    template = pd.read_csv(template_filepath)
+    with open(output_filepath, "w", newline="") as output_file:
+        for copy_index in range(scale):
+            perturb_values(template, rng).to_csv(output_file, index=False, header=copy_index == 0)
+    return len(template) * scale
+
+
+def write_scaled_year_columns(template_filepath, output_filepath, id_column_name, years, rng):
+    # Inputs with one row per state and one column per year are scaled by the number of years, each new year copies a
+    # randomly chosen template year
+    template = pd.read_csv(template_filepath)
+    template_year_columns = [column_name for column_name in template.columns if column_name.isdigit()]
+    columns = {id_column_name: template[id_column_name]}
+    for year in years:
+        template_values = template[rng.choice(template_year_columns)]
+        columns[str(year)] = np.round(template_values * rng.uniform(0.5, 1.5, len(template)), 2)
+
+    # Any other summary columns (totals, averages) are kept so that the schema matches the template
+    for column_name in template.columns:
+        if column_name not in columns and column_name not in template_year_columns:
+            columns[column_name] = template[column_name]
+    pd.DataFrame(columns).to_csv(output_filepath, index=False)
+    return len(template) * len(years)
+
+
+def write_scaled_year_rows(template_filepath, output_filepath, year_column_name, years, rng):
+    # Inputs with one row per state and year are scaled by the number of years, cycling through the template years
+    template = pd.read_csv(template_filepath)
+    template_years = sorted(template[year_column_name].unique())
+    row_count = 0
+    with open(output_filepath, "w", newline="") as output_file:
+        for year_index, year in enumerate(years):
+            year_data = perturb_values(template[template[year_column_name] ==
+                                                template_years[year_index % len(template_years)]], rng)
+            year_data[year_column_name] = year
+            year_data.to_csv(output_file, index=False, header=year_index == 0)
+            row_count += len(year_data)
+    return row_count
+
+
+def write_summary_json(output_filepath, state_abbreviations, years, rng):
+    summary = []
+    for title in SUMMARY_TITLES:
+        for state_abbreviation in state_abbreviations:
+            for year in years:
+                entry = {
+                    "Title": title,
+                    "State": state_abbreviation,
+                    "Fiscal Year": year,
+                    "Amount": round(rng.uniform(0, 1e9), 2)
+                }
+                if title == SNAP_TITLE:
+                    entry["Average Monthly Participation"] = int(rng.integers(0, 5000000))
+                summary.append(entry)
+
+    with open(output_filepath, "w") as output_json_file:
+        output_json_file.write(json.dumps(summary, indent=2))
+    return len(summary)
+
+
+def write_all_programs_json(output_filepath, state_abbreviations, years, rng):
+    all_programs = []
+    for state_abbreviation in state_abbreviations + ["Total"]:
+        entry = {"State": state_abbreviation}
+        for program_name in ALL_PROGRAMS_NAMES:
+            program_total = 0
+            for year in years:
+                entry[program_name + " " + str(year)] = int(rng.integers(0, 1000000000))
+                program_total += entry[program_name + " " + str(year)]
+            entry[program_name + " Total"] = program_total
+        all_programs.append(entry)
+
+    with open(output_filepath, "w") as output_json_file:
+        output_json_file.write(json.dumps(all_programs, indent=2))
+    return len(all_programs)
@@ -1,47 +1,550 @@
+import argparse
+import glob
+import importlib
+import importlib.util
 import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Parser modules import pandas, so they are only imported by the jobs that run them, listing the programs or checking
+# the manifests does not import them
+from utils import instrumentation, json_writer, year_windows
+from utils.build_manifest import BuildManifest, compute_file_hash, compute_metadata_hash
+
+REPOSITORY_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# The folder name is not a valid package name
+sys.path.append(os.path.join(REPOSITORY_FOLDER, "all-programs-summary"))
+
+# Modules shared by the parsers, a change to any of them may change every output
+SHARED_SOURCE_PATTERNS = [os.path.join(REPOSITORY_FOLDER, "data_parser.py"),
+                          os.path.join(REPOSITORY_FOLDER, "utils", "*.py")]
+
+
+def get_parser_class(job):
+    module_name, class_name = job["parser_class"].rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_parser_source_filepath(job):
+    # Found without importing the module
+    return importlib.util.find_spec(job["parser_class"].rsplit(".", 1)[0]).origin
+
+
+def create_csp_parser(job):
+    parser_class = get_parser_class(job)
+    return parser_class(job["start_year"], job["end_year"],
+                        os.path.join(job["data_folder"], job["program_csv_filename"]),
+                        job.get("compact_json", False), job.get("sidecar_compressions", ()),
+                        job.get("year_windows"), output_folder=job.get("output_folder"))
+
+
+def create_eqip_parser(job):
+    parser_class = get_parser_class(job)
+    return parser_class(job["start_year"], job["end_year"],
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["summary_filename"]),
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["all_programs_filename"]),
+                        os.path.join(job["data_folder"], job["program_csv_filename"]),
+                        job.get("compact_json", False), job.get("sidecar_compressions", ()),
+                        job.get("year_windows"), output_folder=job.get("output_folder"))
+
+
+def create_snap_parser(job):
+    parser_class = get_parser_class(job)
+    return parser_class(job["start_year"], job["end_year"],
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["summary_filename"]),
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["all_programs_filename"]),
+                        os.path.join(job["data_folder"], job["program_csv_filename"]),
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["total_costs_filename"]),
+                        output_folder=job.get("output_folder"))
+
+
+def create_all_programs_parser(job):
+    parser_class = get_parser_class(job)
+    return parser_class(job["start_year"], job["end_year"],
+                        os.path.join(job["data_folder"], job["program_csv_filename"]),
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["all_programs_filename"]),
+                        os.path.join(job["data_folder"], job["parser_kwargs"]["summary_filename"]),
+                        output_folder=job.get("output_folder"))
+
+
+# Parsers read disjoint CSV files and write disjoint JSON files, so they can run independently
+PARSER_JOBS = {
+    "commodities": {
+        "parser_class": "data_parser.DataParser",
+        "program_main_category_name": "Title 1: Commodities",
+        "data_folder": "title-1-commodities",
+        "program_csv_filename": "title_1_version_1.csv",
+        "parser_kwargs": {
+            "base_acres_csv_filename_arc_co": "ARC-CO Base Acres by Program.csv",
+            "base_acres_csv_filename_plc": "PLC Base Acres by Program.csv",
+            "farm_payee_count_csv_filename_arc_co": "ARC-CO Recipients by Program.csv",
+            "farm_payee_count_csv_filename_arc_ic": "ARC-IC Recipients by Program.csv",
+            "farm_payee_count_csv_filename_plc": "PLC Recipients by Program.csv",
+            "total_payment_csv_filename_arc_co": "ARC-CO.csv",
+            "total_payment_csv_filename_arc_ic": "ARC-IC.csv",
+            "total_payment_csv_filename_plc": "PLC.csv"
+        },
+        "start_year": 2014,
+        "end_year": 2021,
+        "parse_methods": ["format_title_commodities_data", "parse_and_process"],
+        "output_filenames": ["commodities_map_data.json", "commodities_state_distribution_data.json",
+                             "commodities_subprograms_data.json"]
+    },
+    "crp": {
+        "parser_class": "data_parser.DataParser",
+        "program_main_category_name": "Title 2: Conservation: CRP",
+        "data_folder": os.path.join("title-2-conservation", "crp"),
+        "program_csv_filename": "CRP_total_compiled_August_24_2023.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process_crp"],
+        "output_filenames": ["crp_state_distribution_data.json", "crp_subprograms_data.json"]
+    },
+    "crop-insurance": {
+        "parser_class": "data_parser.DataParser",
+        "program_main_category_name": "Crop Insurance",
+        "data_folder": "crop-insurance",
+        "program_csv_filename": "ci_state_year_benefits 8-28-23.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        # Averages of liabilities and insured acres are not summed by year, so no other year windows are computed
+        "has_year_windows": False,
+        "parse_methods": ["parse_and_process_crop_insurance"],
+        "output_filenames": ["crop_insurance_state_distribution_data.json", "crop_insurance_subprograms_data.json"]
+    },
+    "acep": {
+        "parser_class": "parsers.acep_parser.AcepParser",
+        "program_main_category_name": "Title 2: Conservation: ACEP",
+        "data_folder": os.path.join("title-2-conservation", "acep"),
+        "program_csv_filename": "ACEP.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process"],
+        "output_filenames": ["acep_state_distribution_data.json", "acep_subprograms_data.json"]
+    },
+    "rcpp": {
+        "parser_class": "parsers.rcpp_parser.RcppParser",
+        "program_main_category_name": "Title 2: Conservation: ACEP",
+        "data_folder": os.path.join("title-2-conservation", "rcpp"),
+        "program_csv_filename": "RCPP.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process"],
+        "output_filenames": ["rcpp_state_distribution_data.json", "rcpp_subprograms_data.json"]
+    },
+    "dairy-disaster": {
+        "parser_class": "parsers.dairy_disaster_parser.DairyDisasterParser",
+        "program_main_category_name": "Title 1: Commodities: Dairy and Disaster",
+        "data_folder": "title-1-commodities",
+        "program_csv_filename": "Dairy-Disaster.csv",
+        "start_year": 2014,
+        "end_year": 2021,
+        "parse_methods": ["parse_and_process"],
+        "output_filenames": ["dmc_state_distribution_data.json", "dmc_subprograms_data.json",
+                             "sada_state_distribution_data.json", "sada_subprograms_data.json"]
+    },
+    # Parsers whose constructors take file paths are created by their own factory, their parser_kwargs name the
+    # other input files
+    "csp": {
+        "parser_class": "parsers.csp_parser.CSPDataParser",
+        "parser_factory": create_csp_parser,
+        "data_folder": os.path.join("title-2-conservation", "csp"),
+        "program_csv_filename": "CSPcategoriesUPDATE.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process"],
+        "output_filenames": ["csp_map_data.json", "csp_state_distribution_data.json",
+                             "csp_practice_categories_data.json"]
+    },
+    "eqip": {
+        "parser_class": "parsers.eqip_parser.EqipParser",
+        "parser_factory": create_eqip_parser,
+        "data_folder": os.path.join("title-2-conservation", "eqip"),
+        "program_csv_filename": "eqip-category-update.csv",
+        "parser_kwargs": {
+            "summary_filename": "summary.json",
+            "all_programs_filename": "allPrograms.json"
+        },
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process", "update_json_files"],
+        "output_filenames": ["eqip_map_data.json", "eqip_state_distribution_data.json",
+                             "eqip_practice_categories_data.json", "summary.json.updated.json",
+                             "allPrograms.json.updated.json"]
+    },
+    "snap": {
+        "parser_class": "snap.snap_main.SnapDataParser",
+        "parser_factory": create_snap_parser,
+        "has_year_windows": False,
+        "data_folder": "snap",
+        "program_csv_filename": "snap_monthly_participation.csv",
+        "parser_kwargs": {
+            "total_costs_filename": "snap_costs.csv",
+            "summary_filename": "summary.json",
+            "all_programs_filename": "allPrograms.json"
+        },
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_data", "update_json_files"],
+        "output_filenames": ["snap_state_distribution_data.json", "summary.json.updated.json",
+                             "allPrograms.json.updated.json"]
+    },
+    "all-programs": {
+        "parser_class": "all_programs_summary.AllProgramsParser",
+        "parser_factory": create_all_programs_parser,
+        "has_year_windows": False,
+        "data_folder": "all-programs-summary",
+        "program_csv_filename": "topline.csv",
+        "parser_kwargs": {
+            "all_programs_filename": "allprograms.json",
+            "summary_filename": "summary.json"
+        },
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse_and_process", "write_updated_json_files"],
+        "output_filenames": ["summary.json.updated.json", "allprograms.json.updated.json"]
+    }
+}
+
+
+def create_parser(job):
+    if "parser_factory" in job:
+        return job["parser_factory"](job)
+
+    parser_kwargs = dict(job.get("parser_kwargs", dict()))
+    for setting_name in ["output_folder", "year_windows", "chunk_size"]:
+        if setting_name in job:
+            parser_kwargs[setting_name] = job[setting_name]
+    return get_parser_class(job)(job["start_year"], job["end_year"], job["program_main_category_name"],
+                                 job["data_folder"], job["program_csv_filename"], **parser_kwargs)
+
+
+def get_output_folder(job):
+    return job.get("output_folder", job["data_folder"])
+
+
+def get_parser_metadata(job):
+    # Parsers keep the maps of every category together, only the maps of this category matter
+    metadata = getattr(create_parser(job), "metadata", dict())
+    return metadata.get(job.get("program_main_category_name"), metadata)
+
+
+def get_shared_source_hashes():
+    return {os.path.relpath(source_filepath, REPOSITORY_FOLDER): compute_file_hash(source_filepath)
+            for source_pattern in SHARED_SOURCE_PATTERNS for source_filepath in sorted(glob.glob(source_pattern))}
+
+
+def get_build_inputs(job, previous_build_inputs=None):
+    # Parsers without year windows only build their own start to end year window
+    if job.get("has_year_windows", True):
+        job_year_windows = year_windows.get_year_windows(job["start_year"], job["end_year"], job.get("year_windows"))
+    else:
+        job_year_windows = [(job["start_year"], job["end_year"])]
+
+    input_filenames = [job["program_csv_filename"]] + list(job.get("parser_kwargs", dict()).values())
+    build_inputs = {
+        "inputFiles": {input_filename: compute_file_hash(os.path.join(job["data_folder"], input_filename))
+                       for input_filename in input_filenames},
+        "parserSource": compute_file_hash(get_parser_source_filepath(job)),
+        "sharedSources": get_shared_source_hashes(),
+        "years": ",".join(year_windows.get_year_window_key(start_year, end_year)
+                          for start_year, end_year in job_year_windows)
+    }
+
+    # The metadata maps are written in the parser's source, or built with the shared modules, so while these sources
+    # are unchanged their hash is taken from the last build instead of importing the parser, and pandas, to compute it
+    # again. Otherwise the outputs are out of date anyway, and the hash is only added once they are rebuilt.
+    if previous_build_inputs is not None and \
+            all(previous_build_inputs.get(source_key) == build_inputs[source_key]
+                for source_key in ["parserSource", "sharedSources"]):
+        build_inputs["metadata"] = previous_build_inputs["metadata"]
+
+    # Outputs built without their copies, or with another encoder or layout, are rebuilt once these are enabled
+    if job.get("columnar_copies"):
+        build_inputs["columnarCopies"] = True
+    if job.get("msgpack_copies"):
+        build_inputs["msgpackCopies"] = True
+    if job.get("json_encoder", "json") != "json":
+        build_inputs["jsonEncoder"] = job["json_encoder"]
+    if job.get("compact_json"):
+        build_inputs["compactJson"] = True
+    if job.get("sidecar_compressions"):
+        build_inputs["sidecarCompressions"] = sorted(job["sidecar_compressions"])
+    return build_inputs
+
+
+def run_parser_job(job_name, job):
+    # Errors are returned instead of raised so that one failing parser does not abort the others
+    start_time = time.perf_counter()
+    error = None
+    try:
+        # The job carries the settings of the run, worker processes do not share the state of the main process
+        instrumentation.configure(job.get("instrument", False), job.get("instrument_report"))
+        json_writer.configure_outputs(job.get("json_encoder", "json"), job.get("columnar_copies", False),
+                                      job.get("msgpack_copies", False))
+        parser = create_parser(job)
+        for parse_method in job["parse_methods"]:
+            getattr(parser, parse_method)()
+    except Exception:
+        error = traceback.format_exc()
+
+    # Stage records are collected in the process that ran the parser, so they are sent back with the result
+    stage_records = instrumentation.pop_stage_records()
+    for stage_record in stage_records:
+        stage_record["job"] = job_name
+    # As are the statuses of the outputs the parser wrote
+    output_records = json_writer.pop_output_records()
+    return job_name, time.perf_counter() - start_time, error, stage_records, output_records
+
+
+def run_parser_jobs(jobs, workers):
+    results = dict()
+    if workers == 1:
+        for job_name, job in jobs.items():
+            results[job_name] = run_parser_job(job_name, job)
+    else:
+        start_time = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_parser_job, job_name, job): job_name for job_name, job in jobs.items()}
+            for future in as_completed(futures):
+                # A crashed worker (BrokenProcessPool) or an error outside the parser fails its job only, the results
+                # of the other jobs are still summarized and recorded in the manifests
+                try:
+                    results[futures[future]] = future.result()
+                except Exception:
+                    results[futures[future]] = (futures[future], time.perf_counter() - start_time,
+                                                traceback.format_exc(), [], [])
+
+    # Keep the summary in submission order regardless of completion order
+    return [results[job_name] for job_name in jobs]
+
+
+def get_jobs_to_run(jobs, force=False):
+    # Returns the names of the jobs whose outputs are out of date, with the manifests and build inputs they were
+    # checked against
+    manifests = dict()
+    build_inputs = dict()
+    job_names_to_run = []
+    for job_name, job in jobs.items():
+        output_folder = get_output_folder(job)
+        if output_folder not in manifests:
+            manifests[output_folder] = BuildManifest(output_folder)
+        previous_build_inputs = manifests[output_folder].get_build_inputs(job["output_filenames"][0])
+        build_inputs[job_name] = get_build_inputs(job, previous_build_inputs)
+
+        # Without a metadata hash, the parser's source has changed since the last build
+        if force or "metadata" not in build_inputs[job_name] or \
+                not manifests[output_folder].is_up_to_date(job["output_filenames"], build_inputs[job_name]):
+            job_names_to_run.append(job_name)
+    return job_names_to_run, manifests, build_inputs
+
+
+def run_incremental_build(jobs, workers, force=False):
+    # The manifests are only read and written here, never by the worker processes, because parsers sharing an output
+    # folder would otherwise race on the same manifest file
+    job_names_to_run, manifests, build_inputs = get_jobs_to_run(jobs, force)
+    job_results = {job_result[0]: job_result
+                   for job_result in run_parser_jobs({job_name: jobs[job_name] for job_name in job_names_to_run},
+                                                     workers)}
+
+    updated_output_folders = set()
+    for job_name, elapsed_time, error, stage_records, output_records in job_results.values():
+        if not error:
+            output_folder = get_output_folder(jobs[job_name])
+            if "metadata" not in build_inputs[job_name]:
+                build_inputs[job_name]["metadata"] = compute_metadata_hash(get_parser_metadata(jobs[job_name]))
+            manifests[output_folder].update(jobs[job_name]["output_filenames"], build_inputs[job_name])
+            updated_output_folders.add(output_folder)
+    for output_folder in updated_output_folders:
+        manifests[output_folder].save()
+
+    # Skipped jobs are reported without timing
+    return [job_results.get(job_name, (job_name, None, None, [], [])) for job_name in jobs]
+
+
+def print_program_list(jobs):
+    print("{:<20} {:<10} {}".format("Program", "Years", "Data folder"))
+    for job_name, job in jobs.items():
+        print("{:<20} {:<10} {}".format(job_name, year_windows.get_year_window_key(job["start_year"], job["end_year"]),
+                                        job["data_folder"]))
+
+
+def print_dry_run_summary(jobs, job_names_to_run):
+    print("{:<20} {:<10} {}".format("Parser", "Status", "Outputs"))
+    for job_name, job in jobs.items():
+        status = "REBUILD" if job_name in job_names_to_run else "UP-TO-DATE"
+        for index, output_filename in enumerate(job["output_filenames"]):
+            output_filepath = os.path.join(get_output_folder(job), output_filename)
+            if index == 0:
+                print("{:<20} {:<10} {}".format(job_name, status, output_filepath))
+            else:
+                print("{:<20} {:<10} {}".format("", "", output_filepath))
+
+
+def print_timing_summary(results, total_elapsed_time):
+    print("{:<20} {:<8} {:>10}".format("Parser", "Status", "Seconds"))
+    for job_name, elapsed_time, error, stage_records, output_records in results:
+        if elapsed_time is None:
+            print("{:<20} {:<8} {:>10}".format(job_name, "SKIPPED", "-"))
+        else:
+            print("{:<20} {:<8} {:>10.2f}".format(job_name, "FAILED" if error else "OK", elapsed_time))
+    print("{:<20} {:<8} {:>10.2f}".format("Total (wall time)", "", total_elapsed_time))
+
+    for job_name, elapsed_time, error, stage_records, output_records in results:
+        if error:
+            print("\n" + job_name + " failed:\n" + error, file=sys.stderr)
+
+
+def parse_program_names(text):
+    program_names = [program_name.strip() for program_name in text.split(",") if program_name.strip()]
+    unknown_program_names = [program_name for program_name in program_names if program_name not in PARSER_JOBS]
+    if len(unknown_program_names) > 0:
+        raise argparse.ArgumentTypeError("unknown program " + ", ".join(unknown_program_names) +
+                                         " (choose from " + ", ".join(PARSER_JOBS) + ")")
+    return program_names
+
+
+def add_build_arguments(argument_parser):
+    # The same options are accepted before and after the program subcommand, their defaults are only set on the main
+    # parser so that a subcommand does not reset options given before it
+    argument_parser.add_argument("--only", action="extend", type=parse_program_names, metavar="PROGRAMS",
+                                 help="only build these programs, as a comma separated list (can be repeated)")
+    argument_parser.add_argument("--skip", action="extend", type=parse_program_names, metavar="PROGRAMS",
+                                 help="do not build these programs, as a comma separated list (can be repeated)")
+    argument_parser.add_argument("--start-year", type=int, metavar="YEAR",
+                                 help="override the first year of every selected program")
+    argument_parser.add_argument("--end-year", type=int, metavar="YEAR",
+                                 help="override the last year of every selected program")
+    argument_parser.add_argument("--output-dir", metavar="PATH",
+                                 help="write the outputs (and their build manifests) under this folder, in the same "
+                                      "layout as the data folders, instead of next to the inputs")
+    argument_parser.add_argument("--dry-run", action="store_true",
+                                 help="only report which outputs would be rebuilt")
+    argument_parser.add_argument("--list", action="store_true",
+                                 help="only list the selected programs with their years and data folders")
+    argument_parser.add_argument("--workers", type=int,
+                                 help="number of parser processes to run in parallel (default: number of CPUs)")
+    argument_parser.add_argument("--force", action="store_true",
+                                 help="rebuild every output even if its inputs have not changed since the last run")
+    argument_parser.add_argument("--instrument", action="store_true",
+                                 help="report the time and memory used by each stage of every parser")
+    argument_parser.add_argument("--instrument-report", metavar="PATH",
+                                 help="also write the stage measurements to a JSON file (implies --instrument)")
+    argument_parser.add_argument("--chunk-size", type=int, metavar="ROWS",
+                                 help="read payee-level program CSV files in chunks of this many rows")
+    argument_parser.add_argument("--year-windows", metavar="WINDOWS",
+                                 help="also compute these year windows from the same load, as a comma separated list "
+                                      "of START-END windows or of window lengths for rolling windows, e.g. 2014-2018,5")
+    json_writer.add_output_arguments(argument_parser)
+
+
+def get_selected_jobs(arguments, argument_parser):
+    if arguments.program:
+        job_names = [arguments.program]
+    elif arguments.only:
+        job_names = [job_name for job_name in PARSER_JOBS if job_name in arguments.only]
+    else:
+        job_names = list(PARSER_JOBS)
+    job_names = [job_name for job_name in job_names if job_name not in (arguments.skip or [])]
+    if len(job_names) == 0:
+        argument_parser.error("no program selected")
+
+    # Jobs are copied so that the overrides do not change PARSER_JOBS
+    jobs = dict()
+    for job_name in job_names:
+        job = dict(PARSER_JOBS[job_name])
+        if arguments.start_year is not None:
+            job["start_year"] = arguments.start_year
+        if arguments.end_year is not None:
+            job["end_year"] = arguments.end_year
+        if job["start_year"] > job["end_year"]:
+            argument_parser.error(job_name + ": the start year " + str(job["start_year"]) +
+                                  " is after the end year " + str(job["end_year"]))
+        if arguments.output_dir:
+            job["output_folder"] = os.path.join(arguments.output_dir, job["data_folder"])
+        if arguments.compact:
+            job["compact_json"] = True
+        if arguments.sidecar:
+            job["sidecar_compressions"] = arguments.sidecar
+        if arguments.chunk_size:
+            job["chunk_size"] = arguments.chunk_size
+        if arguments.year_windows and job.get("has_year_windows", True):
+            # Rolling windows depend on the years of the job
+            job["year_windows"] = year_windows.parse_year_windows(arguments.year_windows, job["start_year"],
+                                                                  job["end_year"])
+        elif arguments.year_windows and (arguments.program or arguments.only):
+            # Parsers without year windows only build their own window, they are skipped by name only
+            argument_parser.error(job_name + " does not compute year windows, --year-windows can not be used with it")
+        if arguments.instrument or arguments.instrument_report:
+            job["instrument"] = True
+            job["instrument_report"] = arguments.instrument_report
+        if arguments.columnar:
+            job["columnar_copies"] = True
+        if arguments.msgpack:
+            job["msgpack_copies"] = True
+        if arguments.json_encoder:
+            job["json_encoder"] = arguments.json_encoder
+        jobs[job_name] = job
+    return jobs
 
-from data_parser import DataParser
-from parsers.acep_parser import AcepParser
-from parsers.rcpp_parser import RcppParser
-from parsers.dairy_disaster_parser import DairyDisasterParser
 
 if __name__ == '__main__':
-    commodities_data_parser = DataParser(2014, 2021, "Title 1: Commodities",
-                                         "title-1-commodities", "title_1_version_1.csv",
-                                         base_acres_csv_filename_arc_co="ARC-CO Base Acres by Program.csv",
-                                         base_acres_csv_filename_plc="PLC Base Acres by Program.csv",
-                                         farm_payee_count_csv_filename_arc_co="ARC-CO Recipients by Program.csv",
-                                         farm_payee_count_csv_filename_arc_ic="ARC-IC Recipients by Program.csv",
-                                         farm_payee_count_csv_filename_plc="PLC Recipients by Program.csv",
-                                         total_payment_csv_filename_arc_co="ARC-CO.csv",
-                                         total_payment_csv_filename_arc_ic="ARC-IC.csv",
-                                         total_payment_csv_filename_plc="PLC.csv"
-                                         )
-    commodities_data_parser.format_title_commodities_data()
-    commodities_data_parser.parse_and_process()
-
-    crp_data_parser = DataParser(2018, 2022, "Title 2: Conservation: CRP",
-                                 os.path.join("title-2-conservation", "crp"),
-                                 "CRP_total_compiled_August_24_2023.csv")
-    crp_data_parser.parse_and_process_crp()
-
-    crop_insurance_data_parser = DataParser(2018, 2022, "Crop Insurance",
-                                            "crop-insurance", "ci_state_year_benefits 8-28-23.csv")
-    crop_insurance_data_parser.parse_and_process_crop_insurance()
-
-    acep_data_parser = AcepParser(2018, 2022, "Title 2: Conservation: ACEP",
-                                  os.path.join("title-2-conservation", "acep"),
-                                  "ACEP.csv")
-
-    acep_data_parser.parse_and_process()
-
-    rcpp_data_parser = RcppParser(2018, 2022, "Title 2: Conservation: ACEP",
-                                  os.path.join("title-2-conservation", "rcpp"),
-                                  "RCPP.csv")
-
-    rcpp_data_parser.parse_and_process()
-
-    dairy_disaster_parser = DairyDisasterParser(2014, 2021, "Title 1: Commodities: Dairy and Disaster",
-                                                "title-1-commodities", "Dairy-Disaster.csv")
-
-    dairy_disaster_parser.parse_and_process()
+    argument_parser = argparse.ArgumentParser(description="Generate JSON data files for all programs, or for the "
+                                                          "program given as subcommand.")
+    add_build_arguments(argument_parser)
+    argument_parser.set_defaults(workers=os.cpu_count())
+    program_subparsers = argument_parser.add_subparsers(dest="program", metavar="PROGRAM",
+                                                        help="only build this program: " + ", ".join(PARSER_JOBS))
+    # The options of the subcommands are added once, to a parent parser shared by every subcommand
+    program_argument_parser = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    add_build_arguments(program_argument_parser)
+    for job_name in PARSER_JOBS:
+        program_subparsers.add_parser(job_name, parents=[program_argument_parser],
+                                      help="build the " + job_name + " outputs")
+    arguments = argument_parser.parse_args()
+
+    if arguments.workers < 1:
+        argument_parser.error("--workers must be at least 1")
+    if arguments.chunk_size is not None and arguments.chunk_size < 1:
+        argument_parser.error("--chunk-size must be at least 1")
+    if arguments.year_windows:
+        try:
+            year_windows.parse_year_windows(arguments.year_windows, 0, 0)
+        except ValueError as error:
+            argument_parser.error("--year-windows: " + str(error))
+    # The output settings are checked here, before any job runs, they are passed to the jobs by get_selected_jobs
+    json_writer.apply_output_arguments(arguments, argument_parser)
+
+    # Paths given on the command line are relative to the current folder, the data folders to the repository
+    if arguments.output_dir:
+        arguments.output_dir = os.path.abspath(arguments.output_dir)
+    if arguments.instrument_report:
+        arguments.instrument_report = os.path.abspath(arguments.instrument_report)
+    os.chdir(REPOSITORY_FOLDER)
+
+    # The report of every job's stages is written here, by the main process
+    if arguments.instrument or arguments.instrument_report:
+        instrumentation.configure(True, arguments.instrument_report)
+
+    selected_jobs = get_selected_jobs(arguments, argument_parser)
+    if arguments.list:
+        print_program_list(selected_jobs)
+        sys.exit(0)
+    if arguments.dry_run:
+        print_dry_run_summary(selected_jobs, get_jobs_to_run(selected_jobs, arguments.force)[0])
+        sys.exit(0)
+
+    for selected_job in selected_jobs.values():
+        os.makedirs(get_output_folder(selected_job), exist_ok=True)
+
+    start_time = time.perf_counter()
+    job_results = run_incremental_build(selected_jobs, arguments.workers, arguments.force)
+    print_timing_summary(job_results, time.perf_counter() - start_time)
+    instrumentation.emit_report([stage_record for job_result in job_results for stage_record in job_result[3]])
+    json_writer.emit_output_summary([output_record for job_result in job_results for output_record in job_result[4]])
+
+    if any(error for job_name, elapsed_time, error, stage_records, output_records in job_results):
+        sys.exit(1)
@@ -1,16 +1,23 @@
-import json
 import os
 
-import pandas as pd
 from deepmerge import always_merger
 
+from utils.csv_cache import read_csv_cached
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import emit_output_summary, serialize_json, write_serialized_json
+from utils.states import StateLookup
+from utils.year_windows import YearlySums, get_year_window_key, get_year_windows
+
 
 class AcepParser:
     def __init__(self, start_year, end_year, program_main_category_name, data_folder, program_csv_filename, **kwargs):
         self.start_year = start_year
         self.end_year = end_year
+        self.year_windows = get_year_windows(start_year, end_year, kwargs.get("year_windows"))
         self.program_main_category_name = program_main_category_name
         self.data_folder = data_folder
+        # Output files are written next to the input files unless another folder is given
+        self.output_folder = kwargs.get("output_folder", data_folder)
         self.program_csv_filepath = os.path.join(data_folder, program_csv_filename)
         self.program_data = None
 
@@ -27,280 +34,238 @@ class AcepParser:
                 "Total Reimbursable Payments": "reimburse payments",
                 "Total Techinical Assistance Payments": "tech payments",
                 "Total Payments": "total payments"
+            },
+            "column_dtypes_map": {
+                "year": "int64",
+                "state": "str",
+                "program": "str",
+                "Number of Contracts": "float64",
+                "Number of Acres": "float64",
+                "Total Financial Assistance Payments ($1000)": "float64",
+                "Total Reimbursable Payments": "float64",
+                "Total Techinical Assistance Payments": "float64",
+                "Total Payments": "float64"
             }
         }
 
-        self.us_state_abbreviations = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming'
-        }
+        self.state_lookup = StateLookup()
 
 
     def parse_and_process(self):
         # Import CSV file into a Pandas DataFrame
-        program_data = pd.read_csv(self.program_csv_filepath)
+        with measure_stage("acep", "load"):
+            program_data = read_csv_cached(self.program_csv_filepath, self.metadata["column_dtypes_map"])
 
         # Rename column names to make it more uniform
-        program_data.rename(columns=self.metadata["column_names_map"], inplace=True)
-
-        # Replace Hawaii/Pacific to Hawaii
-        program_data["state"] = program_data["state"].apply(
-            lambda x: x.replace("Hawaii/Pacific", "Hawaii"))
-
-        # some columns have empty values and this makes the rows type as object
-        # this makes the process of SUM errors since those are object not number
-        # so the columns should be numeric all the time
-        # make sure every number columns be number
-        program_data[["contracts",
-                      "acres",
-                      "assistance payments",
-                      "reimburse payments",
-                      "tech payments",
-                      "total payments"]] = \
-            program_data[["contracts",
-                          "acres",
-                          "assistance payments",
-                          "reimburse payments",
-                          "tech payments",
-                          "total payments"]].apply(pd.to_numeric)
+        with measure_stage("acep", "normalize"):
+            program_data.rename(columns=self.metadata["column_names_map"], inplace=True)
+
+            # Replace Hawaii/Pacific to Hawaii
+            program_data["state"] = program_data["state"].apply(
+                lambda x: x.replace("Hawaii/Pacific", "Hawaii"))
 
         # Filter only relevant years' data
-        program_data = program_data[program_data["year"].between(self.start_year, self.end_year, inclusive="both")]
-
-        # 1. Generate State Distribution JSON Data
-        self.state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)] = []
-
-        # calculate national level values
-        total_contract_at_national_level = int(
-            program_data["contracts"].sum())
-        total_acre_at_national_level = int(
-            program_data["acres"].sum())
-        total_assistance_payments_at_national_level = round(
-            program_data["assistance payments"].sum(), 1)
-        total_reimburse_payments_at_national_level = round(
-            program_data["reimburse payments"].sum(), 1)
-        total_tech_payments_at_national_level = round(
-            program_data["tech payments"].sum(), 1)
-        total_payments_at_national_level = round(
-            program_data["total payments"].sum(), 1)
-
-        # group total data by state, then sum
-        sum_by_contract_by_state = \
-            program_data[
-                ["year", "state", "contracts"]
-            ].groupby(
-                ["state"]
-            )["contracts"].sum()
-
-        sum_by_acre_by_state = \
-            program_data[
-                ["year", "state", "acres"]
-            ].groupby(
-                ["state"]
-            )["acres"].sum()
-
-        sum_by_assistance_payments_by_state = \
-            program_data[
-                ["year", "state", "assistance payments"]
-            ].groupby(
-                ["state"]
-            )["assistance payments"].sum()
-
-        sum_by_reimburse_payments_by_state = \
-            program_data[
-                ["year", "state", "reimburse payments"]
-            ].groupby(
-                ["state"]
-            )["reimburse payments"].sum()
-
-        sum_by_tech_payments_by_state = \
-            program_data[
-                ["year", "state", "tech payments"]
-            ].groupby(
-                ["state"]
-            )["tech payments"].sum()
-
-        sum_by_total_payments_by_state = \
-            program_data[
-                ["year", "state", "total payments"]
-            ].groupby(
-                ["state"]
-            )["total payments"].sum()
-
-        for state_abbr in self.us_state_abbreviations:
-            # there was an error in the line
-            # because the original csv file contains the space in alaska, and hawaii/pacific
-            # so if it makes an error, needs to check the state name if it has any extra space
-            state = self.us_state_abbreviations[state_abbr]
-            # if there is a zero division problem in with state percentage
-            within_state_assistance_payments = 0
-            within_state_reimburse_payments = 0
-            within_state_tech_payments = 0
-
-            if int(sum_by_total_payments_by_state[state].item()) != 0:
-                within_state_assistance_payments = \
-                    round((sum_by_assistance_payments_by_state[state].item() /
-                           sum_by_total_payments_by_state[state].item()) * 100, 2)
-                within_state_reimburse_payments = \
-                    round((sum_by_reimburse_payments_by_state[state].item() /
-                           sum_by_total_payments_by_state[state].item()) * 100, 2)
-                within_state_tech_payments = \
-                    round((sum_by_tech_payments_by_state[state].item() /
-                           sum_by_total_payments_by_state[state].item()) * 100, 2)
-
-            new_data_entry = {
-                "state": state,
+        with measure_stage("acep", "filter"):
+            program_data = program_data[program_data["year"].between(
+                min(start_year for start_year, end_year in self.year_windows),
+                max(end_year for start_year, end_year in self.year_windows), inclusive="both")]
+
+        # Sum every column by year and state once, every year window is aggregated from these sums
+        with measure_stage("acep", "aggregate"):
+            yearly_sums = YearlySums(program_data, "year", ["state"], list(self.metadata["column_names_map"].values()))
+
+        # 1. Generate State Distribution JSON Data, for every year window
+        for start_year, end_year in self.year_windows:
+            window_data = yearly_sums.get_window_data(start_year, end_year)
+            year_window_key = get_year_window_key(start_year, end_year)
+            self.state_distribution_data_dict[year_window_key] = []
+
+            # calculate national level values
+            with measure_stage("acep", "aggregate"):
+                total_contract_at_national_level = int(
+                    window_data["contracts"].sum())
+                total_acre_at_national_level = int(
+                    window_data["acres"].sum())
+                total_assistance_payments_at_national_level = round(
+                    window_data["assistance payments"].sum(), 1)
+                total_reimburse_payments_at_national_level = round(
+                    window_data["reimburse payments"].sum(), 1)
+                total_tech_payments_at_national_level = round(
+                    window_data["tech payments"].sum(), 1)
+                total_payments_at_national_level = round(
+                    window_data["total payments"].sum(), 1)
+
+                # group total data by state, then sum
+                sum_by_contract_by_state = \
+                    window_data[
+                        ["year", "state", "contracts"]
+                    ].groupby(
+                        ["state"]
+                    )["contracts"].sum()
+
+                sum_by_acre_by_state = \
+                    window_data[
+                        ["year", "state", "acres"]
+                    ].groupby(
+                        ["state"]
+                    )["acres"].sum()
+
+                sum_by_assistance_payments_by_state = \
+                    window_data[
+                        ["year", "state", "assistance payments"]
+                    ].groupby(
+                        ["state"]
+                    )["assistance payments"].sum()
+
+                sum_by_reimburse_payments_by_state = \
+                    window_data[
+                        ["year", "state", "reimburse payments"]
+                    ].groupby(
+                        ["state"]
+                    )["reimburse payments"].sum()
+
+                sum_by_tech_payments_by_state = \
+                    window_data[
+                        ["year", "state", "tech payments"]
+                    ].groupby(
+                        ["state"]
+                    )["tech payments"].sum()
+
+                sum_by_total_payments_by_state = \
+                    window_data[
+                        ["year", "state", "total payments"]
+                    ].groupby(
+                        ["state"]
+                    )["total payments"].sum()
+
+            with measure_stage("acep", "build JSON"):
+                for state_abbr, state in self.state_lookup.names_by_abbreviation.items():
+                    # there was an error in the line
+                    # because the original csv file contains the space in alaska, and hawaii/pacific
+                    # so if it makes an error, needs to check the state name if it has any extra space
+                    # if there is a zero division problem in with state percentage
+                    within_state_assistance_payments = 0
+                    within_state_reimburse_payments = 0
+                    within_state_tech_payments = 0
+
+                    if int(sum_by_total_payments_by_state[state].item()) != 0:
+                        within_state_assistance_payments = \
+                            round((sum_by_assistance_payments_by_state[state].item() /
+                                   sum_by_total_payments_by_state[state].item()) * 100, 2)
+                        within_state_reimburse_payments = \
+                            round((sum_by_reimburse_payments_by_state[state].item() /
+                                   sum_by_total_payments_by_state[state].item()) * 100, 2)
+                        within_state_tech_payments = \
+                            round((sum_by_tech_payments_by_state[state].item() /
+                                   sum_by_total_payments_by_state[state].item()) * 100, 2)
+
+                    new_data_entry = {
+                        "state": state_abbr,
+                        "programs": [
+                            {
+                                "programName": "ACEP",
+                                "totalContracts": int(sum_by_contract_by_state[state].item()),
+                                "totalAcres": int(sum_by_acre_by_state[state].item()),
+                                "assistancePaymentInDollars":
+                                    int(sum_by_assistance_payments_by_state[state].item() * 1000),
+                                "reimbursePaymentInDollars":
+                                    int(sum_by_reimburse_payments_by_state[state].item() * 1000),
+                                "techPaymentInDollars": int(sum_by_tech_payments_by_state[state].item() * 1000),
+                                "totalPaymentInDollars": int(sum_by_total_payments_by_state[state].item() * 1000),
+                                "contractsInPercentageNationwide": round(
+                                    (sum_by_contract_by_state[state].item() /
+                                     total_contract_at_national_level) * 100, 2),
+                                "acresInPercentageNationwide": round(
+                                    (sum_by_acre_by_state[state].item() /
+                                     total_acre_at_national_level) * 100, 2),
+                                "assistancePaymentInPercentageNationwide": round(
+                                    (sum_by_assistance_payments_by_state[state].item() /
+                                     total_assistance_payments_at_national_level) * 100, 2),
+                                "reimbursePaymentInPercentageNationwide": round(
+                                    (sum_by_reimburse_payments_by_state[state].item() /
+                                     total_reimburse_payments_at_national_level) * 100, 2),
+                                "techPaymentInPercentageNationwide": round(
+                                    (sum_by_tech_payments_by_state[state].item() /
+                                     total_tech_payments_at_national_level) * 100, 2),
+                                "totalPaymentInPercentageNationwide": round(
+                                    (sum_by_total_payments_by_state[state].item() /
+                                     total_payments_at_national_level) * 100, 2),
+                                "assistancePaymentInPercentageWithinState": within_state_assistance_payments,
+                                "reimbursePaymentInPercentageWithinState": within_state_reimburse_payments,
+                                "techPaymentInPercentageWithinState": within_state_tech_payments,
+                                "subPrograms": []
+                            },
+                        ]
+                    }
+
+                    self.state_distribution_data_dict[year_window_key].append(
+                        new_data_entry)
+
+        with measure_stage("acep", "build JSON"):
+            # Sort states by decreasing order of financial assistance payments
+            for year in self.state_distribution_data_dict:
+                self.state_distribution_data_dict[year] = sorted(self.state_distribution_data_dict[year],
+                                                                 key=lambda x: x["programs"][0][
+                                                                     "assistancePaymentInDollars"],
+                                                                 reverse=True)
+
+        # Write processed_data_dict as JSON data
+        with measure_stage("acep", "serialize"):
+            output_json = serialize_json(self.state_distribution_data_dict, indent=2)
+        with measure_stage("acep", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "acep_state_distribution_data.json"), output_json,
+                                  self.state_distribution_data_dict)
+
+        # 2. Generate Sub Programs Data, for the parser's own year window only
+        program_data = yearly_sums.get_window_data(self.start_year, self.end_year)
+
+        # Group total
+        with measure_stage("acep", "aggregate"):
+            total_by_contract = \
+                program_data["contracts"].sum()
+
+            total_by_acre = \
+                program_data["acres"].sum()
+
+            total_by_assistance_payments = \
+                program_data["assistance payments"].sum()
+
+            total_by_reimburse_payments = \
+                program_data["reimburse payments"].sum()
+
+            total_by_tech_payments = \
+                program_data["tech payments"].sum()
+
+            total_by_total_payments = \
+                program_data["total payments"].sum()
+
+        with measure_stage("acep", "build JSON"):
+            self.program_data_dict = {
                 "programs": [
                     {
                         "programName": "ACEP",
-                        "totalContracts": int(sum_by_contract_by_state[state].item()),
-                        "totalAcres": int(sum_by_acre_by_state[state].item()),
-                        "assistancePaymentInDollars": int(sum_by_assistance_payments_by_state[state].item() * 1000),
-                        "reimbursePaymentInDollars": int(sum_by_reimburse_payments_by_state[state].item() * 1000),
-                        "techPaymentInDollars": int(sum_by_tech_payments_by_state[state].item() * 1000),
-                        "totalPaymentInDollars": int(sum_by_total_payments_by_state[state].item() * 1000),
-                        "contractsInPercentageNationwide": round(
-                            (sum_by_contract_by_state[state].item() /
-                             total_contract_at_national_level) * 100, 2),
-                        "acresInPercentageNationwide": round(
-                            (sum_by_acre_by_state[state].item() /
-                             total_acre_at_national_level) * 100, 2),
-                        "assistancePaymentInPercentageNationwide": round(
-                            (sum_by_assistance_payments_by_state[state].item() /
-                             total_assistance_payments_at_national_level) * 100, 2),
-                        "reimbursePaymentInPercentageNationwide": round(
-                            (sum_by_reimburse_payments_by_state[state].item() /
-                             total_reimburse_payments_at_national_level) * 100, 2),
-                        "techPaymentInPercentageNationwide": round(
-                            (sum_by_tech_payments_by_state[state].item() /
-                             total_tech_payments_at_national_level) * 100, 2),
-                        "totalPaymentInPercentageNationwide": round(
-                            (sum_by_total_payments_by_state[state].item() /
-                             total_payments_at_national_level) * 100, 2),
-                        "assistancePaymentInPercentageWithinState": within_state_assistance_payments,
-                        "reimbursePaymentInPercentageWithinState": within_state_reimburse_payments,
-                        "techPaymentInPercentageWithinState": within_state_tech_payments,
+                        "totalContracts": int(total_by_contract.item()),
+                        "totalAcre": int(total_by_acre.item()),
+                        "assistancePaymentInDollars": int(total_by_assistance_payments.item() * 1000),
+                        "reimbursePaymentInDollars": int(total_by_reimburse_payments.item() * 1000),
+                        "techPaymentInDollars": int(total_by_tech_payments.item() * 1000),
+                        "totalPaymentInDollars": int(total_by_total_payments * 1000),
                         "subPrograms": []
                     },
                 ]
             }
 
-            # convert state name to abbreviation
-            new_data_entry = self.remap_state_name_to_abbreviation(new_data_entry)
-
-            self.state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)].append(
-                new_data_entry)
-
-        # Sort states by decreasing order of financial assistance payments
-        for year in self.state_distribution_data_dict:
-            self.state_distribution_data_dict[year] = sorted(self.state_distribution_data_dict[year],
-                                                             key=lambda x: x["programs"][0][
-                                                                 "assistancePaymentInDollars"],
-                                                             reverse=True)
-
-        # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "acep_state_distribution_data.json"),
-                  "w") as output_json_file:
-            output_json_file.write(json.dumps(self.state_distribution_data_dict, indent=2))
-
-        # 2. Generate Sub Programs Data
-        # Group total
-        total_by_contract = \
-            program_data["contracts"].sum()
-
-        total_by_acre = \
-            program_data["acres"].sum()
-
-        total_by_assistance_payments = \
-            program_data["assistance payments"].sum()
-
-        total_by_reimburse_payments = \
-            program_data["reimburse payments"].sum()
-
-        total_by_tech_payments = \
-            program_data["tech payments"].sum()
-
-        total_by_total_payments = \
-            program_data["total payments"].sum()
-
-        self.program_data_dict = {
-            "programs": [
-                {
-                    "programName": "ACEP",
-                    "totalContracts": int(total_by_contract.item()),
-                    "totalAcre": int(total_by_acre.item()),
-                    "assistancePaymentInDollars": int(total_by_assistance_payments.item() * 1000),
-                    "reimbursePaymentInDollars": int(total_by_reimburse_payments.item() * 1000),
-                    "techPaymentInDollars": int(total_by_tech_payments.item() * 1000),
-                    "totalPaymentInDollars": int(total_by_total_payments * 1000),
-                    "subPrograms": []
-                },
-            ]
-        }
-
         # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "acep_subprograms_data.json"), "w") as output_json_file:
-            output_json_file.write(json.dumps(self.program_data_dict, indent=2))
-
-    def remap_state_name_to_abbreviation(self, data_entry):
-        temp_state = data_entry['state']
-        data_entry['state'] = \
-            [abbr for abbr, state in self.us_state_abbreviations.items() if state == data_entry['state']][0]
-        changed_state = data_entry['state']
-
-        return data_entry
+        with measure_stage("acep", "serialize"):
+            output_json = serialize_json(self.program_data_dict, indent=2)
+        with measure_stage("acep", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "acep_subprograms_data.json"), output_json,
+                                  self.program_data_dict)
 
 
 if __name__ == '__main__':
-    acep_data_parser = AcepParser(2018, 2022, "Title 2: Conservation: ACEP",
-                                  os.path.join("..", "title-2-conservation", "acep"),
-                                  "ACEP.csv")
+    data_folder = os.path.join("title-2-conservation", "acep")
+    acep_data_parser = AcepParser(2018, 2022, "Title 2: Conservation: ACEP", data_folder, "ACEP.csv")
     acep_data_parser.parse_and_process()
+    emit_report()
+    emit_output_summary()
@@ -1,14 +1,29 @@
+import argparse
 import pandas as pd
-import json
+import os
 
 from deepmerge import always_merger
 
+from utils.categorical import normalize_categorical_columns
+from utils.csv_cache import read_csv_cached
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import (add_output_arguments, apply_output_arguments, emit_output_summary, serialize_json,
+                               write_json_file, write_serialized_json)
+from utils.states import StateLookup, US_STATE_ABBREVIATIONS
+from utils.year_windows import YearlySums, get_year_window_key, get_year_windows
+
 
 class CSPDataParser:
-    def __init__(self, start_year, end_year, csv_filepath):
+    def __init__(self, start_year, end_year, csv_filepath, compact_json=False, sidecar_compressions=(),
+                 year_windows=None, output_folder=None):
         self.start_year = start_year
         self.end_year = end_year
+        self.year_windows = get_year_windows(start_year, end_year, year_windows)
         self.csv_filepath = csv_filepath
+        # Output files are written next to the CSV file unless another folder is given
+        self.output_folder = os.path.dirname(csv_filepath) if output_folder is None else output_folder
+        self.compact_json = compact_json
+        self.sidecar_compressions = sidecar_compressions
 
         self.statute_and_practice_categories_mapping = {
             "2018 Practices": ["Structural", "Land management", "Vegetative", "Forest management", "Soil testing",
@@ -17,61 +32,17 @@ class CSPDataParser:
                                    "Non-industrial private forestland", "Other: supplemental, adjustment & other"],
         }
 
-        self.us_state_abbreviations = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'PR': 'Puerto Rico',
-            'PB': 'Pacific Basin',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming'
+        self.column_dtypes_map = {
+            "Pay_year": "int64",
+            "state_code": "str",
+            "State": "str",
+            "practice_code": "str",
+            "payments": "int64",
+            "StatutoryCategory": "str"
         }
 
+        self.state_lookup = StateLookup(US_STATE_ABBREVIATIONS + ["PR", "PB"])
+
         self.processed_data_dict = dict()
         self.state_distribution_data_dict = dict()
         self.practice_categories_data_dict = dict()
@@ -83,7 +54,11 @@ class CSPDataParser:
 
     def find_and_get_zero_practice_category_entries(self, statue_name, practice_categories_list,
                                                     for_percentage_json=False):
-        diff_list = list(set(self.statute_and_practice_categories_mapping[statue_name]) - set(practice_categories_list))
+        # Missing categories keep the order of the mapping, a set difference would order them by string hash, which
+        # changes from run to run
+        practice_categories_set = set(practice_categories_list)
+        diff_list = [category_name for category_name in self.statute_and_practice_categories_mapping[statue_name]
+                     if category_name not in practice_categories_set]
         zero_practice_category_entries = []
         for entry in diff_list:
             if not for_percentage_json:
@@ -100,47 +75,82 @@ class CSPDataParser:
                 })
         return zero_practice_category_entries
 
+    def get_category_distribution_by_state(self, total_payments_by_category_by_state, total_payments_by_state,
+                                           total_payments_by_category_at_national_level):
+        # The percentages of every (state, category) pair are computed at once, then the rows are split by state, so
+        # that every state only goes through its own categories instead of all pairs of all states
+        state_names = total_payments_by_category_by_state.index.get_level_values("state")
+        category_names = total_payments_by_category_by_state.index.get_level_values("category_name")
+
+        # Values are rounded one Python value at a time, integer payments stay integers in the output. The ratios are
+        # divided for all pairs at once, but rounded with Python's round, as np.round differs on halfway values.
+        category_payments = pd.Series([round(payment, 2) for payment in total_payments_by_category_by_state.tolist()],
+                                      index=total_payments_by_category_by_state.index)
+        category_ratios_nationwide = category_payments / total_payments_by_category_at_national_level.reindex(
+            category_names).to_numpy() * 100
+        category_ratios_within_state = category_payments / total_payments_by_state.reindex(
+            state_names).to_numpy() * 100
+
+        category_distribution_by_state = dict()
+        for state_name, category_name, category_payment, category_ratio_nationwide, \
+                category_ratio_within_state in zip(state_names, category_names, category_payments.tolist(),
+                                                   category_ratios_nationwide.tolist(),
+                                                   category_ratios_within_state.tolist()):
+            category_distribution_by_state.setdefault(state_name, []).append(
+                (category_name, category_payment, round(category_ratio_nationwide, 2),
+                 round(category_ratio_within_state, 2)))
+        return category_distribution_by_state
+
     def parse_and_process(self):
         # Import CSV file into a Pandas DataFrame
-        csp_data = pd.read_csv(self.csv_filepath)
+        with measure_stage("csp", "load"):
+            csp_data = read_csv_cached(self.csv_filepath, self.column_dtypes_map)
 
         # Replace category values for standardization
-        csp_data = csp_data.replace({
-            "Structural (6(A)(i))": "Structural",
-            "Land Management (6(A)(ii))": "Land management",
-            "Forest management (6(A)(iv))": "Forest management",
-            "Vegetative (6(A)(iii))": "Vegetative",
-            "Soil remediation (6(A)(vi))": "Soil remediation",
-            "Other (6(A)(vii))": "Other improvement",
-            "NIPF": "Non-industrial private forestland",
-            "2014 Other Practices": "Other: supplemental, adjustment & other",
-            "Existing Activity Payments": "Existing activity payments",
-            "Pastured Cropland": "Pastured cropland"
-        })
-
-        # Rename column names to make it more uniform
-        csp_data.rename(columns={"Pay_year": "pay_year", "State": "state", "StatutoryCategory": "category_name"},
-                        inplace=True)
-
-        statute_map = dict()
-        for statute_name in self.statute_and_practice_categories_mapping:
-            for value in self.statute_and_practice_categories_mapping[statute_name]:
-                statute_map[value] = statute_name
-        csp_data["statute_name"] = csp_data["category_name"].map(statute_map)
+        with measure_stage("csp", "normalize"):
+            csp_data = normalize_categorical_columns(csp_data, ["StatutoryCategory"], {
+                "Structural (6(A)(i))": "Structural",
+                "Land Management (6(A)(ii))": "Land management",
+                "Forest management (6(A)(iv))": "Forest management",
+                "Vegetative (6(A)(iii))": "Vegetative",
+                "Soil remediation (6(A)(vi))": "Soil remediation",
+                "Other (6(A)(vii))": "Other improvement",
+                "NIPF": "Non-industrial private forestland",
+                "2014 Other Practices": "Other: supplemental, adjustment & other",
+                "Existing Activity Payments": "Existing activity payments",
+                "Pastured Cropland": "Pastured cropland"
+            })
+
+            # Rename column names to make it more uniform
+            csp_data.rename(columns={"Pay_year": "pay_year", "State": "state", "StatutoryCategory": "category_name"},
+                            inplace=True)
+
+            statute_map = dict()
+            for statute_name in self.statute_and_practice_categories_mapping:
+                for value in self.statute_and_practice_categories_mapping[statute_name]:
+                    statute_map[value] = statute_name
+            csp_data["statute_name"] = csp_data["category_name"].map(statute_map)
 
         # Filter data for only required years
-        csp_data = csp_data[csp_data["pay_year"].between(self.start_year, self.end_year, inclusive="both")]
+        with measure_stage("csp", "filter"):
+            csp_data = csp_data[csp_data["pay_year"].between(
+                min(start_year for start_year, end_year in self.year_windows),
+                max(end_year for start_year, end_year in self.year_windows), inclusive="both")]
 
         # Group data by state, practice category name, and payment
-        payments_by_category_by_state_for_year = \
-            csp_data[
-                ["pay_year", "state", "payments", "category_name"]
-            ].groupby(
-                ["pay_year", "state", "category_name"]
-            )["payments"].sum()
+        with measure_stage("csp", "aggregate"):
+            # Sum the payments by year, state and category once, every year window is aggregated from these sums
+            yearly_sums = YearlySums(csp_data, "pay_year", ["state", "category_name", "statute_name"], ["payments"])
+
+            payments_by_category_by_state_for_year = \
+                yearly_sums.data[
+                    ["pay_year", "state", "payments", "category_name"]
+                ].groupby(
+                    ["pay_year", "state", "category_name"]
+                )["payments"].sum()
 
         # 1. Generate map data
-        if True:
+        with measure_stage("csp", "build JSON"):
             # Iterate through all tuples
             for data_tuple, payment in payments_by_category_by_state_for_year.items():
                 year, state_name, category_name = data_tuple
@@ -191,57 +201,59 @@ class CSPDataParser:
                     if not found:
                         self.processed_data_dict[state_name].append(new_data_entry)
 
-            # Get total payment data
-            total_payments_by_category_by_state = csp_data[
-                ["state", "category_name", "payments"]].groupby(
-                ["state", "category_name"]
-            )["payments"].sum()
-
-            # Iterate through all tuples
-            for data_tuple, payment in total_payments_by_category_by_state.items():
-                state_name, category_name = data_tuple
-                rounded_payment = round(payment, 2)
+            # Add the total of every year window
+            for start_year, end_year in self.year_windows:
+                year_window_key = get_year_window_key(start_year, end_year)
+
+                # Get total payment data
+                total_payments_by_category_by_state = yearly_sums.get_window_totals(
+                    start_year, end_year, ["state", "category_name"])["payments"]
+
+                # Iterate through all tuples
+                for data_tuple, payment in total_payments_by_category_by_state.items():
+                    state_name, category_name = data_tuple
+                    rounded_payment = round(payment, 2)
+
+                    new_data_entry = {
+                        "years": year_window_key,
+                        "statutes": [
+                            {
+                                "statuteName": "2018 Practices",
+                                "practiceCategories": [
+                                ]
+                            },
+                            {
+                                "statuteName": "2014 Eligible Land",
+                                "practiceCategories": [
+                                ]
+                            }
+                        ]
+                    }
 
-                new_data_entry = {
-                    "years": str(self.start_year) + "-" + str(self.end_year),
-                    "statutes": [
-                        {
-                            "statuteName": "2018 Practices",
-                            "practiceCategories": [
-                            ]
-                        },
-                        {
-                            "statuteName": "2014 Eligible Land",
-                            "practiceCategories": [
-                            ]
-                        }
-                    ]
-                }
+                    # Get statute name and updated category name
+                    statute_name = self.find_statute_by_category(category_name)
 
-                # Get statute name and updated category name
-                statute_name = self.find_statute_by_category(category_name)
+                    for statute in new_data_entry["statutes"]:
+                        if statute["statuteName"] == statute_name:
+                            statute["practiceCategories"].append({
+                                "practiceCategoryName": category_name,
+                                "totalPaymentInDollars": rounded_payment
+                            })
 
-                for statute in new_data_entry["statutes"]:
-                    if statute["statuteName"] == statute_name:
-                        statute["practiceCategories"].append({
-                            "practiceCategoryName": category_name,
-                            "totalPaymentInDollars": rounded_payment
-                        })
-
-                found = False
-                # Update self.processed_data_dict
-                for entry in self.processed_data_dict[state_name]:
-                    if entry["years"] == new_data_entry["years"]:
-                        for entry_statute in entry["statutes"]:
-                            for new_data_entry_statute in new_data_entry["statutes"]:
-                                if entry_statute["statuteName"] == new_data_entry_statute["statuteName"]:
-                                    entry_statute["practiceCategories"] = always_merger.merge(
-                                        entry_statute["practiceCategories"],
-                                        new_data_entry_statute["practiceCategories"])
-                        found = True
-                        break
-                if not found:
-                    self.processed_data_dict[state_name].append(new_data_entry)
+                    found = False
+                    # Update self.processed_data_dict
+                    for entry in self.processed_data_dict[state_name]:
+                        if entry["years"] == new_data_entry["years"]:
+                            for entry_statute in entry["statutes"]:
+                                for new_data_entry_statute in new_data_entry["statutes"]:
+                                    if entry_statute["statuteName"] == new_data_entry_statute["statuteName"]:
+                                        entry_statute["practiceCategories"] = always_merger.merge(
+                                            entry_statute["practiceCategories"],
+                                            new_data_entry_statute["practiceCategories"])
+                            found = True
+                            break
+                    if not found:
+                        self.processed_data_dict[state_name].append(new_data_entry)
 
             # Calculate total for each state and update data dictionary
             for state_name in self.processed_data_dict:
@@ -268,7 +280,7 @@ class CSPDataParser:
                         statute["practiceCategories"].sort(key=lambda x: x["practiceCategoryName"])
 
             # remap state names to abbreviations
-            self.processed_data_dict = self.remap_state_name_to_abbreviation(self.processed_data_dict)
+            self.processed_data_dict = self.state_lookup.remap_state_names_to_abbreviations(self.processed_data_dict)
 
             # add year to the data
             tmp_output = dict()
@@ -285,63 +297,62 @@ class CSPDataParser:
                             if practice['practiceCategoryName'].lower() == 'pastured cropland':
                                 practice['practiceCategoryName'] = 'Grassland'
 
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/csp/csp_map_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(tmp_output, indent=4))
-
-        # 2. Generate state distribution data
-        if True:
-            total_payments_by_state = csp_data[
-                ["state", "payments"]].groupby(["state"])["payments"].sum()
-            total_payments_at_national_level = round(csp_data["payments"].sum(), 2)
-
-            total_payments_by_category_by_state = csp_data[
-                ["state", "category_name", "payments"]].groupby(
-                ["state", "category_name"]
-            )["payments"].sum()
-
-            total_payments_by_category_at_national_level = round(
-                csp_data[["category_name", "payments"]].groupby(["category_name"]).sum(), 2)
+        # Write processed_data_dict as JSON data
+        # Stream the map data state by state and year by year instead of serializing it into one string
+        with measure_stage("csp", "write"):
+            write_json_file(os.path.join(self.output_folder, "csp_map_data.json"), tmp_output, indent=4,
+                            compact=self.compact_json, stream_depth=4, sidecar_compressions=self.sidecar_compressions)
 
-            total_payments_by_statute = csp_data[
-                ["statute_name", "payments"]].groupby(
-                ["statute_name"]
-            )["payments"].sum()
-
-            # Iterate through all tuples
-            for state_name, payment in total_payments_by_state.items():
-                yearly_state_payment = round(payment, 2)
-
-                new_data_entry = {
-                    "statutes": [
-                        {
-                            "statuteName": "2018 Practices",
-                            "totalPaymentInDollars": 0.0,
-                            "practiceCategories": [
-                            ]
-                        },
-                        {
-                            "statuteName": "2014 Eligible Land",
-                            "totalPaymentInDollars": 0.0,
-                            "practiceCategories": [
-                            ]
-                        }
-                    ],
-                    "totalPaymentInPercentageNationwide": round(
-                        (yearly_state_payment / total_payments_at_national_level) * 100, 2),
-                    "totalPaymentInDollars": yearly_state_payment
-                }
-
-                for data_tuple, category_payment in total_payments_by_category_by_state.items():
-                    data_tuple_state_name, category_name = data_tuple
+        # 2. Generate state distribution data, for every year window
+        with measure_stage("csp", "build JSON"):
+            tmp_output = dict()
+            for start_year, end_year in self.year_windows:
+                year_window_key = get_year_window_key(start_year, end_year)
+                self.state_distribution_data_dict = dict()
+
+                total_payments_by_state = yearly_sums.get_window_totals(start_year, end_year, ["state"])["payments"]
+                total_payments_at_national_level = round(
+                    yearly_sums.get_window_totals(start_year, end_year)["payments"], 2)
+
+                total_payments_by_category_by_state = yearly_sums.get_window_totals(
+                    start_year, end_year, ["state", "category_name"])["payments"]
+
+                total_payments_by_category_at_national_level = round(
+                    yearly_sums.get_window_totals(start_year, end_year, ["category_name"]), 2)
+
+                total_payments_by_statute = yearly_sums.get_window_totals(
+                    start_year, end_year, ["statute_name"])["payments"]
+
+                category_distribution_by_state = self.get_category_distribution_by_state(
+                    total_payments_by_category_by_state, total_payments_by_state,
+                    total_payments_by_category_at_national_level["payments"])
+
+                # Iterate through all tuples
+                for state_name, payment in total_payments_by_state.items():
+                    yearly_state_payment = round(payment, 2)
+
+                    new_data_entry = {
+                        "statutes": [
+                            {
+                                "statuteName": "2018 Practices",
+                                "totalPaymentInDollars": 0.0,
+                                "practiceCategories": [
+                                ]
+                            },
+                            {
+                                "statuteName": "2014 Eligible Land",
+                                "totalPaymentInDollars": 0.0,
+                                "practiceCategories": [
+                                ]
+                            }
+                        ],
+                        "totalPaymentInPercentageNationwide": round(
+                            (yearly_state_payment / total_payments_at_national_level) * 100, 2),
+                        "totalPaymentInDollars": yearly_state_payment
+                    }
 
-                    if data_tuple_state_name == state_name:
-                        category_payment = round(category_payment, 2)
-                        category_percentage_nationwide = round(
-                            (category_payment / total_payments_by_category_at_national_level["payments"][
-                                category_name]) * 100, 2)
-                        category_percentage_within_state = round(
-                            (category_payment / total_payments_by_state[data_tuple_state_name]) * 100, 2)
+                    for category_name, category_payment, category_percentage_nationwide, \
+                            category_percentage_within_state in category_distribution_by_state.get(state_name, []):
                         statute_name = self.find_statute_by_category(category_name)
 
                         for statute in new_data_entry["statutes"]:
@@ -354,72 +365,76 @@ class CSPDataParser:
                                 })
                                 statute["totalPaymentInDollars"] += category_payment
 
-                self.state_distribution_data_dict[state_name] = [new_data_entry]
-
-            # Add zero entries and additional percentages
-            for state_name in self.state_distribution_data_dict:
-                for year_data in self.state_distribution_data_dict[state_name]:
-                    for statute in year_data["statutes"]:
-                        statue_categories_list = []
-                        for statute_category in statute["practiceCategories"]:
-                            statue_categories_list.append(statute_category["practiceCategoryName"])
-                        zero_entries = self.find_and_get_zero_practice_category_entries(statute["statuteName"],
-                                                                                        statue_categories_list, True)
-                        statute["practiceCategories"] = always_merger.merge(
-                            statute["practiceCategories"], zero_entries)
-
-                        # Sort categories by percentages
-                        statute["practiceCategories"].sort(reverse=True,
-                                                           key=lambda x: x["totalPaymentInPercentageWithinState"])
-
-                        statute["totalPaymentInPercentageWithinState"] = round(
-                            statute["totalPaymentInDollars"] / year_data["totalPaymentInDollars"] * 100, 2)
-
-                        statute["totalPaymentInPercentageNationwide"] = round(
-                            statute["totalPaymentInDollars"] / total_payments_by_statute[
-                                statute["statuteName"]] * 100, 2)
-
-            # Sort states by decreasing order of percentages
-            self.state_distribution_data_dict = dict(sorted(self.state_distribution_data_dict.items(),
-                                                            key=lambda x: x[1][0]["totalPaymentInPercentageNationwide"],
-                                                            reverse=True))
-
-            # remap state names to abbreviations
-            self.state_distribution_data_dict = \
-                self.remap_state_name_to_abbreviation(self.state_distribution_data_dict)
-
-            # restructure json to equivalent to acep or rcpp
-            restructured_list = []
+                    self.state_distribution_data_dict[state_name] = [new_data_entry]
+
+                # Add zero entries and additional percentages
+                for state_name in self.state_distribution_data_dict:
+                    for year_data in self.state_distribution_data_dict[state_name]:
+                        for statute in year_data["statutes"]:
+                            statue_categories_list = []
+                            for statute_category in statute["practiceCategories"]:
+                                statue_categories_list.append(statute_category["practiceCategoryName"])
+                            zero_entries = self.find_and_get_zero_practice_category_entries(
+                                statute["statuteName"], statue_categories_list, True)
+                            statute["practiceCategories"] = always_merger.merge(
+                                statute["practiceCategories"], zero_entries)
+
+                            # Sort categories by percentages
+                            statute["practiceCategories"].sort(reverse=True,
+                                                               key=lambda x: x["totalPaymentInPercentageWithinState"])
+
+                            statute["totalPaymentInPercentageWithinState"] = round(
+                                statute["totalPaymentInDollars"] / year_data["totalPaymentInDollars"] * 100, 2)
+
+                            statute["totalPaymentInPercentageNationwide"] = round(
+                                statute["totalPaymentInDollars"] / total_payments_by_statute[
+                                    statute["statuteName"]] * 100, 2)
+
+                # Sort states by decreasing order of percentages
+                self.state_distribution_data_dict = dict(
+                    sorted(self.state_distribution_data_dict.items(),
+                           key=lambda x: x[1][0]["totalPaymentInPercentageNationwide"], reverse=True))
+
+                # remap state names to abbreviations
+                self.state_distribution_data_dict = \
+                    self.state_lookup.remap_state_names_to_abbreviations(self.state_distribution_data_dict)
+
+                # restructure json to equivalent to acep or rcpp
+                restructured_list = []
+
+                for state, state_data in self.state_distribution_data_dict.items():
+                    for entry in state_data:
+                        restructured_list.append({
+                            'state': state,
+                            'totalPaymentInDollars': entry['totalPaymentInDollars'],
+                            'totalPaymentInPercentageNationwide': entry['totalPaymentInPercentageNationwide'],
+                            'statutes': entry['statutes']
+                        })
 
-            for state, state_data in self.state_distribution_data_dict.items():
-                for entry in state_data:
-                    restructured_list.append({
-                        'state': state,
-                        'totalPaymentInDollars': entry['totalPaymentInDollars'],
-                        'totalPaymentInPercentageNationwide': entry['totalPaymentInPercentageNationwide'],
-                        'statutes': entry['statutes']
-                    })
+                # add year to the tmp_output
+                tmp_output[year_window_key] = restructured_list
 
-            # add year to the data
-            tmp_output = dict()
-            tmp_output[str(self.start_year) + "-" + str(self.end_year)] = []
+                # rename Pastured cropland to Grassland in tmp_output
+                for entry in tmp_output[year_window_key]:
+                    for statute in entry['statutes']:
+                        for practice in statute['practiceCategories']:
+                            if practice['practiceCategoryName'].lower() == 'pastured cropland':
+                                practice['practiceCategoryName'] = 'Grassland'
 
-            # add year to the tmp_output
-            tmp_output[str(self.start_year) + "-" + str(self.end_year)] = restructured_list
+        # Write processed_data_dict as JSON data
+        with measure_stage("csp", "serialize"):
+            output_json = serialize_json(tmp_output, indent=4)
+        with measure_stage("csp", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "csp_state_distribution_data.json"), output_json,
+                                  tmp_output)
+
+        # 3. Generate practice categories data for the donut chart, for the parser's own year window only
+        with measure_stage("csp", "build JSON"):
+            total_payments_at_national_level = round(
+                yearly_sums.get_window_totals(self.start_year, self.end_year)["payments"], 2)
+            total_payments_by_category_at_national_level = round(
+                yearly_sums.get_window_totals(self.start_year, self.end_year, ["category_name"]), 2)
 
-            # rename Pastured cropland to Grassland in tmp_output
-            for entry in tmp_output[str(self.start_year) + "-" + str(self.end_year)]:
-                for statute in entry['statutes']:
-                    for practice in statute['practiceCategories']:
-                        if practice['practiceCategoryName'].lower() == 'pastured cropland':
-                            practice['practiceCategoryName'] = 'Grassland'
-
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/csp/csp_state_distribution_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(tmp_output, indent=4))
-
-        # 3. Generate practice categories data for the donut chart
-        if True:
             statutes_data = {
                 "statutes": [
                     {
@@ -476,28 +491,23 @@ class CSPDataParser:
                     if practice['practiceCategoryName'].lower() == 'pastured cropland':
                         practice['practiceCategoryName'] = 'Grassland'
 
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/csp/csp_practice_categories_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(statutes_data, indent=4))
-
-    def remap_state_name_to_abbreviation(self, input_dict):
-        # remap state names to abbreviations
-        # Create a copy of the keys to avoid the "dictionary keys changed during iteration" error
-        state_names = list(input_dict.keys())
-
-        # Iterate over the state names
-        for state_name in state_names:
-            # Check if the value of state_name is in the values of the us_state_abbreviation dictionary
-            if state_name in self.us_state_abbreviations.values():
-                # Replace the state_name with the corresponding abbreviation
-                state_abbr = \
-                    [abbr for abbr, name in self.us_state_abbreviations.items() if name == state_name][0]
-                # Create a new entry with the updated key
-                input_dict[state_abbr] = input_dict.pop(state_name)
-
-        return input_dict
+        # Write processed_data_dict as JSON data
+        with measure_stage("csp", "serialize"):
+            output_json = serialize_json(statutes_data, indent=4)
+        with measure_stage("csp", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "csp_practice_categories_data.json"), output_json,
+                                  statutes_data)
 
 
 if __name__ == '__main__':
-    commodities_data_parser = CSPDataParser(2018, 2022, "../title-2-conservation/csp/CSPcategoriesUPDATE.csv")
+    argument_parser = argparse.ArgumentParser(description="Generate CSP JSON data files.")
+    add_output_arguments(argument_parser)
+    arguments = argument_parser.parse_args()
+    apply_output_arguments(arguments, argument_parser)
+
+    data_folder = os.path.join("title-2-conservation", "csp")
+    commodities_data_parser = CSPDataParser(2018, 2022, os.path.join(data_folder, "CSPcategoriesUPDATE.csv"),
+                                            arguments.compact, arguments.sidecar or ())
     commodities_data_parser.parse_and_process()
+    emit_report()
+    emit_output_summary()
@@ -1,15 +1,23 @@
-import json
 import os
 
 import pandas as pd
 
+from utils.csv_cache import read_csv_cached
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import emit_output_summary, serialize_json, write_serialized_json
+from utils.states import StateLookup
+from utils.year_windows import YearlySums, get_year_window_key, get_year_windows
+
 
 class DairyDisasterParser:
     def __init__(self, start_year, end_year, program_main_category_name, data_folder, program_csv_filename, **kwargs):
         self.start_year = start_year
         self.end_year = end_year
+        self.year_windows = get_year_windows(start_year, end_year, kwargs.get("year_windows"))
         self.program_main_category_name = program_main_category_name
         self.data_folder = data_folder
+        # Output files are written next to the input files unless another folder is given
+        self.output_folder = kwargs.get("output_folder", data_folder)
         self.program_csv_filepath = os.path.join(data_folder, program_csv_filename)
         self.program_data = None
         self.dairy_data = None
@@ -21,562 +29,278 @@ class DairyDisasterParser:
         self.disaster_state_distribution_data_dict = dict()
         self.disaster_program_data_dict = dict()
 
-        self.us_state_abbreviations = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming'
+        self.metadata = {
+            "column_dtypes_map": {
+                "year": "int64",
+                "state": "str",
+                "program": "str",
+                "payments": "float64",
+                "count": "float64"
+            },
+            # Every metric is aggregated by state and program, and each subtitle adds up the programs listed in it
+            # by their code in the CSV file and their name in the JSON files
+            "aggregation_spec": {
+                "metrics": {
+                    "payments": "sum",
+                    "count": "sum"
+                },
+                "subtitles": {
+                    "dmc": {
+                        "subtitle_name": "Dairy Margin Coverage, Subtitle D",
+                        "programs_map": {
+                            "Dairy": "Dairy Margin Coverage (DMC)"
+                        }
+                    },
+                    "sada": {
+                        "subtitle_name": "Supplemental Agricultural Disaster Assistance, Subtitle E",
+                        "programs_map": {
+                            "ELAP": "Emergency Assistance for Livestock, Honey Bees, and Farm-Raised Fish Program (ELAP)",
+                            "LFP": "Livestock Forage Program (LFP)",
+                            "LIP": "Livestock Indemnity Payments (LIP)",
+                            "TAP": "Tree Assistance Program (TAP)"
+                        }
+                    }
+                }
+            }
         }
 
+        # Key of the subtitle total among the programs of a subtitle
+        self.subtitle_total_key = "Total"
+
+        self.state_lookup = StateLookup()
+
     def parse_and_process(self):
         # Import CSV file into a Pandas DataFrame
-        program_data = pd.read_csv(self.program_csv_filepath)
-
-        # some columns have empty values and this makes the rows type as object
-        # this makes the process of SUM errors since those are object not number
-        # so the columns should be numeric all the time
-        # make sure every number columns be number
-        program_data[["payments",
-                      "count"]] = \
-            program_data[["payments",
-                          "count"]].apply(pd.to_numeric)
+        with measure_stage("dairy-disaster", "load"):
+            program_data = read_csv_cached(self.program_csv_filepath, self.metadata["column_dtypes_map"])
 
         # Filter only relevant years' data
-        program_data = program_data[program_data["year"].between(self.start_year, self.end_year, inclusive="both")]
+        with measure_stage("dairy-disaster", "filter"):
+            program_data = program_data[program_data["year"].between(
+                min(start_year for start_year, end_year in self.year_windows),
+                max(end_year for start_year, end_year in self.year_windows), inclusive="both")]
+
+        # Programs missing from the spec would be left out of every subtitle total
+        self.__check_program_codes(program_data)
 
         # find the total number of years
         total_years = self.end_year - self.start_year + 1
 
-        # Filter only dairy data
-        dairy_data = program_data[program_data["program"] == "Dairy"]
+        # Sum every metric by year, state and program once, then compute the values of every subtitle in every year
+        # window from these sums
+        with measure_stage("dairy-disaster", "aggregate"):
+            yearly_sums = YearlySums(program_data, "year", ["state", "program"],
+                                     list(self.metadata["aggregation_spec"]["metrics"]))
+
+            subtitle_values_by_year_window = dict()
+            for start_year, end_year in self.year_windows:
+                sums_by_state_and_program = self.__sum_by_state_and_program(yearly_sums, start_year, end_year)
+                subtitle_values_by_year_window[get_year_window_key(start_year, end_year)] = {
+                    subtitle: self.__aggregate_subtitle(sums_by_state_and_program, subtitle,
+                                                        end_year - start_year + 1)
+                    for subtitle in self.metadata["aggregation_spec"]["subtitles"]
+                }
 
-        # Filter only disaster data
-        disaster_data = program_data[program_data["program"] != "Dairy"]
+            # The subprograms data is only generated for the parser's own year window
+            national_sums_by_program = self.__sum_by_state_and_program(
+                yearly_sums, self.start_year, self.end_year).groupby(level="program").sum()
 
         ###############################################################
         # dairy data process
         ###############################################################
         # 1. Generate State Distribution JSON Data for Dairy
-        self.dairy_state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)] = []
-
-        # calculate national level values
-        total_dairy_payments_at_national_level = dairy_data["payments"].sum()
-        total_dairy_count_at_national_level = int(dairy_data["count"].sum())
-        average_dairy_count_at_national_level = total_dairy_count_at_national_level / total_years
-
-        # group total data by state, then sum
-        sum_by_dairy_payments_by_state = \
-            dairy_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-
-        sum_by_dairy_count_by_state = \
-            dairy_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        for state_abbr in self.us_state_abbreviations:
-            state = self.us_state_abbreviations[state_abbr]
-            # if there is a zero division problem in with state percentage
-            within_state_payments = 0
-            within_state_count = 0
-
-            dairy_payments_percentage_nation = 0.00
-            dairy_count_percentage_nation = 0.00
-            average_dairy_count_percentage_nation = 0.00
-
-            if total_dairy_payments_at_national_level > 0:
-                dairy_payments_percentage_nation = \
-                    round((sum_by_dairy_payments_by_state[state].item() /
-                           total_dairy_payments_at_national_level) * 100, 2)
-            if total_dairy_count_at_national_level > 0:
-                dairy_count_percentage_nation = \
-                    round((sum_by_dairy_count_by_state[state].item() /
-                           total_dairy_count_at_national_level) * 100, 2)
-            if average_dairy_count_at_national_level > 0:
-                average_dairy_count_percentage_nation = \
-                    round(((sum_by_dairy_count_by_state[state].item() / total_years) /
-                           average_dairy_count_at_national_level) * 100, 2)
-
-            new_data_entry = {
-                "state": state_abbr,
-                "subtitleName": "Dairy Margin Coverage, Subtitle D",
-                "totalCounts": int(sum_by_dairy_count_by_state[state].item()),
-                "totalPaymentInDollars": round(sum_by_dairy_payments_by_state[state].item(), 2),
-                "averageRecipientCount": round(sum_by_dairy_count_by_state[state].item() / total_years, 2),
-                "totalPaymentInPercentageNationwide": dairy_payments_percentage_nation,
-                "totalCountsInPercentageNationwide": dairy_count_percentage_nation,
-                "averageRecipientCountInPercentageNationwide": average_dairy_count_percentage_nation,
-                "programs": []
-            }
+        dmc_spec = self.metadata["aggregation_spec"]["subtitles"]["dmc"]
+
+        with measure_stage("dairy-disaster", "build JSON"):
+            for year_window_key, subtitle_values in subtitle_values_by_year_window.items():
+                self.dairy_state_distribution_data_dict[year_window_key] = []
+                for state_abbr, state in self.state_lookup.names_by_abbreviation.items():
+                    new_data_entry = {
+                        "state": state_abbr,
+                        "subtitleName": dmc_spec["subtitle_name"],
+                        **self.__nationwide_values(subtitle_values["dmc"][(state, self.subtitle_total_key)]),
+                        "programs": []
+                    }
 
-            self.dairy_state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)].append(
-                new_data_entry)
+                    self.dairy_state_distribution_data_dict[year_window_key].append(new_data_entry)
 
-        # Sort states by decreasing order of financial assistance payments
-        for year in self.dairy_state_distribution_data_dict:
-            self.dairy_state_distribution_data_dict[year] = \
-                sorted(self.dairy_state_distribution_data_dict[year],
-                       key=lambda x: x["totalPaymentInDollars"], reverse=True)
+            # Sort states by decreasing order of financial assistance payments
+            for year in self.dairy_state_distribution_data_dict:
+                self.dairy_state_distribution_data_dict[year] = \
+                    sorted(self.dairy_state_distribution_data_dict[year],
+                           key=lambda x: x["totalPaymentInDollars"], reverse=True)
 
         # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "dmc_state_distribution_data.json"),
-                  "w") as output_json_file:
-            output_json_file.write(json.dumps(self.dairy_state_distribution_data_dict, indent=2))
+        with measure_stage("dairy-disaster", "serialize"):
+            output_json = serialize_json(self.dairy_state_distribution_data_dict, indent=2)
+        with measure_stage("dairy-disaster", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "dmc_state_distribution_data.json"), output_json,
+                                  self.dairy_state_distribution_data_dict)
 
         # 2. Generate Sub Programs Data
-        # Group total
-        dairy_total_by_payments = \
-            dairy_data["payments"].sum()
-
-        dairy_total_by_count = \
-            program_data["count"].sum()
-
-        self.dairy_program_data_dict = {
-            "subtitleName": "Dairy Margin Coverage, Subtitle D",
-            "totalPaymentInDollars": round(dairy_total_by_payments.item(), 2),
-            "totalCounts": int(dairy_total_by_count.item()),
-            "averageRecipientCount": round(dairy_total_by_count.item() / total_years, 2),
-            "programs": []
-        }
+        with measure_stage("dairy-disaster", "build JSON"):
+            dairy_total_by_payments = national_sums_by_program.loc[list(dmc_spec["programs_map"]), "payments"].sum()
+            # The total count has always been the count of every program in the file
+            dairy_total_by_count = national_sums_by_program["count"].sum()
+
+            self.dairy_program_data_dict = {
+                "subtitleName": dmc_spec["subtitle_name"],
+                "totalPaymentInDollars": round(dairy_total_by_payments.item(), 2),
+                "totalCounts": int(dairy_total_by_count.item()),
+                "averageRecipientCount": round(dairy_total_by_count.item() / total_years, 2),
+                "programs": []
+            }
 
         # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "dmc_subprograms_data.json"), "w") as output_json_file:
-            output_json_file.write(json.dumps(self.dairy_program_data_dict, indent=2))
+        with measure_stage("dairy-disaster", "serialize"):
+            output_json = serialize_json(self.dairy_program_data_dict, indent=2)
+        with measure_stage("dairy-disaster", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "dmc_subprograms_data.json"), output_json,
+                                  self.dairy_program_data_dict)
 
         ###############################################################
         # disaster data process
         ###############################################################
-        # 1. Generate State Distribution JSON Data for Dairy
-        elap_data = disaster_data[disaster_data["program"] == "ELAP"]
-        lfp_data = disaster_data[disaster_data["program"] == "LFP"]
-        lip_data = disaster_data[disaster_data["program"] == "LIP"]
-        tap_data = disaster_data[disaster_data["program"] == "TAP"]
+        # 1. Generate State Distribution JSON Data for Disaster
+        sada_spec = self.metadata["aggregation_spec"]["subtitles"]["sada"]
+
+        with measure_stage("dairy-disaster", "build JSON"):
+            for year_window_key, subtitle_values in subtitle_values_by_year_window.items():
+                self.disaster_state_distribution_data_dict[year_window_key] = []
+                for state_abbr, state in self.state_lookup.names_by_abbreviation.items():
+                    new_data_entry = {
+                        "state": state_abbr,
+                        "subtitleName": sada_spec["subtitle_name"],
+                        **self.__nationwide_values(subtitle_values["sada"][(state, self.subtitle_total_key)]),
+                        "programs": [
+                            {
+                                "programName": program_name,
+                                **subtitle_values["sada"][(state, program_code)],
+                                "subPrograms": []
+                            }
+                            for program_code, program_name in sada_spec["programs_map"].items()
+                        ]
+                    }
 
-        self.disaster_state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)] = []
+                    self.disaster_state_distribution_data_dict[year_window_key].append(new_data_entry)
 
-        # calculate total number of years
-        total_years = self.end_year - self.start_year + 1
+            # Sort states by decreasing order of financial assistance payments
+            for year in self.disaster_state_distribution_data_dict:
+                self.disaster_state_distribution_data_dict[year] = \
+                    sorted(self.disaster_state_distribution_data_dict[year],
+                           key=lambda x: ["totalPaymentInDollars"], reverse=True)
 
-        # calculate national level values
-        total_disaster_payments_at_national_level = disaster_data["payments"].sum()
-        total_disaster_count_at_national_level = int(
-            disaster_data["count"].sum())
-        average_disaster_count_at_national_level = total_disaster_count_at_national_level / total_years
-        total_elap_payments_at_national_level = elap_data["payments"].sum()
-        total_elap_count_at_national_level = int(elap_data["count"].sum())
-        average_elap_count_at_national_level = total_elap_count_at_national_level / total_years
-        total_lfp_payments_at_national_level = lfp_data["payments"].sum()
-        total_lfp_count_at_national_level = int(lfp_data["count"].sum())
-        average_lfp_count_at_national_level = total_lfp_count_at_national_level / total_years
-        total_lip_payments_at_national_level = lip_data["payments"].sum()
-        total_lip_count_at_national_level = int(lip_data["count"].sum())
-        average_lip_count_at_national_level = total_lip_count_at_national_level / total_years
-        total_tap_payments_at_national_level = tap_data["payments"].sum()
-        total_tap_count_at_national_level = int(tap_data["count"].sum())
-        average_tap_count_at_national_level = total_tap_count_at_national_level / total_years
-
-        # group total data by state, then sum
-        sum_by_disaster_payments_by_state = \
-            disaster_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-
-        sum_by_disaster_count_by_state = \
-            disaster_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        sum_by_elap_payments_by_state = \
-            elap_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-        sum_by_elap_count_by_state = \
-            elap_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        sum_by_lfp_payments_by_state = \
-            lfp_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-        sum_by_lfp_count_by_state = \
-            lfp_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        sum_by_lip_payments_by_state = \
-            lip_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-        sum_by_lip_count_by_state = \
-            lip_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        sum_by_tap_payments_by_state = \
-            tap_data[
-                ["year", "state", "payments"]
-            ].groupby(
-                ["state"]
-            )["payments"].sum()
-        sum_by_tap_count_by_state = \
-            tap_data[
-                ["year", "state", "count"]
-            ].groupby(
-                ["state"]
-            )["count"].sum()
-
-        for state_abbr in self.us_state_abbreviations:
-            state = self.us_state_abbreviations[state_abbr]
-
-            disaster_payments_percentage_nation = 0.00
-            disaster_count_percentage_nation = 0.00
-            average_disaster_count_percentage_nation = 0.00
-            elap_payments_percentage_nation = 0.00
-            elap_count_percentage_nation = 0.00
-            average_elap_count_percentage_nation = 0.00
-            lfp_payments_percentage_nation = 0.00
-            lfp_count_percentage_nation = 0.00
-            average_lfp_count_percentage_nation = 0.00
-            lip_payments_percentage_nation = 0.00
-            lip_count_percentage_nation = 0.00
-            average_lip_count_percentage_nation = 0.00
-            tap_payments_percentage_nation = 0.00
-            tap_count_percentage_nation = 0.00
-            average_tap_count_percentage_nation = 0.00
-
-            if total_disaster_payments_at_national_level > 0:
-                disaster_payments_percentage_nation = \
-                    round((sum_by_disaster_payments_by_state[state].item() /
-                           total_disaster_payments_at_national_level) * 100, 2)
-            if total_disaster_count_at_national_level > 0:
-                disaster_count_percentage_nation = \
-                    round((sum_by_disaster_count_by_state[state].item() /
-                           total_disaster_count_at_national_level) * 100, 2)
-            if average_disaster_count_at_national_level > 0:
-                average_disaster_count_percentage_nation = \
-                    round(((sum_by_disaster_count_by_state[state].item() / total_years) /
-                           average_disaster_count_at_national_level) * 100, 2)
-            if total_elap_payments_at_national_level > 0:
-                elap_payments_percentage_nation = \
-                    round((sum_by_elap_payments_by_state[state].item() /
-                           total_elap_payments_at_national_level) * 100, 2)
-            if total_elap_count_at_national_level > 0:
-                elap_count_percentage_nation = \
-                    round((sum_by_elap_count_by_state[state].item() /
-                           total_elap_count_at_national_level) * 100, 2)
-            if average_elap_count_at_national_level > 0:
-                average_elap_count_percentage_nation = \
-                    round(((sum_by_elap_count_by_state[state].item() / total_years) /
-                           average_elap_count_at_national_level) * 100, 2)
-            if total_lfp_payments_at_national_level > 0:
-                lfp_payments_percentage_nation = \
-                    round((sum_by_lfp_payments_by_state[state].item() /
-                           total_lfp_payments_at_national_level) * 100, 2)
-            if total_lfp_count_at_national_level > 0:
-                lfp_count_percentage_nation = \
-                    round((sum_by_lfp_count_by_state[state].item() /
-                           total_lfp_count_at_national_level) * 100, 2)
-            if average_lfp_count_at_national_level > 0:
-                average_lfp_count_percentage_nation = \
-                    round(((sum_by_lfp_count_by_state[state].item() / total_years) /
-                           average_lfp_count_at_national_level) * 100, 2)
-            if total_lip_payments_at_national_level > 0:
-                lip_payments_percentage_nation = \
-                    round((sum_by_lip_payments_by_state[state].item() /
-                           total_lip_payments_at_national_level) * 100, 2)
-            if total_lip_count_at_national_level > 0:
-                lip_count_percentage_nation = \
-                    round((sum_by_lip_count_by_state[state].item() /
-                           total_lip_count_at_national_level) * 100, 2)
-            if average_lip_count_at_national_level > 0:
-                average_lip_count_percentage_nation = \
-                    round(((sum_by_lip_count_by_state[state].item() / total_years) /
-                           average_lip_count_at_national_level) * 100, 2)
-            if total_tap_payments_at_national_level > 0:
-                tap_payments_percentage_nation = \
-                    round((sum_by_tap_payments_by_state[state].item() /
-                           total_tap_payments_at_national_level) * 100, 2)
-            if total_tap_count_at_national_level > 0:
-                tap_count_percentage_nation = \
-                    round((sum_by_tap_count_by_state[state].item() /
-                           total_tap_count_at_national_level) * 100, 2)
-            if average_tap_count_at_national_level > 0:
-                average_tap_count_percentage_nation = \
-                    round(((sum_by_tap_count_by_state[state].item() / total_years) /
-                           average_tap_count_at_national_level) * 100, 2)
-
-            within_state_elap_percentage_payments = 0.0
-            within_state_elap_percentage_count = 0.0
-            within_state_elap_average_percentage_count = 0.0
-            within_state_lfp_percentage_payments = 0.0
-            within_state_lfp_percentage_count = 0.0
-            within_state_lfp_average_percentage_count = 0.0
-            within_state_lip_percentage_payments = 0.0
-            within_state_lip_percentage_count = 0.0
-            within_state_lip_average_percentage_count = 0.0
-            within_state_tap_percentage_payments = 0.0
-            within_state_tap_percentage_count = 0.0
-            within_state_tap_average_percentage_count = 0.0
-
-            if int(sum_by_elap_payments_by_state[state].item()) != 0:
-                within_state_elap_percentage_payments = \
-                    round((sum_by_elap_payments_by_state[state].item() /
-                           sum_by_disaster_payments_by_state[state].item()) * 100, 2)
-            if int(sum_by_elap_count_by_state[state].item()) != 0:
-                within_state_elap_percentage_count = \
-                    round((sum_by_elap_count_by_state[state].item() /
-                           sum_by_disaster_count_by_state[state].item()) * 100, 2)
-            if int(sum_by_lfp_payments_by_state[state].item()) != 0:
-                within_state_lfp_percentage_payments = \
-                    round((sum_by_lfp_payments_by_state[state].item() /
-                           sum_by_disaster_payments_by_state[state].item()) * 100, 2)
-            if int(sum_by_lfp_count_by_state[state].item()) != 0:
-                within_state_lfp_percentage_count = \
-                    round((sum_by_lfp_count_by_state[state].item() /
-                           sum_by_disaster_count_by_state[state].item()) * 100, 2)
-            if int(sum_by_lip_payments_by_state[state].item()) != 0:
-                within_state_lip_percentage_payments = \
-                    round((sum_by_lip_payments_by_state[state].item() /
-                           sum_by_disaster_payments_by_state[state].item()) * 100, 2)
-            if int(sum_by_lip_count_by_state[state].item()) != 0:
-                within_state_lip_percentage_count = \
-                    round((sum_by_lip_count_by_state[state].item() /
-                           sum_by_disaster_count_by_state[state].item()) * 100, 2)
-            if int(sum_by_tap_payments_by_state[state].item()) != 0:
-                within_state_tap_percentage_payments = \
-                    round((sum_by_tap_payments_by_state[state].item() /
-                           sum_by_disaster_payments_by_state[state].item()) * 100, 2)
-            if int(sum_by_tap_count_by_state[state].item()) != 0:
-                within_state_tap_percentage_count = \
-                    round((sum_by_tap_count_by_state[state].item() /
-                           sum_by_disaster_count_by_state[state].item()) * 100, 2)
-            if int(sum_by_disaster_count_by_state[state].item()) != 0:
-                within_state_elap_average_percentage_count = \
-                    round(((sum_by_elap_count_by_state[state].item() / total_years) /
-                           (sum_by_disaster_count_by_state[state].item() / total_years)) * 100, 2)
-                within_state_lfp_average_percentage_count = \
-                    round(((sum_by_lfp_count_by_state[state].item() / total_years) /
-                           (sum_by_disaster_count_by_state[state].item() / total_years)) * 100, 2)
-                within_state_lip_average_percentage_count = \
-                    round(((sum_by_lip_count_by_state[state].item() / total_years) /
-                           (sum_by_disaster_count_by_state[state].item() / total_years)) * 100, 2)
-                within_state_tap_average_percentage_count = \
-                    round(((sum_by_tap_count_by_state[state].item() / total_years) /
-                           (sum_by_disaster_count_by_state[state].item() / total_years)) * 100, 2)
-
-            new_data_entry = {
-                "state": state_abbr,
-                "subtitleName": "Supplemental Agricultural Disaster Assistance, Subtitle E",
-                "totalCounts": int(sum_by_disaster_count_by_state[state].item()),
-                "totalPaymentInDollars": round(sum_by_disaster_payments_by_state[state].item(), 2),
-                "averageRecipientCount": round(sum_by_disaster_count_by_state[state].item() / total_years, 2),
-                "totalPaymentInPercentageNationwide": disaster_payments_percentage_nation,
-                "totalCountsInPercentageNationwide": disaster_count_percentage_nation,
-                "averageRecipientCountInPercentageNationwide": average_disaster_count_percentage_nation,
+        # Write processed_data_dict as JSON data
+        with measure_stage("dairy-disaster", "serialize"):
+            output_json = serialize_json(self.disaster_state_distribution_data_dict, indent=2)
+        with measure_stage("dairy-disaster", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "sada_state_distribution_data.json"), output_json,
+                                  self.disaster_state_distribution_data_dict)
+
+        # 2. Generate Sub Programs Data
+        with measure_stage("dairy-disaster", "build JSON"):
+            sada_national_sums = national_sums_by_program.reindex(list(sada_spec["programs_map"]), fill_value=0.0)
+            disaster_total_by_payments = sada_national_sums["payments"].sum()
+            disaster_total_by_count = sada_national_sums["count"].sum()
+
+            self.disaster_program_data_dict = {
+                "subtitleName": sada_spec["subtitle_name"],
+                "totalPaymentInDollars": round(disaster_total_by_payments.item(), 2),
+                "totalCounts": int(disaster_total_by_count.item()),
+                "averageRecipientCount": round(disaster_total_by_count.item() / total_years, 2),
                 "programs": [
                     {
-                        "programName": "Emergency Assistance for Livestock, Honey Bees, and Farm-Raised Fish Program (ELAP)",
-                        "totalCounts": int(sum_by_elap_count_by_state[state].item()),
-                        "totalPaymentInDollars": round(sum_by_elap_payments_by_state[state].item(), 2),
-                        "averageRecipientCount": round(sum_by_elap_count_by_state[state].item() / total_years,
-                                                       2),
-                        "totalPaymentInPercentageNationwide": elap_payments_percentage_nation,
-                        "totalCountsInPercentageNationwide": elap_count_percentage_nation,
-                        "averageRecipientCountInPercentageNationwide": average_elap_count_percentage_nation,
-                        "totalPaymentInPercentageWithinState": within_state_elap_percentage_payments,
-                        "totalCountsInPercentageWithinState": within_state_elap_percentage_count,
-                        "averageRecipientCountInPercentageWithinState": within_state_elap_average_percentage_count,
-                        "subPrograms": []
-                    },
-                    {
-                        "programName": "Livestock Forage Program (LFP)",
-                        "totalCounts": int(sum_by_lfp_count_by_state[state].item()),
-                        "totalPaymentInDollars": round(sum_by_lfp_payments_by_state[state].item(), 2),
-                        "averageRecipientCount": round(sum_by_lfp_count_by_state[state].item() / total_years,
-                                                       2),
-                        "totalPaymentInPercentageNationwide": lfp_payments_percentage_nation,
-                        "totalCountsInPercentageNationwide": lfp_count_percentage_nation,
-                        "averageRecipientCountInPercentageNationwide": average_lfp_count_percentage_nation,
-                        "totalPaymentInPercentageWithinState": within_state_lfp_percentage_payments,
-                        "totalCountsInPercentageWithinState": within_state_lfp_percentage_count,
-                        "averageRecipientCountInPercentageWithinState": within_state_lfp_average_percentage_count,
-                        "subPrograms": []
-                    },
-                    {
-                        "programName": "Livestock Indemnity Payments (LIP)",
-                        "totalCounts": int(sum_by_lip_count_by_state[state].item()),
-                        "totalPaymentInDollars": round(sum_by_lip_payments_by_state[state].item(), 2),
-                        "averageRecipientCount": round(sum_by_lip_count_by_state[state].item() / total_years,
-                                                       2),
-                        "totalPaymentInPercentageNationwide": lip_payments_percentage_nation,
-                        "totalCountsInPercentageNationwide": lip_count_percentage_nation,
-                        "averageRecipientCountInPercentageNationwide": average_lip_count_percentage_nation,
-                        "totalPaymentInPercentageWithinState": within_state_lip_percentage_payments,
-                        "totalCountsInPercentageWithinState": within_state_lip_percentage_count,
-                        "averageRecipientCountInPercentageWithinState": within_state_lip_average_percentage_count,
-                        "subPrograms": []
-                    },
-                    {
-                        "programName": "Tree Assistance Program (TAP)",
-                        "totalCounts": int(sum_by_tap_count_by_state[state].item()),
-                        "totalPaymentInDollars": round(sum_by_tap_payments_by_state[state].item(), 2),
-                        "averageRecipientCount": round(sum_by_tap_count_by_state[state].item() / total_years,
-                                                       2),
-                        "totalPaymentInPercentageNationwide": tap_payments_percentage_nation,
-                        "totalCountsInPercentageNationwide": tap_count_percentage_nation,
-                        "averageRecipientCountInPercentageNationwide": average_tap_count_percentage_nation,
-                        "totalPaymentInPercentageWithinState": within_state_tap_percentage_payments,
-                        "totalCountsInPercentageWithinState": within_state_tap_percentage_count,
-                        "averageRecipientCountInPercentageWithinState": within_state_tap_average_percentage_count,
-                        "subPrograms": []
+                        "programName": program_name,
+                        "totalPaymentInDollars": round(sada_national_sums.at[program_code, "payments"].item(), 2),
+                        "totalCounts": int(sada_national_sums.at[program_code, "count"].item()),
+                        "averageRecipientCount": round(
+                            sada_national_sums.at[program_code, "count"].item() / total_years, 2),
                     }
+                    for program_code, program_name in sada_spec["programs_map"].items()
                 ]
             }
 
-            self.disaster_state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)].append(
-                new_data_entry)
-
-        # Sort states by decreasing order of financial assistance payments
-        for year in self.disaster_state_distribution_data_dict:
-            self.disaster_state_distribution_data_dict[year] = \
-                sorted(self.disaster_state_distribution_data_dict[year],
-                       key=lambda x: ["totalPaymentInDollars"], reverse=True)
-
         # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "sada_state_distribution_data.json"),
-                  "w") as output_json_file:
-            output_json_file.write(json.dumps(self.disaster_state_distribution_data_dict, indent=2))
-
-        # 2. Generate Sub Programs Data
-        # Group total
-        disaster_total_by_payments = \
-            disaster_data["payments"].sum()
-        disaster_total_by_count = \
-            disaster_data["count"].sum()
-        elap_total_by_payments = \
-            elap_data["payments"].sum()
-        elap_total_by_count = \
-            elap_data["count"].sum()
-        lfp_total_by_payments = \
-            lfp_data["payments"].sum()
-        lfp_total_by_count = \
-            lfp_data["count"].sum()
-        lip_total_by_payments = \
-            lip_data["payments"].sum()
-        lip_total_by_count = \
-            lip_data["count"].sum()
-        tap_total_by_payments = \
-            tap_data["payments"].sum()
-        tap_total_by_count = \
-            tap_data["count"].sum()
-
-        self.disaster_program_data_dict = {
-            "subtitleName": "Supplemental Agricultural Disaster Assistance, Subtitle E",
-            "totalPaymentInDollars": round(disaster_total_by_payments.item(), 2),
-            "totalCounts": int(disaster_total_by_count.item()),
-            "averageRecipientCount": round(disaster_total_by_count.item() / total_years, 2),
-            "programs": [
-                {
-                    "programName": "Emergency Assistance for Livestock, Honey Bees, and Farm-Raised Fish Program (ELAP)",
-                    "totalPaymentInDollars": round(elap_total_by_payments.item(), 2),
-                    "totalCounts": int(elap_total_by_count.item()),
-                    "averageRecipientCount": round(elap_total_by_count.item() / total_years, 2),
-                },
-                {
-                    "programName": "Livestock Forage Program (LFP)",
-                    "totalPaymentInDollars": round(lfp_total_by_payments.item(), 2),
-                    "totalCounts": int(lfp_total_by_count.item()),
-                    "averageRecipientCount": round(lfp_total_by_count.item() / total_years, 2),
-                },
-                {
-                    "programName": "Livestock Indemnity Payments (LIP)",
-                    "totalPaymentInDollars": round(lip_total_by_payments.item(), 2),
-                    "totalCounts": int(lip_total_by_count.item()),
-                    "averageRecipientCount": round(lip_total_by_count.item() / total_years, 2),
-                },
-                {
-                    "programName": "Tree Assistance Program (TAP)",
-                    "totalPaymentInDollars": round(tap_total_by_payments.item(), 2),
-                    "totalCounts": int(tap_total_by_count.item()),
-                    "averageRecipientCount": round(tap_total_by_count.item() / total_years, 2),
-                }
-            ]
+        with measure_stage("dairy-disaster", "serialize"):
+            output_json = serialize_json(self.disaster_program_data_dict, indent=2)
+        with measure_stage("dairy-disaster", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "sada_subprograms_data.json"), output_json,
+                                  self.disaster_program_data_dict)
+
+    def __check_program_codes(self, program_data):
+        known_program_codes = set(program_code
+                                  for subtitle_spec in self.metadata["aggregation_spec"]["subtitles"].values()
+                                  for program_code in subtitle_spec["programs_map"])
+        unknown_program_codes = sorted(set(program_data["program"].unique()) - known_program_codes)
+        if len(unknown_program_codes) > 0:
+            raise ValueError("Unknown program codes in " + self.program_csv_filepath + ": " +
+                             ", ".join(unknown_program_codes) + " (add them to a subtitle of the aggregation spec)")
+
+    def __sum_by_state_and_program(self, yearly_sums, start_year, end_year):
+        return yearly_sums.get_window_data(start_year, end_year).groupby(["state", "program"]).agg(
+            self.metadata["aggregation_spec"]["metrics"])
+
+    def __aggregate_subtitle(self, sums_by_state_and_program, subtitle, total_years):
+        program_codes = list(self.metadata["aggregation_spec"]["subtitles"][subtitle]["programs_map"])
+        states = list(self.state_lookup.names_by_abbreviation.values())
+
+        # National sums include every state in the data, state values only the states of the lookup
+        subtitle_sums = sums_by_state_and_program[
+            sums_by_state_and_program.index.get_level_values("program").isin(program_codes)]
+        national_sums = subtitle_sums.groupby(level="program").sum().reindex(program_codes, fill_value=0.0)
+        national_sums.loc[self.subtitle_total_key] = national_sums.sum()
+
+        # One row per state and one column per program, the subtitle total is the last column
+        subtitle_sums = subtitle_sums.unstack("program", fill_value=0.0)
+        payments = subtitle_sums["payments"].reindex(index=states, columns=program_codes, fill_value=0.0)
+        payments[self.subtitle_total_key] = payments.sum(axis=1)
+        counts = subtitle_sums["count"].reindex(index=states, columns=program_codes, fill_value=0.0)
+        counts[self.subtitle_total_key] = counts.sum(axis=1)
+        averages = counts / total_years
+
+        # Percentages of the national values, zero where the national value is not positive
+        national_payments = national_sums["payments"]
+        national_counts = national_sums["count"].astype("int64")
+        national_averages = national_counts / total_years
+        payments_nationwide = payments.div(national_payments.where(national_payments > 0), axis=1).mul(100).fillna(0.0)
+        counts_nationwide = counts.div(national_counts.where(national_counts > 0), axis=1).mul(100).fillna(0.0)
+        averages_nationwide = averages.div(national_averages.where(national_averages > 0), axis=1).mul(100).fillna(0.0)
+
+        # Percentages of the subtitle total of the state, zero where the state has no values
+        payments_within_state = payments.div(payments[self.subtitle_total_key], axis=0).mul(100).where(
+            payments.astype("int64") != 0, 0.0)
+        counts_within_state = counts.div(counts[self.subtitle_total_key], axis=0).mul(100).where(
+            counts.astype("int64") != 0, 0.0)
+        averages_within_state = averages.div(averages[self.subtitle_total_key], axis=0).mul(100).where(
+            counts[self.subtitle_total_key].astype("int64") != 0, 0.0, axis=0)
+
+        subtitle_values = pd.DataFrame({
+            "totalCounts": counts.stack(),
+            "totalPaymentInDollars": payments.stack(),
+            "averageRecipientCount": averages.stack(),
+            "totalPaymentInPercentageNationwide": payments_nationwide.stack(),
+            "totalCountsInPercentageNationwide": counts_nationwide.stack(),
+            "averageRecipientCountInPercentageNationwide": averages_nationwide.stack(),
+            "totalPaymentInPercentageWithinState": payments_within_state.stack(),
+            "totalCountsInPercentageWithinState": counts_within_state.stack(),
+            "averageRecipientCountInPercentageWithinState": averages_within_state.stack()
+        })
+
+        return {
+            state_and_program: {
+                field: int(value) if field == "totalCounts" else round(value, 2) for field, value in values.items()
+            }
+            for state_and_program, values in subtitle_values.to_dict("index").items()
         }
 
-        # Write processed_data_dict as JSON data
-        with open(os.path.join(self.data_folder, "sada_subprograms_data.json"), "w") as output_json_file:
-            output_json_file.write(json.dumps(self.disaster_program_data_dict, indent=2))
+    def __nationwide_values(self, values):
+        return {field: value for field, value in values.items() if not field.endswith("WithinState")}
 
 
 if __name__ == "__main__":
+    data_folder = "title-1-commodities"
     dairy_disaster_parser = DairyDisasterParser(2014, 2021, "Title 1: Commodities: Dairy and Disaster",
-                                                "../title-1-commodities", "Dairy-Disaster.csv")
-    dairy_disaster_parser.parse_and_process()
\ No newline at end of file
+                                                data_folder, "Dairy-Disaster.csv")
+    dairy_disaster_parser.parse_and_process()
+    emit_report()
+    emit_output_summary()
\ No newline at end of file
@@ -1,19 +1,34 @@
-import pandas as pd
+import argparse
 import json
+import os
 
 from operator import itemgetter, attrgetter
 from deepmerge import always_merger
 from datetime import datetime
 
+from utils.categorical import normalize_categorical_columns
+from utils.csv_cache import read_csv_cached
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import (add_output_arguments, apply_output_arguments, emit_output_summary, serialize_json,
+                               write_json_file, write_serialized_json)
+from utils.states import StateLookup, US_STATE_ABBREVIATIONS
+from utils.year_windows import YearlySums, get_year_window_key, get_year_windows
+
 
 class EqipParser:
-    def __init__(self, start_year, end_year, summary_filepath, all_programs_filepath, csv_filepath):
+    def __init__(self, start_year, end_year, summary_filepath, all_programs_filepath, csv_filepath, compact_json=False,
+                 sidecar_compressions=(), year_windows=None, output_folder=None):
 
         self.summary_filepath = summary_filepath
         self.all_programs_filepath = all_programs_filepath
         self.start_year = start_year
         self.end_year = end_year
+        self.year_windows = get_year_windows(start_year, end_year, year_windows)
         self.csv_filepath = csv_filepath
+        # Output files are written next to the CSV file unless another folder is given
+        self.output_folder = os.path.dirname(csv_filepath) if output_folder is None else output_folder
+        self.compact_json = compact_json
+        self.sidecar_compressions = sidecar_compressions
 
         self.practices_category_dict = {
             "(6)(A) Practices": ["Structural", "Land management", "Vegetative", "Forest management",
@@ -22,71 +37,20 @@ class EqipParser:
                                  "Soil health", "Conservation planning assessment", "Other planning"]
         }
 
+        self.column_dtypes_map = {
+            "Pay_year": "int64",
+            "state_code": "float64",
+            "State": "str",
+            "category_code": "str",
+            "category_name": "str",
+            "payments": "float64"
+        }
+
         self.processed_data_dict = dict()
         self.percentages_data_dict = dict()
         self.statute_performance_data_dict = dict()
 
-        self.us_state_abbreviation = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AS': 'American Samoa',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming',
-            'DC': 'District of Columbia',
-            'MP': 'Northern Mariana Islands',
-            'PW': 'Palau',
-            'PR': 'Puerto Rico',
-            'VI': 'Virgin Islands of the U.S.',
-            'AA': 'Armed Forces Americas (Except Canada)',
-            'AE': 'Armed Forces Africa/Canada/Europe/Middle East',
-            'AP': 'Armed Forces Pacific'
-        }
+        self.state_lookup = StateLookup(US_STATE_ABBREVIATIONS + ["AS", "DC", "MP", "PW", "PR", "VI", "AA", "AE", "AP"])
 
         # Load JSON files
         with open(self.summary_filepath) as summary_file:
@@ -102,7 +66,11 @@ class EqipParser:
 
     def find_and_get_zero_practice_category_entries(self, statue_name, practice_categories_list,
                                                     for_percentage_json=False):
-        diff_list = list(set(self.practices_category_dict[statue_name]) - set(practice_categories_list))
+        # Missing categories keep the order of the mapping, a set difference would order them by string hash, which
+        # changes from run to run
+        practice_categories_set = set(practice_categories_list)
+        diff_list = [category_name for category_name in self.practices_category_dict[statue_name]
+                     if category_name not in practice_categories_set]
         zero_practice_category_entries = []
         for entry in diff_list:
             if not for_percentage_json:
@@ -121,30 +89,39 @@ class EqipParser:
 
     def parse_and_process(self):
         # Import CSV file into a Pandas DataFrame
-        eqip_data = pd.read_csv(self.csv_filepath)
-        eqip_data = eqip_data.replace({
-            "Other 1 - planning": "Other planning",
-            "Other 2 - improvement": "Other improvement",
-            "Conservating planning assessment": "Conservation planning assessment",
-            "Resource-conserving crop rotatation": "Resource-conserving crop rotation",
-            "Land Management": "Land management",
-            "Forest Management": "Land management",
-            "Soil Remediation": "Soil remediation"
-        })
+        with measure_stage("eqip", "load"):
+            eqip_data = read_csv_cached(self.csv_filepath, self.column_dtypes_map)
+        with measure_stage("eqip", "normalize"):
+            eqip_data = normalize_categorical_columns(eqip_data, ["category_name"], {
+                "Other 1 - planning": "Other planning",
+                "Other 2 - improvement": "Other improvement",
+                "Conservating planning assessment": "Conservation planning assessment",
+                "Resource-conserving crop rotatation": "Resource-conserving crop rotation",
+                "Land Management": "Land management",
+                "Forest Management": "Land management",
+                "Soil Remediation": "Soil remediation"
+            })
 
         # Filter only relevant years' data
-        eqip_data = eqip_data[eqip_data["Pay_year"].between(self.start_year, self.end_year, inclusive="both")]
+        with measure_stage("eqip", "filter"):
+            eqip_data = eqip_data[eqip_data["Pay_year"].between(
+                min(start_year for start_year, end_year in self.year_windows),
+                max(end_year for start_year, end_year in self.year_windows), inclusive="both")]
 
         # Group data by state, practice category name, and payment
-        payments_by_category_by_state_for_year = \
-            eqip_data[
-                ["Pay_year", "State", "category_name", "payments"]
-            ].groupby(
-                ["Pay_year", "State", "category_name"]
-            )["payments"].sum()
+        with measure_stage("eqip", "aggregate"):
+            # Sum the payments by year, state and category once, every year window is aggregated from these sums
+            yearly_sums = YearlySums(eqip_data, "Pay_year", ["State", "category_name"], ["payments"])
+
+            payments_by_category_by_state_for_year = \
+                yearly_sums.data[
+                    ["Pay_year", "State", "category_name", "payments"]
+                ].groupby(
+                    ["Pay_year", "State", "category_name"]
+                )["payments"].sum()
 
         # 1. Get data for the map
-        if True:
+        with measure_stage("eqip", "build JSON"):
             # Iterate through all tuples
             for data_tuple, payment in payments_by_category_by_state_for_year.items():
                 year, state_name, category_name = data_tuple
@@ -195,57 +172,59 @@ class EqipParser:
                     if not found:
                         self.processed_data_dict[state_name].append(new_data_entry)
 
-            # Get total payment data
-            total_payments_by_category_by_state = eqip_data[
-                ["State", "category_name", "payments"]].groupby(
-                ["State", "category_name"]
-            )["payments"].sum()
-
-            # Iterate through all tuples
-            for data_tuple, payment in total_payments_by_category_by_state.items():
-                state_name, category_name = data_tuple
-                rounded_payment = round(payment, 2)
-
-                new_data_entry = {
-                    "years": str(self.start_year) + "-" + str(self.end_year),
-                    "statutes": [
-                        {
-                            "statuteName": "(6)(A) Practices",
-                            "practiceCategories": [
-                            ]
-                        },
-                        {
-                            "statuteName": "(6)(B) Practices",
-                            "practiceCategories": [
-                            ]
-                        }
-                    ]
-                }
+            # Add the total of every year window
+            for start_year, end_year in self.year_windows:
+                year_window_key = get_year_window_key(start_year, end_year)
+
+                # Get total payment data
+                total_payments_by_category_by_state = yearly_sums.get_window_totals(
+                    start_year, end_year, ["State", "category_name"])["payments"]
+
+                # Iterate through all tuples
+                for data_tuple, payment in total_payments_by_category_by_state.items():
+                    state_name, category_name = data_tuple
+                    rounded_payment = round(payment, 2)
+
+                    new_data_entry = {
+                        "years": year_window_key,
+                        "statutes": [
+                            {
+                                "statuteName": "(6)(A) Practices",
+                                "practiceCategories": [
+                                ]
+                            },
+                            {
+                                "statuteName": "(6)(B) Practices",
+                                "practiceCategories": [
+                                ]
+                            }
+                        ]
+                    }
 
-                # Get statute name and updated category name
-                statute_name = self.find_statute_by_category(category_name)
+                    # Get statute name and updated category name
+                    statute_name = self.find_statute_by_category(category_name)
 
-                for statute in new_data_entry["statutes"]:
-                    if statute["statuteName"] == statute_name:
-                        statute["practiceCategories"].append({
-                            "practiceCategoryName": category_name,
-                            "totalPaymentInDollars": rounded_payment
-                        })
+                    for statute in new_data_entry["statutes"]:
+                        if statute["statuteName"] == statute_name:
+                            statute["practiceCategories"].append({
+                                "practiceCategoryName": category_name,
+                                "totalPaymentInDollars": rounded_payment
+                            })
 
-                found = False
-                # Update self.processed_data_dict
-                for entry in self.processed_data_dict[state_name]:
-                    if entry["years"] == new_data_entry["years"]:
-                        for entry_statute in entry["statutes"]:
-                            for new_data_entry_statute in new_data_entry["statutes"]:
-                                if entry_statute["statuteName"] == new_data_entry_statute["statuteName"]:
-                                    entry_statute["practiceCategories"] = always_merger.merge(
-                                        entry_statute["practiceCategories"],
-                                        new_data_entry_statute["practiceCategories"])
-                        found = True
-                        break
-                if not found:
-                    self.processed_data_dict[state_name].append(new_data_entry)
+                    found = False
+                    # Update self.processed_data_dict
+                    for entry in self.processed_data_dict[state_name]:
+                        if entry["years"] == new_data_entry["years"]:
+                            for entry_statute in entry["statutes"]:
+                                for new_data_entry_statute in new_data_entry["statutes"]:
+                                    if entry_statute["statuteName"] == new_data_entry_statute["statuteName"]:
+                                        entry_statute["practiceCategories"] = always_merger.merge(
+                                            entry_statute["practiceCategories"],
+                                            new_data_entry_statute["practiceCategories"])
+                            found = True
+                            break
+                    if not found:
+                        self.processed_data_dict[state_name].append(new_data_entry)
 
             # Calculate total for each state and update data dictionary
             for state_name in self.processed_data_dict:
@@ -272,7 +251,7 @@ class EqipParser:
                         statute["practiceCategories"].sort(key=lambda x: x["practiceCategoryName"])
 
             # remap state names to abbreviations
-            self.processed_data_dict = self.remap_state_name_to_abbreviation(self.processed_data_dict)
+            self.processed_data_dict = self.state_lookup.remap_state_names_to_abbreviations(self.processed_data_dict)
 
             # add year to the data
             tmp_output = dict()
@@ -281,123 +260,131 @@ class EqipParser:
             # add year to the tmp_output
             tmp_output[str(self.start_year) + "-" + str(self.end_year)].append(self.processed_data_dict)
 
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/eqip/eqip_map_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(tmp_output, indent=2))
-
-        # 2. Get data for the table
-        if True:
-            total_payments_by_state = eqip_data[
-                ["State", "payments"]].groupby(["State"])["payments"].sum()
-            total_payments_at_national_level = round(eqip_data["payments"].sum(), 2)
-
-            total_payments_by_category_by_state = eqip_data[
-                ["State", "category_name", "payments"]].groupby(
-                ["State", "category_name"]
-            )["payments"].sum()
-
-            total_payments_by_category_at_national_level = round(
-                eqip_data[["category_name", "payments"]].groupby(["category_name"]).sum(), 2)
-
-            # Iterate through all tuples
-            for state_name, payment in total_payments_by_state.items():
-                yearly_state_payment = round(payment, 2)
-
-                new_data_entry = {
-                    "state": state_name,
-                    "statutes": [
-                        {
-                            "statuteName": "(6)(A) Practices",
-                            "totalPaymentInDollars": 0.0,
-                            "practiceCategories": [
-                            ]
-                        },
-                        {
-                            "statuteName": "(6)(B) Practices",
-                            "totalPaymentInDollars": 0.0,
-                            "practiceCategories": [
-                            ]
-                        }
-                    ],
-                    "totalPaymentInPercentageNationwide": round(
-                        (yearly_state_payment / total_payments_at_national_level) * 100, 2),
-                    "totalPaymentInDollars": yearly_state_payment
-                }
-
-                for data_tuple, category_payment in total_payments_by_category_by_state.items():
-                    data_tuple_state_name, category_name = data_tuple
-
-                    if data_tuple_state_name == state_name:
-                        category_payment = round(category_payment, 2)
-                        category_percentage_nationwide = round(
-                            (category_payment / total_payments_by_category_at_national_level["payments"][
-                                category_name]) * 100, 2)
-                        category_percentage_within_state = round(
-                            (category_payment / total_payments_by_state[data_tuple_state_name]) * 100, 2)
-                        statute_name = self.find_statute_by_category(category_name)
-
-                        for statute in new_data_entry["statutes"]:
-                            if statute["statuteName"] == statute_name:
-                                statute["practiceCategories"].append({
-                                    "practiceCategoryName": category_name,
-                                    "totalPaymentInDollars": category_payment,
-                                    "totalPaymentInPercentageNationwide": category_percentage_nationwide,
-                                    "totalPaymentInPercentageWithinState": category_percentage_within_state
-                                })
-                                statute["totalPaymentInDollars"] += category_payment
-
-                self.percentages_data_dict[state_name] = [new_data_entry]
+        # Write processed_data_dict as JSON data
+        # Stream the map data state by state and year by year instead of serializing it into one string
+        with measure_stage("eqip", "write"):
+            write_json_file(os.path.join(self.output_folder, "eqip_map_data.json"), tmp_output, indent=2,
+                            compact=self.compact_json, stream_depth=4, sidecar_compressions=self.sidecar_compressions)
 
-            # Add zero entries
-            for state_name in self.percentages_data_dict:
-                for year_data in self.percentages_data_dict[state_name]:
-                    for statute in year_data["statutes"]:
-                        # Round totalPaymentInDollars
-                        statute["totalPaymentInDollars"] = round(statute["totalPaymentInDollars"], 2)
-                        statue_categories_list = []
-                        for statute_category in statute["practiceCategories"]:
-                            statue_categories_list.append(statute_category["practiceCategoryName"])
-                        zero_entries = self.find_and_get_zero_practice_category_entries(statute["statuteName"],
-                                                                                        statue_categories_list, True)
-                        statute["practiceCategories"] = always_merger.merge(
-                            statute["practiceCategories"], zero_entries)
+        # 2. Get data for the table, for every year window
+        with measure_stage("eqip", "build JSON"):
+            tmp_output = dict()
+            for start_year, end_year in self.year_windows:
+                year_window_key = get_year_window_key(start_year, end_year)
+                self.percentages_data_dict = dict()
+
+                total_payments_by_state = yearly_sums.get_window_totals(start_year, end_year, ["State"])["payments"]
+                total_payments_at_national_level = round(
+                    yearly_sums.get_window_totals(start_year, end_year)["payments"], 2)
+
+                total_payments_by_category_by_state = yearly_sums.get_window_totals(
+                    start_year, end_year, ["State", "category_name"])["payments"]
+
+                total_payments_by_category_at_national_level = round(
+                    yearly_sums.get_window_totals(start_year, end_year, ["category_name"]), 2)
+
+                # Iterate through all tuples
+                for state_name, payment in total_payments_by_state.items():
+                    yearly_state_payment = round(payment, 2)
+
+                    new_data_entry = {
+                        "state": state_name,
+                        "statutes": [
+                            {
+                                "statuteName": "(6)(A) Practices",
+                                "totalPaymentInDollars": 0.0,
+                                "practiceCategories": [
+                                ]
+                            },
+                            {
+                                "statuteName": "(6)(B) Practices",
+                                "totalPaymentInDollars": 0.0,
+                                "practiceCategories": [
+                                ]
+                            }
+                        ],
+                        "totalPaymentInPercentageNationwide": round(
+                            (yearly_state_payment / total_payments_at_national_level) * 100, 2),
+                        "totalPaymentInDollars": yearly_state_payment
+                    }
 
-                        # Sort categories by percentages
-                        statute["practiceCategories"].sort(reverse=True,
-                                                           key=lambda x: x["totalPaymentInPercentageWithinState"])
-
-            # Sort states by decreasing order of percentages
-            self.percentages_data_dict = dict(sorted(self.percentages_data_dict.items(),
-                                                     key=lambda x: x[1][0]["totalPaymentInPercentageNationwide"],
-                                                     reverse=True))
-
-            # restructure json to equivalent to acep or rcpp
-            restructured_list = []
-
-            for state, state_data in self.percentages_data_dict.items():
-                state_abbr = \
-                    [abbr for abbr, name in self.us_state_abbreviation.items() if name == state][0]
-                for entry in state_data:
-                    restructured_list.append({
-                        'state': state_abbr,
-                        'totalPaymentInDollars': entry['totalPaymentInDollars'],
-                        'totalPaymentInPercentageNationwide': entry['totalPaymentInPercentageNationwide'],
-                        'statutes': entry['statutes']
-                    })
+                    for data_tuple, category_payment in total_payments_by_category_by_state.items():
+                        data_tuple_state_name, category_name = data_tuple
+
+                        if data_tuple_state_name == state_name:
+                            category_payment = round(category_payment, 2)
+                            category_percentage_nationwide = round(
+                                (category_payment / total_payments_by_category_at_national_level["payments"][
+                                    category_name]) * 100, 2)
+                            category_percentage_within_state = round(
+                                (category_payment / total_payments_by_state[data_tuple_state_name]) * 100, 2)
+                            statute_name = self.find_statute_by_category(category_name)
+
+                            for statute in new_data_entry["statutes"]:
+                                if statute["statuteName"] == statute_name:
+                                    statute["practiceCategories"].append({
+                                        "practiceCategoryName": category_name,
+                                        "totalPaymentInDollars": category_payment,
+                                        "totalPaymentInPercentageNationwide": category_percentage_nationwide,
+                                        "totalPaymentInPercentageWithinState": category_percentage_within_state
+                                    })
+                                    statute["totalPaymentInDollars"] += category_payment
+
+                    self.percentages_data_dict[state_name] = [new_data_entry]
+
+                # Add zero entries
+                for state_name in self.percentages_data_dict:
+                    for year_data in self.percentages_data_dict[state_name]:
+                        for statute in year_data["statutes"]:
+                            # Round totalPaymentInDollars
+                            statute["totalPaymentInDollars"] = round(statute["totalPaymentInDollars"], 2)
+                            statue_categories_list = []
+                            for statute_category in statute["practiceCategories"]:
+                                statue_categories_list.append(statute_category["practiceCategoryName"])
+                            zero_entries = self.find_and_get_zero_practice_category_entries(
+                                statute["statuteName"], statue_categories_list, True)
+                            statute["practiceCategories"] = always_merger.merge(
+                                statute["practiceCategories"], zero_entries)
+
+                            # Sort categories by percentages
+                            statute["practiceCategories"].sort(reverse=True,
+                                                               key=lambda x: x["totalPaymentInPercentageWithinState"])
+
+                # Sort states by decreasing order of percentages
+                self.percentages_data_dict = dict(sorted(self.percentages_data_dict.items(),
+                                                         key=lambda x: x[1][0]["totalPaymentInPercentageNationwide"],
+                                                         reverse=True))
+
+                # restructure json to equivalent to acep or rcpp
+                restructured_list = []
+
+                for state, state_data in self.percentages_data_dict.items():
+                    state_abbr = self.state_lookup.get_abbreviation(state)
+                    for entry in state_data:
+                        restructured_list.append({
+                            'state': state_abbr,
+                            'totalPaymentInDollars': entry['totalPaymentInDollars'],
+                            'totalPaymentInPercentageNationwide': entry['totalPaymentInPercentageNationwide'],
+                            'statutes': entry['statutes']
+                        })
 
-            # add year to the data
-            tmp_output = dict()
-            tmp_output[str(self.start_year) + "-" + str(self.end_year)] = []
+                # add year to the tmp_output
+                tmp_output[year_window_key] = restructured_list
 
-            # add year to the tmp_output
-            tmp_output[str(self.start_year) + "-" + str(self.end_year)] = restructured_list
+        # Write processed_data_dict as JSON data
+        with measure_stage("eqip", "serialize"):
+            output_json = serialize_json(tmp_output, indent=2)
+        with measure_stage("eqip", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "eqip_state_distribution_data.json"), output_json,
+                                  tmp_output)
 
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/eqip/eqip_state_distribution_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(tmp_output, indent=2))
+        # 3. Get data for the Semi-donut chart, for the parser's own year window only
+        with measure_stage("eqip", "build JSON"):
+            total_payments_at_national_level = round(
+                yearly_sums.get_window_totals(self.start_year, self.end_year)["payments"], 2)
+            total_payments_by_category_at_national_level = round(
+                yearly_sums.get_window_totals(self.start_year, self.end_year, ["category_name"]), 2)
 
-        # 3. Get data for the Semi-donut chart
-        if True:
             statutes_data = {
                 "statutes": [
                     {
@@ -446,9 +433,12 @@ class EqipParser:
                     total_for_statute[statute["statuteName"]] / total_payments_at_national_level * 100, 2)
                 statute["practiceCategories"].sort(key=lambda x: x["totalPaymentInPercentage"], reverse=True)
 
-            # Write processed_data_dict as JSON data
-            with open("../title-2-conservation/eqip/eqip_practice_categories_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(statutes_data, indent=4))
+        # Write processed_data_dict as JSON data
+        with measure_stage("eqip", "serialize"):
+            output_json = serialize_json(statutes_data, indent=4)
+        with measure_stage("eqip", "write"):
+            write_serialized_json(os.path.join(self.output_folder, "eqip_practice_categories_data.json"), output_json,
+                                  statutes_data)
 
         # TODO: Remove the below block soon.
         # 4. Update summary JSON, all programs JSON and totals
@@ -499,34 +489,34 @@ class EqipParser:
         #         item[key] = round(year_range_all_programs_total, 2)
 
     def update_json_files(self):
-        with open(self.summary_filepath + ".updated.json", "w") as summary_file_new:
-            json.dump(self.summary_file_dict, summary_file_new, indent=2)
-
-        with open(self.all_programs_filepath + ".updated.json", "w") as all_programs_file_new:
-            json.dump(self.all_programs__dict, all_programs_file_new, indent=2)
-
-    def remap_state_name_to_abbreviation(self, input_dict):
-        # remap state names to abbreviations
-        # Create a copy of the keys to avoid the "dictionary keys changed during iteration" error
-        state_names = list(input_dict.keys())
-
-        # Iterate over the state names
-        for state_name in state_names:
-            # Check if the value of state_name is in the values of the us_state_abbreviation dictionary
-            if state_name in self.us_state_abbreviation.values():
-                # Replace the state_name with the corresponding abbreviation
-                state_abbr = \
-                    [abbr for abbr, name in self.us_state_abbreviation.items() if name == state_name][0]
-                # Create a new entry with the updated key
-                input_dict[state_abbr] = input_dict.pop(state_name)
+        with measure_stage("eqip", "serialize"):
+            summary_json = serialize_json(self.summary_file_dict, indent=2)
+        with measure_stage("eqip", "write"):
+            write_serialized_json(os.path.join(self.output_folder,
+                                               os.path.basename(self.summary_filepath) + ".updated.json"), summary_json,
+                                  self.summary_file_dict)
 
-        return input_dict
+        with measure_stage("eqip", "serialize"):
+            all_programs_json = serialize_json(self.all_programs__dict, indent=2)
+        with measure_stage("eqip", "write"):
+            write_serialized_json(os.path.join(self.output_folder,
+                                               os.path.basename(self.all_programs_filepath) + ".updated.json"),
+                                  all_programs_json, self.all_programs__dict)
 
 
 if __name__ == '__main__':
-    summary_filepath = "../title-2-conservation/eqip/summary.json"
-    all_programs_filepath = "../title-2-conservation/eqip/allPrograms.json"
-    category_filepath = "../title-2-conservation/eqip/eqip-category-update.csv"
-    eqip_data_parser = EqipParser(2018, 2022, summary_filepath, all_programs_filepath, category_filepath)
+    argument_parser = argparse.ArgumentParser(description="Generate EQIP JSON data files.")
+    add_output_arguments(argument_parser)
+    arguments = argument_parser.parse_args()
+    apply_output_arguments(arguments, argument_parser)
+
+    data_folder = os.path.join("title-2-conservation", "eqip")
+    summary_filepath = os.path.join(data_folder, "summary.json")
+    all_programs_filepath = os.path.join(data_folder, "allPrograms.json")
+    category_filepath = os.path.join(data_folder, "eqip-category-update.csv")
+    eqip_data_parser = EqipParser(2018, 2022, summary_filepath, all_programs_filepath, category_filepath,
+                                  arguments.compact, arguments.sidecar or ())
     eqip_data_parser.parse_and_process()
     eqip_data_parser.update_json_files()
+    emit_report()
+    emit_output_summary()
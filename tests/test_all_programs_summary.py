@@ -0,0 +1,26 @@
+import json
+
+import pandas as pd
+
+from main import PARSER_JOBS, get_parser_class
+
+
+def test_missing_values_are_left_out_of_the_updated_summary(tmp_path):
+    parser = get_parser_class(PARSER_JOBS["all-programs"])(2018, 2022, "topline.csv", "allprograms.json",
+                                                           "summary.json", output_folder=str(tmp_path))
+    parser.summary_data = pd.DataFrame({
+        "Title": ["Title I: Commodities", "Supplemental Nutrition Assistance Program (SNAP)"],
+        "State": ["AL", "AL"],
+        "Fiscal Year": [2018, 2018],
+        "Amount": [1.25, 2.0],
+        "Average Monthly Participation": pd.array([None, 3], dtype="Int64")
+    })
+    parser.all_programs_dict = [{"State": "AL", "Title I 2018": 1.25}]
+
+    parser.write_updated_json_files()
+    with open(tmp_path / "summary.json.updated.json") as summary_file:
+        assert json.load(summary_file) == [
+            {"Title": "Title I: Commodities", "State": "AL", "Fiscal Year": 2018, "Amount": 1.25},
+            {"Title": "Supplemental Nutrition Assistance Program (SNAP)", "State": "AL", "Fiscal Year": 2018,
+             "Amount": 2.0, "Average Monthly Participation": 3}
+        ]
@@ -0,0 +1,163 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+import main
+from main import get_build_inputs, get_jobs_to_run, run_incremental_build
+from utils.build_manifest import MANIFEST_FILENAME, BuildManifest
+
+PARSER_SOURCE = '''import os
+
+
+class FakeParser:
+    metadata = {"Fake": {"Program": "Fake program"}}
+
+    def __init__(self, start_year, end_year, program_main_category_name, data_folder, program_csv_filename,
+                 **kwargs):
+        self.program_csv_filepath = os.path.join(data_folder, program_csv_filename)
+        self.output_folder = kwargs.get("output_folder", data_folder)
+
+    def parse(self):
+        if os.path.getsize(self.program_csv_filepath) == 0:
+            raise ValueError("empty input")
+        with open(self.program_csv_filepath) as program_csv_file, \\
+                open(os.path.join(self.output_folder, "fake_data.json"), "w") as output_file:
+            output_file.write(program_csv_file.read())
+'''
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    # A parser module of its own, whose source the tests can change
+    parser_folder = tmp_path / "parser"
+    parser_folder.mkdir()
+    (parser_folder / "fake_parser.py").write_text(PARSER_SOURCE)
+    monkeypatch.syspath_prepend(str(parser_folder))
+    importlib.invalidate_caches()
+
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    (data_folder / "fake.csv").write_text("State,Amount\nIL,1\n")
+    yield {
+        "parser_class": "fake_parser.FakeParser",
+        "program_main_category_name": "Fake",
+        "data_folder": str(data_folder),
+        "program_csv_filename": "fake.csv",
+        "start_year": 2018,
+        "end_year": 2022,
+        "parse_methods": ["parse"],
+        "output_filenames": ["fake_data.json"]
+    }
+    sys.modules.pop("fake_parser", None)
+
+
+def get_job_names_to_run(job):
+    return get_jobs_to_run({"fake": job})[0]
+
+
+def test_unchanged_build_is_skipped(job):
+    assert get_job_names_to_run(job) == ["fake"]
+    job_name, elapsed_time, error, stage_records, output_records = run_incremental_build({"fake": job}, 1)[0]
+    assert error is None and elapsed_time is not None
+
+    assert get_job_names_to_run(job) == []
+    assert run_incremental_build({"fake": job}, 1)[0] == ("fake", None, None, [], [])
+
+
+def test_changed_input_or_edited_output_is_rebuilt(job):
+    run_incremental_build({"fake": job}, 1)
+
+    with open(os.path.join(job["data_folder"], "fake.csv"), "a") as program_csv_file:
+        program_csv_file.write("IN,2\n")
+    assert get_job_names_to_run(job) == ["fake"]
+    run_incremental_build({"fake": job}, 1)
+
+    with open(os.path.join(job["data_folder"], "fake_data.json"), "a") as output_file:
+        output_file.write("edited")
+    assert get_job_names_to_run(job) == ["fake"]
+
+
+def test_changed_parser_source_is_rebuilt_and_its_metadata_hashed_again(job):
+    run_incremental_build({"fake": job}, 1)
+    previous_build_inputs = BuildManifest(job["data_folder"]).get_build_inputs("fake_data.json")
+
+    # The metadata maps live in the parser's source, so they may have changed with it
+    parser_filepath = sys.modules["fake_parser"].__file__
+    with open(parser_filepath, "w") as parser_file:
+        parser_file.write(PARSER_SOURCE.replace("Fake program", "Renamed program"))
+    sys.modules.pop("fake_parser")
+    build_inputs = get_build_inputs(job, previous_build_inputs)
+    assert build_inputs["parserSource"] != previous_build_inputs["parserSource"]
+    assert "metadata" not in build_inputs
+    assert get_job_names_to_run(job) == ["fake"]
+
+    run_incremental_build({"fake": job}, 1)
+    rebuilt_build_inputs = BuildManifest(job["data_folder"]).get_build_inputs("fake_data.json")
+    assert rebuilt_build_inputs["metadata"] != previous_build_inputs["metadata"]
+    assert get_job_names_to_run(job) == []
+
+
+def test_changed_shared_source_is_rebuilt_and_its_metadata_hashed_again(job, tmp_path, monkeypatch):
+    # A shared module of its own, instead of the utils modules of the repository
+    shared_filepath = tmp_path / "parser" / "shared.py"
+    shared_filepath.write_text("SCALE = 1\n")
+    monkeypatch.setattr(main, "SHARED_SOURCE_PATTERNS", [str(shared_filepath)])
+    run_incremental_build({"fake": job}, 1)
+    previous_build_inputs = BuildManifest(job["data_folder"]).get_build_inputs("fake_data.json")
+
+    shared_filepath.write_text("SCALE = 100\n")
+    build_inputs = get_build_inputs(job, previous_build_inputs)
+    assert build_inputs["sharedSources"] != previous_build_inputs["sharedSources"]
+    assert "metadata" not in build_inputs
+    assert get_job_names_to_run(job) == ["fake"]
+
+    run_incremental_build({"fake": job}, 1)
+    assert get_job_names_to_run(job) == []
+
+
+def test_metadata_hash_is_reused_without_importing_the_parser(job):
+    run_incremental_build({"fake": job}, 1)
+    previous_build_inputs = BuildManifest(job["data_folder"]).get_build_inputs("fake_data.json")
+    sys.modules.pop("fake_parser")
+
+    build_inputs = get_build_inputs(job, previous_build_inputs)
+    assert build_inputs == previous_build_inputs
+    assert "fake_parser" not in sys.modules
+
+
+def test_failed_build_is_not_recorded(job):
+    with open(os.path.join(job["data_folder"], "fake.csv"), "w"):
+        pass
+
+    job_name, elapsed_time, error, stage_records, output_records = run_incremental_build({"fake": job}, 1)[0]
+    assert "empty input" in error
+    assert not os.path.exists(os.path.join(job["data_folder"], MANIFEST_FILENAME))
+
+
+def test_build_settings_are_build_inputs(job):
+    run_incremental_build({"fake": job}, 1)
+
+    for setting_name, setting_value in [("year_windows", [(2019, 2021)]), ("columnar_copies", True),
+                                        ("json_encoder", "orjson"), ("compact_json", True)]:
+        assert get_job_names_to_run(dict(job, **{setting_name: setting_value})) == ["fake"]
+
+    build_inputs = get_build_inputs(dict(job, year_windows=[(2019, 2021), (2018, 2022)], sidecar_compressions=["gzip"]))
+    assert build_inputs["years"] == "2018-2022,2019-2021"
+    assert build_inputs["sidecarCompressions"] == ["gzip"]
+
+
+def test_manifest_is_saved_and_loaded(tmp_path):
+    (tmp_path / "output.json").write_text("{}")
+    manifest = BuildManifest(str(tmp_path))
+    manifest.update(["output.json"], {"years": "2018-2022"})
+    manifest.save()
+
+    loaded_manifest = BuildManifest(str(tmp_path))
+    assert loaded_manifest.get_build_inputs("output.json") == {"years": "2018-2022"}
+    assert loaded_manifest.is_up_to_date(["output.json"], {"years": "2018-2022"})
+    assert not loaded_manifest.is_up_to_date(["output.json"], {"years": "2019-2022"})
+    assert not loaded_manifest.is_up_to_date(["output.json", "missing.json"], {"years": "2018-2022"})
+    assert json.loads((tmp_path / MANIFEST_FILENAME).read_text())["output.json"]["inputs"] == {"years": "2018-2022"}
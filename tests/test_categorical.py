@@ -0,0 +1,37 @@
+import pandas as pd
+
+from utils.categorical import normalize_categorical_columns
+
+VALUE_NAMES_MAP = {"ARC-CO": "ARC", "ARC-Ind": "ARC", "ALABAMA": "AL"}
+
+
+def test_only_the_declared_columns_are_normalized():
+    data_frame = pd.DataFrame({"program": ["ARC-CO", "PLC", "ARC-Ind", None], "note": ["ARC-CO", "x", "y", "z"],
+                               "state": ["ALABAMA", "ALABAMA", "ALASKA", "ALASKA"]})
+
+    normalized_data_frame = normalize_categorical_columns(data_frame, ["program", "missing"], VALUE_NAMES_MAP)
+    assert normalized_data_frame["program"].tolist()[:3] == ["ARC", "PLC", "ARC"]
+    assert pd.isna(normalized_data_frame["program"].iloc[3])
+    assert normalized_data_frame["note"].tolist() == ["ARC-CO", "x", "y", "z"]
+    assert normalized_data_frame["state"].tolist() == ["ALABAMA", "ALABAMA", "ALASKA", "ALASKA"]
+    # The input frame is left as it is
+    assert data_frame["program"].tolist()[0] == "ARC-CO"
+
+
+def test_normalized_columns_go_back_to_plain_values():
+    data_frame = pd.DataFrame({"program": ["ARC-CO", "PLC", "ARC-Ind"], "state": ["ALABAMA", "ALASKA", "ALABAMA"],
+                               "payments": [1.0, 2.0, 3.0]}, index=[10, 20, 30])
+
+    normalized_data_frame = normalize_categorical_columns(data_frame, ["program", "state"], VALUE_NAMES_MAP)
+    assert normalized_data_frame["program"].dtype == object
+    assert normalized_data_frame["state"].dtype == object
+    assert normalized_data_frame.index.tolist() == [10, 20, 30]
+
+    # Categories would add every combination of state and program to the groups
+    sums = normalized_data_frame.groupby(["state", "program"])["payments"].sum()
+    assert sums.to_dict() == {("AL", "ARC"): 4.0, ("ALASKA", "PLC"): 2.0}
+
+
+def test_empty_map_keeps_the_frame():
+    data_frame = pd.DataFrame({"program": ["ARC-CO"]})
+    pd.testing.assert_frame_equal(normalize_categorical_columns(data_frame, ["program"], dict()), data_frame)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from utils.chunked_csv import read_csv_grouped_sums
+
+
+def write_program_csv(csv_filepath, row_count):
+    random_state = np.random.RandomState(0)
+    pd.DataFrame({
+        "year": random_state.randint(2014, 2022, row_count),
+        "state": random_state.choice(["AL", "AK", "AZ", "AR"], row_count),
+        "program": random_state.choice(["ARC-CO", "PLC", "MFP"], row_count),
+        "payments": random_state.randint(0, 100000, row_count) / 100,
+        "count": random_state.randint(0, 10, row_count)
+    }).to_csv(csv_filepath, index=False)
+
+
+def test_chunked_sums_equal_the_sums_of_the_whole_file(tmp_path):
+    csv_filepath = str(tmp_path / "program.csv")
+    write_program_csv(csv_filepath, 1000)
+
+    def prepare_chunk(chunk):
+        return chunk[chunk["program"] != "MFP"]
+
+    grouped_sums = read_csv_grouped_sums(csv_filepath, ["year", "state", "program"], ["payments", "count"], 37,
+                                         prepare_chunk=prepare_chunk)
+    whole_file_sums = prepare_chunk(pd.read_csv(csv_filepath)).groupby(["year", "state", "program"])[
+        ["payments", "count"]].sum().reset_index()
+
+    # Groups missing from a chunk are added as 0.0, so the counts come back as floats
+    pd.testing.assert_frame_equal(grouped_sums, whole_file_sums, check_dtype=False)
+    assert "MFP" not in grouped_sums["program"].tolist()
+
+
+def test_file_without_rows_has_no_groups(tmp_path):
+    csv_filepath = str(tmp_path / "program.csv")
+    write_program_csv(csv_filepath, 0)
+
+    grouped_sums = read_csv_grouped_sums(csv_filepath, ["year", "state"], ["payments"], 10)
+    assert grouped_sums.empty
+    assert grouped_sums.columns.tolist() == ["year", "state", "payments"]
@@ -0,0 +1,86 @@
+import json
+import math
+import os
+
+import pytest
+
+from main import PARSER_JOBS, REPOSITORY_FOLDER, run_parser_jobs
+from utils.columnar_json import COLUMNS_KEY, HUNDREDTHS_SCALE, SCALES_KEY, decode_columnar, encode_columnar
+from utils.json_writer import get_columnar_filepath, get_msgpack_filepath, msgpack, serialize_json
+
+OUTPUT_FILEPATHS = sorted(set(os.path.join(REPOSITORY_FOLDER, job["data_folder"], output_filename)
+                              for job in PARSER_JOBS.values() for output_filename in job["output_filenames"]))
+
+
+def round_trip(value):
+    # Through the same text as the columnar copies, NaN is written as NaN by the json encoder
+    return decode_columnar(json.loads(serialize_json(encode_columnar(value), compact=True)))
+
+
+def assert_same_document(decoded_value, value):
+    # NaN is not equal to itself, so the documents are compared as JSON text, which also tells 1 from 1.0
+    assert json.dumps(decoded_value) == json.dumps(value)
+
+
+@pytest.mark.parametrize("output_filepath", [output_filepath for output_filepath in OUTPUT_FILEPATHS
+                                             if os.path.exists(output_filepath)],
+                         ids=lambda output_filepath: os.path.relpath(output_filepath, REPOSITORY_FOLDER))
+def test_output_round_trips(output_filepath):
+    with open(output_filepath) as output_file:
+        value = json.load(output_file)
+    assert_same_document(round_trip(value), value)
+
+
+def test_every_output_gets_its_copies(tmp_path, monkeypatch):
+    # The jobs name their inputs relative to the repository, their outputs are written to a folder of their own
+    monkeypatch.chdir(REPOSITORY_FOLDER)
+    jobs = {job_name: dict(job, output_folder=str(tmp_path / job_name), columnar_copies=True,
+                           msgpack_copies=msgpack is not None) for job_name, job in PARSER_JOBS.items()}
+    for job in jobs.values():
+        os.makedirs(job["output_folder"])
+
+    # Run in worker processes, so that the output settings of the jobs do not leak into the other tests
+    for job_name, elapsed_time, error, stage_records, output_records in run_parser_jobs(jobs, 2):
+        assert error is None, job_name
+    for job_name, job in jobs.items():
+        for output_filename in job["output_filenames"]:
+            output_filepath = os.path.join(job["output_folder"], output_filename)
+            with open(output_filepath) as output_file, \
+                    open(get_columnar_filepath(output_filepath)) as columnar_file:
+                assert_same_document(decode_columnar(json.load(columnar_file)), json.load(output_file))
+            if msgpack is not None:
+                assert os.path.exists(get_msgpack_filepath(output_filepath)), output_filepath
+
+
+def test_hundredths_columns_are_scaled_and_decoded():
+    value = [{"state": "AL", "amount": 1.25, "count": 3}, {"state": "AK", "amount": -0.5, "count": 4}]
+
+    encoded_value = encode_columnar(value)
+    assert encoded_value == {COLUMNS_KEY: {"state": ["AL", "AK"], "amount": [125, -50], "count": [3, 4]},
+                             SCALES_KEY: {"amount": HUNDREDTHS_SCALE}}
+    assert_same_document(round_trip(value), value)
+
+
+def test_columns_that_are_not_exact_in_hundredths_are_not_scaled():
+    value = [{"amount": 1.255}, {"amount": 0.1}, {"amount": -0.0}]
+
+    encoded_value = encode_columnar(value)
+    assert SCALES_KEY not in encoded_value
+    assert_same_document(round_trip(value), value)
+
+
+def test_none_and_nan_values_round_trip():
+    value = {"2018-2022": [{"state": "AL", "amount": None, "ratio": float("nan")},
+                           {"state": "AK", "amount": 1.5, "ratio": 0.25}]}
+
+    decoded_value = round_trip(value)
+    assert SCALES_KEY not in encode_columnar(value)["2018-2022"]
+    assert decoded_value["2018-2022"][0]["amount"] is None
+    assert math.isnan(decoded_value["2018-2022"][0]["ratio"])
+    assert_same_document(decoded_value, value)
+
+
+def test_lists_that_are_not_tables_keep_their_layout():
+    value = {"single": [{"a": 1}], "mixed": [{"a": 1}, {"b": 2}], "numbers": [1, 2.5], "empty": []}
+    assert encode_columnar(value) == value
+    assert_same_document(round_trip(value), value)
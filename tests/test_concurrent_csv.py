@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from utils.concurrent_csv import load_csv_files_concurrently
+
+
+def write_csv_files(tmp_path, row_counts):
+    csv_filepaths = []
+    for index, row_count in enumerate(row_counts):
+        csv_filepath = str(tmp_path / ("file_" + str(index) + ".csv"))
+        pd.DataFrame({"value": range(row_count)}).to_csv(csv_filepath, index=False)
+        csv_filepaths.append(csv_filepath)
+    return csv_filepaths
+
+
+def test_results_come_back_in_task_order(tmp_path):
+    csv_filepaths = write_csv_files(tmp_path, [3, 1, 2])
+    thread_names = set()
+
+    def load_csv_file(csv_filepath, delay):
+        # The first files finish last
+        time.sleep(delay)
+        thread_names.add(threading.current_thread().name)
+        return len(pd.read_csv(csv_filepath))
+
+    assert load_csv_files_concurrently([(csv_filepaths[0], 0.2), (csv_filepaths[1], 0.1), (csv_filepaths[2], 0.0)],
+                                       load_csv_file) == [3, 1, 2]
+    assert len(thread_names) == 3
+    assert load_csv_files_concurrently([], load_csv_file) == []
+
+
+def test_error_names_the_failing_file(tmp_path):
+    csv_filepaths = write_csv_files(tmp_path, [1]) + [str(tmp_path / "missing.csv"), str(tmp_path / "other.csv")]
+
+    with pytest.raises(RuntimeError, match="Failed to load .*missing.csv: ") as error_info:
+        load_csv_files_concurrently([(csv_filepath,) for csv_filepath in csv_filepaths], pd.read_csv)
+    assert isinstance(error_info.value.__cause__, FileNotFoundError)
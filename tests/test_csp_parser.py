@@ -0,0 +1,26 @@
+import pandas as pd
+
+from parsers.csp_parser import CSPDataParser
+
+
+def test_category_distribution_rounds_halfway_percentages_like_python():
+    parser = CSPDataParser(2018, 2022, "CSP.csv")
+    total_payments_by_category_by_state = pd.Series(
+        [1, 19999, 3], name="payments",
+        index=pd.MultiIndex.from_tuples([("Alabama", "Structural"), ("Alabama", "Cropland"), ("Alaska", "Structural")],
+                                        names=["state", "category_name"]))
+    total_payments_by_state = pd.Series([20000, 3], index=pd.Index(["Alabama", "Alaska"], name="state"))
+    total_payments_by_category_at_national_level = pd.Series(
+        [4.0, 19999.0], index=pd.Index(["Structural", "Cropland"], name="category_name"))
+
+    category_distribution_by_state = parser.get_category_distribution_by_state(
+        total_payments_by_category_by_state, total_payments_by_state, total_payments_by_category_at_national_level)
+
+    # 1 / 20000 * 100 is 0.005, which np.round rounds down to 0.0
+    assert category_distribution_by_state == {
+        "Alabama": [("Structural", 1, 25.0, 0.01), ("Cropland", 19999, 100.0, 100.0)],
+        "Alaska": [("Structural", 3, 75.0, 100.0)]
+    }
+    assert all(isinstance(category_payment, int)
+               for state_categories in category_distribution_by_state.values()
+               for category_name, category_payment, *percentages in state_categories)
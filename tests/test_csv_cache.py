@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import csv_cache
+
+
+def write_csv_file(tmp_path):
+    csv_filepath = str(tmp_path / "program.csv")
+    pd.DataFrame({"year": [2018, 2019], "state": ["Alabama", None], "payments": [1.5, 2.25]}).to_csv(
+        csv_filepath, index=False)
+    return csv_filepath
+
+
+@pytest.mark.skipif(not csv_cache.CACHE_ENABLED, reason="pyarrow is not installed")
+def test_cached_read_returns_the_same_data_as_the_csv_file(tmp_path):
+    csv_filepath = write_csv_file(tmp_path)
+    column_dtypes_map = {"year": "int64", "state": "str", "payments": "float64"}
+
+    first_data = csv_cache.read_csv_cached(csv_filepath, column_dtypes_map)
+    assert os.path.exists(os.path.join(str(tmp_path), csv_cache.CACHE_FOLDER_NAME, "program.csv.feather"))
+    cached_data = csv_cache.read_csv_cached(csv_filepath, column_dtypes_map)
+
+    pd.testing.assert_frame_equal(cached_data, first_data)
+    pd.testing.assert_frame_equal(cached_data, pd.read_csv(csv_filepath, dtype=column_dtypes_map))
+
+
+def test_disabled_cache_is_reported_once(tmp_path, monkeypatch, capsys):
+    csv_filepath = write_csv_file(tmp_path)
+    monkeypatch.setattr(csv_cache, "CACHE_ENABLED", False)
+    csv_cache._report_cache_disabled.cache_clear()
+
+    csv_cache.read_csv_cached(csv_filepath)
+    csv_cache.read_csv_cached(csv_filepath)
+
+    assert capsys.readouterr().err.count("pyarrow is not installed") == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), csv_cache.CACHE_FOLDER_NAME))
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from parsers.dairy_disaster_parser import DairyDisasterParser
+
+PROGRAM_ROWS = [
+    "2017,Alabama,ELAP,1000,100",
+    "2018,Alabama,Dairy,100,2",
+    "2018,Alabama,ELAP,10,1",
+    "2019,Alabama,LFP,30,3",
+    "2019,Alaska,ELAP,20,2",
+    "2018,Alaska,TAP,5,1"
+]
+
+
+def run_parser(tmp_path, program_rows):
+    (tmp_path / "Dairy-Disaster.csv").write_text("year,state,program,payments,count\n" + "\n".join(program_rows) + "\n")
+    DairyDisasterParser(2018, 2019, "Title 1: Commodities: Dairy and Disaster", str(tmp_path),
+                        "Dairy-Disaster.csv").parse_and_process()
+
+
+def read_output(tmp_path, output_filename):
+    with open(tmp_path / output_filename) as output_file:
+        return json.load(output_file)
+
+
+def test_subtitle_totals_add_up_the_programs_of_the_spec(tmp_path):
+    run_parser(tmp_path, PROGRAM_ROWS)
+
+    # 2017 is outside the window, LIP has no rows
+    sada_subprograms = read_output(tmp_path, "sada_subprograms_data.json")
+    assert sada_subprograms["totalPaymentInDollars"] == 65.0
+    assert sada_subprograms["totalCounts"] == 7
+    assert sada_subprograms["averageRecipientCount"] == 3.5
+    assert [(program["totalPaymentInDollars"], program["totalCounts"], program["averageRecipientCount"])
+            for program in sada_subprograms["programs"]] == [(30.0, 3, 1.5), (30.0, 3, 1.5), (0.0, 0, 0.0),
+                                                             (5.0, 1, 0.5)]
+    assert read_output(tmp_path, "dmc_subprograms_data.json")["totalPaymentInDollars"] == 100.0
+
+    sada_state_distribution = read_output(tmp_path, "sada_state_distribution_data.json")
+    states = {entry["state"]: entry for entry in sada_state_distribution["2018-2019"]}
+    assert states["AL"]["totalPaymentInDollars"] == 40.0
+    assert states["AL"]["totalCounts"] == 4
+    assert states["AL"]["totalPaymentInPercentageNationwide"] == 61.54
+    assert states["AK"]["totalPaymentInPercentageNationwide"] == 38.46
+    alabama_elap = states["AL"]["programs"][0]
+    assert alabama_elap["totalPaymentInDollars"] == 10.0
+    assert alabama_elap["totalPaymentInPercentageNationwide"] == 33.33
+    assert alabama_elap["totalPaymentInPercentageWithinState"] == 25.0
+    assert states["AZ"]["totalPaymentInDollars"] == 0.0
+
+
+def test_unknown_program_codes_are_reported(tmp_path):
+    with pytest.raises(ValueError, match="Unknown program codes .*: CFAP, ECAP"):
+        run_parser(tmp_path, PROGRAM_ROWS + ["2018,Alabama,ECAP,1,1", "2019,Alaska,CFAP,2,1"])
@@ -0,0 +1,117 @@
+import pandas as pd
+
+from data_parser import DataParser
+from main import PARSER_JOBS, create_parser
+
+
+def test_map_data_entry_rounds_halfway_payments_like_python():
+    parser = create_parser(PARSER_JOBS["commodities"])
+    program_descriptions = ["Agriculture Risk Coverage County Option (ARC-CO)",
+                            "Agriculture Risk Coverage Individual Coverage (ARC-IC)"]
+
+    # 0.005 is stored slightly above 0.005, Python rounds it up to 0.01, np.round rounds it down to 0.0. Missing
+    # combinations are NaN after the pivot.
+    new_data_entry = parser._DataParser__build_map_data_entry("2018", program_descriptions, [0.005, float("nan")],
+                                                              True)
+
+    arc_program = new_data_entry["programs"][0]
+    assert arc_program["subPrograms"][0] == {"subProgramName": program_descriptions[0], "totalPaymentInDollars": 0.01}
+    assert arc_program["totalPaymentInDollars"] == 0.01
+    assert new_data_entry["totalPaymentInDollars"] == 0.01
+
+
+def test_crp_totals_are_aggregated_by_state_and_nationwide(tmp_path):
+    parser = DataParser(2018, 2019, "Title 2: Conservation: CRP", str(tmp_path), "crp.csv")
+    crp_metadata = parser.metadata["Title 2: Conservation: CRP"]
+    crp_columns = list(crp_metadata["column_names_map"])
+
+    # One row per state and year with 1 in every column, Alabama has 4 more contracts in 2018. The U.S. row and the
+    # years outside the window are left out.
+    program_data = pd.DataFrame(
+        [{"year": year, "state": state_name, "program": "CRP", **dict.fromkeys(crp_columns, 1.0)}
+         for year in [2018, 2019] for state_name in crp_metadata["value_names_map"]] +
+        [{"year": 2018, "state": "U.S.", "program": "CRP", **dict.fromkeys(crp_columns, 1e6)},
+         {"year": 2017, "state": "ALABAMA", "program": "CRP", **dict.fromkeys(crp_columns, 1e6)}])
+    program_data.loc[(program_data["year"] == 2018) & (program_data["state"] == "ALABAMA"),
+                     "Total CRP - NUMBER OF CONTRACTS"] = 5.0
+    program_data.to_csv(tmp_path / "crp.csv", index=False)
+
+    parser.parse_and_process_crp()
+
+    states = {entry["state"]: entry for entry in parser.state_distribution_data_dict["2018-2019"]}
+    alabama_total_crp, alabama_general_sign_up = states["AL"]["programs"][:2]
+    assert alabama_total_crp["totalContracts"] == 6
+    assert alabama_total_crp["contractInPercentageNationwide"] == round(6 / 104 * 100, 2)
+    assert alabama_total_crp["totalPaymentInDollars"] == 2000
+    assert "totalPaymentInPercentageWithinState" not in alabama_total_crp
+    assert alabama_general_sign_up["farmInPercentageNationwide"] == 2.0
+    assert alabama_general_sign_up["totalPaymentInPercentageWithinState"] == 100.0
+    assert [subprogram["programName"] for subprogram in states["AL"]["programs"][2]["subPrograms"]] == \
+        ["CREP Only", "Continuous Non-CREP", "Farmable Wetland"]
+
+    national_total_crp = parser.program_data_dict["programs"][0]
+    assert (national_total_crp["totalContracts"], national_total_crp["totalFarms"]) == (104, 100)
+    assert national_total_crp["totalPaymentInDollars"] == 100000
+    assert national_total_crp["totalPaymentInAcre"] == 100.0
+
+
+def test_crp_state_entry_without_rental_payments_has_no_share_within_state():
+    parser = create_parser(PARSER_JOBS["crp"])
+    totals = {column_name: 0.0 for column_name in parser.metadata["Title 2: Conservation: CRP"]["column_names_map"]}
+    totals_at_national_level = dict.fromkeys(totals, 10.0)
+
+    program_entry = parser._DataParser__build_crp_state_program_entry("Grassland", "Grassland", totals,
+                                                                      totals_at_national_level, with_subprograms=False)
+    assert program_entry["totalPaymentInPercentageWithinState"] == 0
+    assert program_entry["acreInPercentageNationwide"] == 0.0
+    assert "subPrograms" not in program_entry
+
+
+def test_subprograms_are_found_in_the_compiled_map():
+    parser = create_parser(PARSER_JOBS["commodities"])
+    assert parser.find_program_by_subprogram("Agriculture Risk Coverage Individual Coverage (ARC-IC)") == \
+        "Agriculture Risk Coverage (ARC)"
+    # Programs without subprograms are found by their own name
+    assert parser.find_program_by_subprogram("Price Loss Coverage (PLC)") == "Price Loss Coverage (PLC)"
+    assert parser.find_program_by_subprogram("Dairy Margin Coverage Program (DMC)") is None
+
+    # A subprogram listed under more than one program belongs to the first of them
+    parser.metadata["Title 1: Commodities"]["programs_subprograms_map"]["Other"] = ["Price Loss Coverage (PLC)"]
+    parser._DataParser__compile_programs_subprograms_map()
+    assert parser.find_program_by_subprogram("Price Loss Coverage (PLC)") == "Price Loss Coverage (PLC)"
+
+
+def test_zero_entries_are_only_returned_for_the_missing_subprograms():
+    parser = create_parser(PARSER_JOBS["commodities"])
+    arc_co, arc_ic = ["Agriculture Risk Coverage County Option (ARC-CO)",
+                      "Agriculture Risk Coverage Individual Coverage (ARC-IC)"]
+
+    assert parser.find_and_get_zero_subprogram_entries("Agriculture Risk Coverage (ARC)", [arc_co]) == [
+        {"subProgramName": arc_ic, "totalPaymentInDollars": 0.0, "averageAreaInAcres": 0.0, "averageRecipientCount": 0}
+    ]
+    assert parser.find_and_get_zero_subprogram_entries("Agriculture Risk Coverage (ARC)", [arc_ic], True) == [
+        {"subProgramName": arc_co, "totalPaymentInDollars": 0.0, "totalPaymentInPercentageWithinState": 0.0,
+         "averageAreaInAcres": 0.0, "averageRecipientCount": 0}
+    ]
+    assert parser.find_and_get_zero_subprogram_entries("Agriculture Risk Coverage (ARC)", [arc_co, arc_ic]) == []
+    assert parser.find_and_get_zero_subprogram_entries("Price Loss Coverage (PLC)", []) == []
+
+
+def test_year_columns_are_melted_into_one_row_per_state_and_year():
+    parser = create_parser(dict(PARSER_JOBS["commodities"], start_year=2018, end_year=2019))
+    # Alabama has two rows and Nowhere is not a state, both are left out. Years outside the window are dropped.
+    data_frame = pd.DataFrame({"State Name": ["Wyoming", "Alabama", "Alaska", "Alabama", "Nowhere"],
+                               "2017": [9.0, 9.0, 9.0, 9.0, 9.0], "2018": [1.234, 2.0, 3.0, 4.0, 5.0],
+                               "2019": [6.0, 7.0, 8.5, 9.0, 10.0]})
+
+    output_data_frame = parser._DataParser__convert_to_new_data_frame(data_frame, "PLC", "Total Payment")
+    assert output_data_frame.columns.tolist() == ["State Name", "Year", "Program", "amount"]
+    assert output_data_frame.values.tolist() == [["Alaska", 2018, "PLC", 3.0], ["Alaska", 2019, "PLC", 8.5],
+                                                 ["Wyoming", 2018, "PLC", 1.23], ["Wyoming", 2019, "PLC", 6.0]]
+    assert output_data_frame["Year"].dtype == "int64"
+
+    payee_counts = parser._DataParser__convert_to_new_data_frame(data_frame, "ARC-CO", "Payee Count")
+    assert payee_counts.columns.tolist() == ["State Name", "Year", "Program", "Payee Count"]
+    assert payee_counts["Payee Count"].tolist() == [3.0, 8.5, 1.234, 6.0]
+
+    assert parser._DataParser__convert_to_new_data_frame(data_frame.iloc[[1, 3]], "PLC", "Base Acres").empty
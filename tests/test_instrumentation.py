@@ -0,0 +1,70 @@
+import json
+import tracemalloc
+
+import pytest
+
+from utils import instrumentation
+from utils.instrumentation import configure, emit_report, measure_stage, pop_stage_records, summarize_stage_records
+
+MEGABYTE = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def instrumentation_settings(monkeypatch):
+    # Settings changed by a test do not leak into the other tests, neither do its records or memory tracing
+    monkeypatch.setattr(instrumentation, "instrumentation_settings", dict(instrumentation.instrumentation_settings))
+    pop_stage_records()
+    was_tracing = tracemalloc.is_tracing()
+    yield
+    pop_stage_records()
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_disabled_stages_are_not_measured():
+    configure(False)
+    with measure_stage("csp", "load"):
+        data = bytearray(MEGABYTE)
+    assert len(data) == MEGABYTE
+    assert pop_stage_records() == []
+
+
+def test_stage_records_its_time_and_peak_memory():
+    configure(True)
+    with measure_stage("csp", "load"):
+        data = bytearray(10 * MEGABYTE)
+        del data
+
+    stage_record, = pop_stage_records()
+    assert (stage_record["parser"], stage_record["stage"]) == ("csp", "load")
+    assert stage_record["wallTimeSeconds"] >= 0 and stage_record["cpuTimeSeconds"] >= 0
+    assert 10 * MEGABYTE <= stage_record["peakMemoryBytes"] < 11 * MEGABYTE
+
+
+def test_enclosing_stage_keeps_the_peak_of_its_nested_stages():
+    configure(True)
+    with measure_stage("csp", "parse"):
+        with measure_stage("csp", "aggregate"):
+            data = bytearray(5 * MEGABYTE)
+            del data
+        with measure_stage("csp", "write"):
+            pass
+
+    aggregate_record, write_record, parse_record = pop_stage_records()
+    assert aggregate_record["peakMemoryBytes"] >= 5 * MEGABYTE
+    assert write_record["peakMemoryBytes"] < MEGABYTE
+    assert parse_record["peakMemoryBytes"] >= 5 * MEGABYTE
+
+
+def test_repeated_stages_are_summarized_and_reported(tmp_path):
+    report_filepath = str(tmp_path / "report.json")
+    configure(True, report_filepath)
+    for output_index in range(3):
+        with measure_stage("csp", "write"):
+            pass
+
+    records = pop_stage_records()
+    assert summarize_stage_records(records)[("csp", "write")]["calls"] == 3
+    emit_report(records)
+    with open(report_filepath) as report_file:
+        assert json.load(report_file) == {"stages": records}
@@ -0,0 +1,153 @@
+import argparse
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils import json_writer
+from utils.columnar_json import decode_columnar
+from utils.json_writer import (add_output_arguments, apply_output_arguments, configure_outputs, get_columnar_filepath,
+                               get_msgpack_filepath, pop_output_records, serialize_json, write_json_file,
+                               write_serialized_json)
+
+NUMPY_VALUE = {"count": np.int64(3), "payment": np.float64(1.25), "isEstimate": np.bool_(True),
+               "years": np.array([2018, 2019]), "states": [{"state": "IL", "payment": np.float32(0.5)}]}
+PYTHON_VALUE = {"count": 3, "payment": 1.25, "isEstimate": True, "years": [2018, 2019],
+                "states": [{"state": "IL", "payment": 0.5}]}
+
+
+@pytest.fixture(autouse=True)
+def output_settings(monkeypatch):
+    # Encoder settings changed by a test do not leak into the other tests
+    monkeypatch.setattr(json_writer, "output_settings", dict(json_writer.output_settings))
+
+
+def write_and_get_status(output_filepath, value, **kwargs):
+    pop_output_records()
+    write_json_file(output_filepath, value, **kwargs)
+    return [record["status"] for record in pop_output_records() if record["output"] == output_filepath]
+
+
+def test_new_output_is_reported_as_new(tmp_path):
+    output_filepath = str(tmp_path / "output.json")
+    assert write_and_get_status(output_filepath, {"a": [1, 2]}, indent=2) == ["new"]
+    assert not os.path.exists(output_filepath + json_writer.TEMPORARY_EXTENSION)
+
+
+def test_unchanged_output_keeps_its_modification_time(tmp_path):
+    output_filepath = str(tmp_path / "output.json")
+    write_json_file(output_filepath, {"a": [1, 2]}, indent=2)
+    os.utime(output_filepath, (1000000000, 1000000000))
+
+    assert write_and_get_status(output_filepath, {"a": [1, 2]}, indent=2) == ["unchanged"]
+    assert os.path.getmtime(output_filepath) == 1000000000
+
+
+def test_changed_output_is_replaced(tmp_path):
+    output_filepath = str(tmp_path / "output.json")
+    write_json_file(output_filepath, {"a": [1, 2]}, indent=2)
+
+    assert write_and_get_status(output_filepath, {"a": [1, 3]}, indent=2) == ["changed"]
+    with open(output_filepath) as output_file:
+        assert json.load(output_file) == {"a": [1, 3]}
+
+
+def test_switching_an_indented_output_to_compact_replaces_it_and_its_sidecar(tmp_path):
+    output_filepath = str(tmp_path / "csp_map_data.json")
+    value = {"2018-2022": {"AL": {"totalPaymentInDollars": 1.5, "statutes": [{"statuteName": "2018 Practices"}]}}}
+    write_json_file(output_filepath, value, indent=4, stream_depth=2, sidecar_compressions=["gzip"])
+
+    assert write_and_get_status(output_filepath, value, indent=4, compact=True, stream_depth=2,
+                                sidecar_compressions=["gzip"]) == ["reformatted"]
+    compact_json = json.dumps(value, separators=(",", ":"))
+    with open(output_filepath) as output_file:
+        assert output_file.read() == compact_json
+    with gzip.open(output_filepath + ".gz", "rt") as sidecar_file:
+        assert sidecar_file.read() == compact_json
+
+
+def test_failed_write_keeps_the_existing_output(tmp_path):
+    output_filepath = str(tmp_path / "output.json")
+    write_json_file(output_filepath, {"a": 1}, indent=2)
+
+    with pytest.raises(TypeError):
+        write_json_file(output_filepath, {"a": object()}, indent=2)
+    with open(output_filepath) as output_file:
+        assert json.load(output_file) == {"a": 1}
+    assert not os.path.exists(output_filepath + json_writer.TEMPORARY_EXTENSION)
+
+
+def test_serialized_output_gets_its_copies(tmp_path):
+    msgpack = pytest.importorskip("msgpack")
+    configure_outputs(columnar_copies=True, msgpack_copies=True)
+    output_filepath = str(tmp_path / "output.json")
+    value = [{"state": "AL", "amount": 1.25}, {"state": "AK", "amount": 2}]
+
+    write_serialized_json(output_filepath, serialize_json(value, indent=2), value)
+    with open(get_columnar_filepath(output_filepath)) as columnar_file:
+        assert decode_columnar(json.load(columnar_file)) == value
+    with open(get_msgpack_filepath(output_filepath), "rb") as msgpack_file:
+        assert msgpack.unpackb(msgpack_file.read()) == value
+
+
+@pytest.mark.parametrize("serialize_kwargs", [dict(), dict(indent=2), dict(indent=4), dict(compact=True)])
+def test_json_encoder_writes_numpy_values_as_python_values(serialize_kwargs):
+    expected_json = json.dumps(PYTHON_VALUE, indent=serialize_kwargs.get("indent"),
+                               separators=(",", ":") if serialize_kwargs.get("compact") else None)
+    assert serialize_json(NUMPY_VALUE, **serialize_kwargs) == expected_json
+
+
+@pytest.mark.parametrize("serialize_kwargs", [dict(indent=2), dict(indent=4), dict(compact=True)])
+def test_orjson_encoder_writes_the_same_bytes_as_json_for_plain_values(serialize_kwargs):
+    pytest.importorskip("orjson")
+    json_output = serialize_json(NUMPY_VALUE, **serialize_kwargs)
+
+    configure_outputs("orjson")
+    assert serialize_json(NUMPY_VALUE, **serialize_kwargs) == json_output
+
+
+def test_orjson_encoder_differs_from_json_only_in_notation():
+    pytest.importorskip("orjson")
+    value = {"large": np.float64(1e16), "missing": float("nan"), "name": "Caf\u00e9"}
+    json_output = serialize_json(value, compact=True)
+
+    configure_outputs("orjson")
+    orjson_output = serialize_json(value, compact=True)
+    assert orjson_output != json_output
+    assert json.loads(orjson_output) == {"large": 1e16, "missing": None, "name": "Caf\u00e9"}
+
+
+def test_unknown_or_missing_encoders_are_rejected(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown JSON encoder: simplejson"):
+        configure_outputs("simplejson")
+
+    monkeypatch.setattr(json_writer, "orjson", None)
+    with pytest.raises(ImportError, match="orjson must be installed"):
+        configure_outputs("orjson")
+    monkeypatch.setattr(json_writer, "msgpack", None)
+    with pytest.raises(ImportError, match="msgpack must be installed"):
+        configure_outputs(msgpack_copies=True)
+    assert json_writer.get_json_encoder() == "json"
+
+
+def test_output_arguments_configure_the_outputs():
+    argument_parser = argparse.ArgumentParser()
+    add_output_arguments(argument_parser)
+    arguments = argument_parser.parse_args(["--columnar", "--compact", "--sidecar", "gzip"])
+
+    apply_output_arguments(arguments, argument_parser)
+    assert json_writer.is_columnar_copies_enabled()
+    assert not json_writer.is_msgpack_copies_enabled()
+    assert json_writer.get_json_encoder() == "json"
+    assert arguments.compact and arguments.sidecar == ["gzip"]
+
+
+def test_missing_msgpack_is_a_usage_error(monkeypatch):
+    monkeypatch.setattr(json_writer, "msgpack", None)
+    argument_parser = argparse.ArgumentParser()
+    add_output_arguments(argument_parser)
+
+    with pytest.raises(SystemExit):
+        apply_output_arguments(argument_parser.parse_args(["--msgpack"]), argument_parser)
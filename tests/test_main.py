@@ -0,0 +1,85 @@
+import argparse
+import os
+import time
+
+import pytest
+
+from main import add_build_arguments, get_selected_jobs, run_parser_jobs
+from utils.instrumentation import measure_stage
+from utils.json_writer import get_columnar_filepath, is_columnar_copies_enabled, serialize_json, write_serialized_json
+
+
+class FinishingParser:
+    def parse(self):
+        pass
+
+
+def create_finishing_parser(job):
+    return FinishingParser()
+
+
+def create_crashing_parser(job):
+    # Give the other job time to finish, then end the worker process without any exception
+    time.sleep(1)
+    os._exit(1)
+
+
+def test_crashed_worker_only_fails_its_own_job():
+    jobs = {
+        "crashing": {"parser_factory": create_crashing_parser, "parse_methods": ["parse"]},
+        "finishing": {"parser_factory": create_finishing_parser, "parse_methods": ["parse"]}
+    }
+
+    job_results = run_parser_jobs(jobs, 2)
+
+    assert [job_result[0] for job_result in job_results] == ["crashing", "finishing"]
+    crashing_result, finishing_result = job_results
+    assert "BrokenProcessPool" in crashing_result[2]
+    assert crashing_result[1] is not None
+    assert finishing_result[2] is None
+
+
+class WritingParser:
+    def __init__(self, output_filepath):
+        self.output_filepath = output_filepath
+
+    def parse(self):
+        with measure_stage("writing", "write"):
+            write_serialized_json(self.output_filepath, serialize_json({"total": 1}), {"total": 1})
+
+
+def create_writing_parser(job):
+    return WritingParser(job["output_filepath"])
+
+
+def test_job_settings_reach_the_worker_processes(tmp_path):
+    output_filepath = str(tmp_path / "output.json")
+    jobs = {"writing": {"parser_factory": create_writing_parser, "parse_methods": ["parse"],
+                        "output_filepath": output_filepath, "instrument": True, "columnar_copies": True}}
+
+    job_name, elapsed_time, error, stage_records, output_records = run_parser_jobs(jobs, 2)[0]
+
+    assert error is None
+    assert [stage_record["stage"] for stage_record in stage_records] == ["write"]
+    assert os.path.exists(get_columnar_filepath(output_filepath))
+    # The settings of the job do not leak into the process that started it
+    assert not is_columnar_copies_enabled()
+
+
+def get_selected_jobs_for(command_line):
+    argument_parser = argparse.ArgumentParser()
+    add_build_arguments(argument_parser)
+    argument_parser.set_defaults(program=None)
+    return get_selected_jobs(argument_parser.parse_args(command_line), argument_parser)
+
+
+def test_year_windows_are_only_passed_to_parsers_that_compute_them():
+    jobs = get_selected_jobs_for(["--year-windows", "2019-2020"])
+    assert jobs["csp"]["year_windows"] == [(2019, 2020)]
+    assert "year_windows" not in jobs["crop-insurance"]
+    assert "year_windows" not in jobs["snap"]
+
+
+def test_year_windows_of_a_parser_without_them_are_rejected():
+    with pytest.raises(SystemExit):
+        get_selected_jobs_for(["--only", "crop-insurance", "--year-windows", "2019-2020"])
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from snap.snap_main import SnapDataParser
+
+SNAP_TITLE = "Supplemental Nutrition Assistance Program (SNAP)"
+PROGRAMS = ["Crop Insurance", "SNAP", "Title I", "Title II"]
+
+
+@pytest.fixture
+def parser(tmp_path):
+    (tmp_path / "participation.csv").write_text("State,2018,2019,Avg.\nAL,100,300,200\nAK,50,50,50\n"
+                                                "Total,150,350,250\n")
+    (tmp_path / "costs.csv").write_text("State,2018,2019,Total\nAL,1000.0,3000.0,4000.0\nAK,500.0,500.0,1000.0\n"
+                                        "Total,1500.0,3500.0,5000.0\n")
+    (tmp_path / "summary.json").write_text(json.dumps([
+        {"Title": SNAP_TITLE, "State": "AL", "Fiscal Year": 2019, "Amount": 0, "Average Monthly Participation": 0},
+        {"Title": "Title I: Commodities", "State": "AL", "Fiscal Year": 2019, "Amount": 7}
+    ]))
+    all_programs_item = {"State": "AL", "SNAP Total": 0}
+    all_programs_item.update({program + " " + str(year): 1 for program in PROGRAMS for year in [2018, 2019]})
+    (tmp_path / "allPrograms.json").write_text(json.dumps([all_programs_item]))
+
+    return SnapDataParser(2018, 2019, str(tmp_path / "summary.json"), str(tmp_path / "allPrograms.json"),
+                          str(tmp_path / "participation.csv"), str(tmp_path / "costs.csv"))
+
+
+def test_states_and_years_are_looked_up_in_the_joined_index(parser):
+    parser.parse_data()
+
+    assert parser.summary_file_dict[0]["Average Monthly Participation"] == 300
+    assert parser.summary_file_dict[0]["Amount"] == 3000
+    assert parser.summary_file_dict[1]["Amount"] == 7
+
+    all_programs_item = parser.all_programs__dict[0]
+    assert (all_programs_item["SNAP 2018"], all_programs_item["SNAP 2019"]) == (1000, 3000)
+    assert all_programs_item["SNAP Total"] == 4000
+    assert all_programs_item["2018 All Programs Total"] == 1003
+    assert all_programs_item["18-19 All Programs Total"] == 4006
+
+
+def test_state_distribution_has_every_year_and_the_year_range(parser):
+    parser.parse_data()
+
+    assert list(parser.state_distribution_data_dict) == ["2018", "2019", "2018-2019"]
+    # The national participation adds up every row of the file, its total row included
+    alabama_2019, alaska_2019 = parser.state_distribution_data_dict["2019"]
+    assert alabama_2019 == {"state": "AL", "totalPaymentInDollars": 3000.0, "totalPaymentInPercentageNationwide": 85.71,
+                            "averageMonthlyParticipation": 300,
+                            "averageMonthlyParticipationInPercentageNationwide": 42.86}
+    assert alaska_2019["state"] == "AK"
+
+    alabama_year_range = parser.state_distribution_data_dict["2018-2019"][0]
+    assert alabama_year_range["totalPaymentInPercentageNationwide"] == 80.0
+    assert alabama_year_range["averageMonthlyParticipation"] == 200
+    assert alabama_year_range["averageMonthlyParticipationInPercentageNationwide"] == 40.0
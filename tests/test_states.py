@@ -0,0 +1,41 @@
+import pytest
+
+from utils.states import US_STATE_ABBREVIATIONS, StateLookup
+
+
+def test_remapped_keys_move_to_the_end_and_unknown_keys_stay():
+    input_dict = {"Illinois": 1, "Total": 2, "Alabama": 3, "IN": 4}
+
+    remapped_dict = StateLookup().remap_state_names_to_abbreviations(input_dict)
+    assert remapped_dict is input_dict
+    assert list(remapped_dict.items()) == [("Total", 2), ("IN", 4), ("IL", 1), ("AL", 3)]
+
+
+def test_names_outside_the_lookup_are_not_remapped():
+    input_dict = {"Puerto Rico": 1, "Alabama": 2}
+    assert list(StateLookup().remap_state_names_to_abbreviations(dict(input_dict))) == ["Puerto Rico", "AL"]
+    assert list(StateLookup(US_STATE_ABBREVIATIONS + ["PR"]).remap_state_names_to_abbreviations(input_dict)) == \
+        ["PR", "AL"]
+
+
+def test_lookups_follow_the_given_order():
+    state_lookup = StateLookup(["WY", "AL", "DC"])
+    assert list(state_lookup.names_by_abbreviation.values()) == ["Wyoming", "Alabama", "District of Columbia"]
+    assert state_lookup.get_abbreviation("District of Columbia") == "DC"
+    assert state_lookup.get_name("WY") == "Wyoming"
+
+
+@pytest.mark.parametrize("fips_code", ["01", "1", 1, 1.0])
+def test_fips_codes_are_padded(fips_code):
+    assert StateLookup().get_abbreviation_by_fips_code(fips_code) == "AL"
+
+
+def test_missing_and_unknown_fips_codes():
+    state_lookup = StateLookup(US_STATE_ABBREVIATIONS + ["PB"])
+    assert state_lookup.get_fips_code("AL") == "01"
+    assert state_lookup.get_abbreviation_by_fips_code(None) is None
+    assert state_lookup.get_abbreviation_by_fips_code(float("nan")) is None
+    with pytest.raises(KeyError):
+        state_lookup.get_abbreviation_by_fips_code("03")
+    with pytest.raises(KeyError):
+        state_lookup.get_fips_code("PB")
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from utils.year_windows import (YearlySums, check_year_window_in_data, get_program_years, get_year_windows,
+                                parse_year_windows)
+
+
+def test_parse_fixed_and_rolling_windows():
+    assert parse_year_windows("2014-2018, 3", 2018, 2022) == \
+        [(2014, 2018), (2018, 2020), (2019, 2021), (2020, 2022)]
+
+
+def test_parse_ignores_empty_entries():
+    assert parse_year_windows("", 2018, 2022) == []
+    assert parse_year_windows("2014-2018,,", 2018, 2022) == [(2014, 2018)]
+
+
+def test_parse_rejects_reversed_windows():
+    with pytest.raises(ValueError, match="2018-2014"):
+        parse_year_windows("2018-2014", 2018, 2022)
+
+
+def test_rolling_windows_longer_than_the_years_add_nothing():
+    assert parse_year_windows("10", 2018, 2022) == []
+
+
+def test_own_window_comes_first_and_duplicates_are_dropped():
+    # Overlapping windows are all kept, each one is computed on its own
+    assert get_year_windows(2018, 2022, [(2014, 2018), (2018, 2022), (2016, 2020), (2014, 2018)]) == [
+        (2018, 2022), (2014, 2018), (2016, 2020)]
+
+
+@pytest.fixture
+def yearly_sums():
+    data = pd.DataFrame({
+        "year": [2018, 2018, 2019, 2019, 2020, 2020, 2020],
+        "state": ["AL", "AK", "AL", "AK", "AL", "AK", "AL"],
+        "payments": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    })
+    return data, YearlySums(data, "year", ["state"], ["payments"])
+
+
+@pytest.mark.parametrize("start_year, end_year", [(2018, 2020), (2018, 2019), (2019, 2020), (2020, 2020)])
+def test_window_totals_match_the_rows_of_the_window(yearly_sums, start_year, end_year):
+    data, sums = yearly_sums
+    window_rows = data[data["year"].between(start_year, end_year)]
+
+    pd.testing.assert_series_equal(sums.get_window_totals(start_year, end_year, ["state"])["payments"],
+                                   window_rows.groupby("state")["payments"].sum())
+    assert sums.get_window_totals(start_year, end_year)["payments"] == window_rows["payments"].sum()
+
+
+def test_overlapping_windows_are_cached_separately(yearly_sums):
+    data, sums = yearly_sums
+    assert sums.get_window_totals(2018, 2019)["payments"] == 10.0
+    assert sums.get_window_totals(2019, 2020)["payments"] == 25.0
+    assert sums.get_window_totals(2018, 2019)["payments"] == 10.0
+
+
+def test_window_outside_the_data_is_reported(yearly_sums):
+    data, sums = yearly_sums
+    with pytest.raises(ValueError, match=r"2016-2019 .* no data for 2016, 2017 \(it covers 2018-2020\)"):
+        sums.get_window_totals(2016, 2019, ["state"])
+
+
+def test_missing_years_inside_the_window_are_reported():
+    with pytest.raises(ValueError, match="the SNAP costs file, which has no data for 2019"):
+        check_year_window_in_data(2018, 2020, [2018, 2020], "the SNAP costs file")
+    with pytest.raises(ValueError, match=r"it covers no years"):
+        check_year_window_in_data(2018, 2020, [])
+    check_year_window_in_data(2018, 2020, [2017, 2018, 2019, 2020, 2021])
+
+
+def test_program_years_need_a_column_for_every_program():
+    column_names = ["State", "Title I 2017", "Title I 2018", "Title I 2019", "SNAP 2018", "SNAP 2019", "SNAP Total",
+                    "2018 All Programs Total"]
+    assert get_program_years(column_names, ["Title I", "SNAP"]) == {2018, 2019}
+    assert get_program_years(column_names, ["Crop Insurance"]) == set()
@@ -1,18 +1,26 @@
-import json
-
 import pandas as pd
 from deepmerge import always_merger
 
+from utils.categorical import normalize_categorical_columns
+from utils.chunked_csv import read_csv_grouped_sums
+from utils.csv_cache import read_csv_cached
+from utils.instrumentation import emit_report, measure_stage
+from utils.json_writer import emit_output_summary, serialize_json, write_serialized_json
+from utils.states import StateLookup
+
 
 class CommoditiesDataParser:
     def __init__(self, start_year, end_year, program_csv_filepath, base_acres_csv_filepath,
-                 farm_payee_count_csv_filepath):
+                 farm_payee_count_csv_filepath, chunk_size=None):
         self.start_year = start_year
         self.end_year = end_year
         self.program_csv_filepath = program_csv_filepath
         self.base_acres_csv_filepath = base_acres_csv_filepath
         self.farm_payee_count_csv_filepath = farm_payee_count_csv_filepath
 
+        # The program CSV file is read in chunks of this many rows when set
+        self.chunk_size = chunk_size
+
         self.programs_subprograms_mapping = {
             "Agriculture Risk Coverage (ARC)": ["Agriculture Risk Coverage County Option (ARC-CO)",
                                                 "Agriculture Risk Coverage Individual Coverage (ARC-IC)"],
@@ -24,95 +32,76 @@ class CommoditiesDataParser:
                                     "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)"]
         }
 
+        self.column_dtypes_maps = {
+            "program": {
+                "state": "str",
+                "fiscal_year": "int64",
+                "accounting_program_code": "int64",
+                "accounting_program_description": "str",
+                "amount": "float64",
+                "category": "str"
+            },
+            "base_acres": {
+                "State Name": "str",
+                "Year": "int64",
+                "Program": "str",
+                "Enrolled Base": "float64"
+            },
+            "farm_payee_count": {
+                "State": "str",
+                "Program": "str",
+                "Year": "int64",
+                "Payment": "float64",
+                "Farm Count": "int64",
+                "Payee Count": "int64"
+            }
+        }
+
         self.processed_data_dict = dict()
         self.state_distribution_data_dict = dict()
         self.programs_data_dict = dict()
-        self.us_state_abbreviations = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming'
-        }
+        self.state_lookup = StateLookup()
+
+        self.__compile_programs_subprograms_mapping()
 
     def find_program_by_subprogram(self, program_description):
-        for program_name in self.programs_subprograms_mapping:
-            if program_description == program_name and len(self.programs_subprograms_mapping[program_name]) == 0:
-                return program_name
-            if program_description in self.programs_subprograms_mapping[program_name]:
-                return program_name
+        return self.program_by_subprogram.get(program_description)
 
     def find_and_get_zero_subprogram_entries(self, program_name, subprograms_list,
                                              for_percentage_json=False):
-        diff_list = list(set(self.programs_subprograms_mapping[program_name]) - set(subprograms_list))
-        zero_subprogram_entries = []
-        for entry in diff_list:
-            if not for_percentage_json:
-                zero_subprogram_entries.append({
-                    "subProgramName": entry,
-                    "paymentInDollars": 0.0,
-                    "areaInAcres": 0.0,
-                    "recipientCount": 0
-                })
-            else:
-                zero_subprogram_entries.append({
-                    "subProgramName": entry,
-                    "paymentInDollars": 0.0,
-                    "paymentInPercentageWithinState": 0.00,
-                    "areaInAcres": 0.0,
-                    "recipientCount": 0
-                })
-        return zero_subprogram_entries
-
-    def parse_and_process(self):
-        # Import CSV file into a Pandas DataFrame
-        commodities_data = pd.read_csv(self.program_csv_filepath)
-        commodities_data = commodities_data.replace({
+        return [entry for entry in self.zero_subprogram_entries_map[for_percentage_json][program_name]
+                if entry["subProgramName"] not in subprograms_list]
+
+    def __compile_programs_subprograms_mapping(self):
+        # Programs without subprograms are found by their own name, a subprogram listed under more than one program
+        # belongs to the first of them
+        self.program_by_subprogram = dict()
+        for program_name, subprograms in self.programs_subprograms_mapping.items():
+            if len(subprograms) == 0:
+                self.program_by_subprogram.setdefault(program_name, program_name)
+            for subprogram_name in subprograms:
+                self.program_by_subprogram.setdefault(subprogram_name, program_name)
+
+        # Zero entries of every subprogram, with and without the percentage within state. They are shared by all the
+        # JSON entries they are added to, so they must not be changed.
+        self.zero_subprogram_entries_map = {False: dict(), True: dict()}
+        for program_name, subprograms in self.programs_subprograms_mapping.items():
+            self.zero_subprogram_entries_map[False][program_name] = [{
+                "subProgramName": subprogram_name,
+                "paymentInDollars": 0.0,
+                "areaInAcres": 0.0,
+                "recipientCount": 0
+            } for subprogram_name in subprograms]
+            self.zero_subprogram_entries_map[True][program_name] = [{
+                "subProgramName": subprogram_name,
+                "paymentInDollars": 0.0,
+                "paymentInPercentageWithinState": 0.00,
+                "areaInAcres": 0.0,
+                "recipientCount": 0
+            } for subprogram_name in subprograms]
+
+    def __normalize_commodities_data(self, commodities_data):
+        commodities_data = normalize_categorical_columns(commodities_data, ["category"], {
             "ARC-Ind": "Agriculture Risk Coverage Individual Coverage (ARC-IC)",
             "ARC-CO": "Agriculture Risk Coverage County Option (ARC-CO)",
             "PLC": "Price Loss Coverage (PLC)",
@@ -129,90 +118,118 @@ class CommoditiesDataParser:
         })
 
         # Rename column names to make it more uniform
-        commodities_data.rename(columns={"fiscal_year": "year",
-                                         "category": "program_description",
-                                         "amount": "payments"}, inplace=True)
+        return commodities_data.rename(columns={"fiscal_year": "year",
+                                                "category": "program_description",
+                                                "amount": "payments"})
 
-        # Filter only relevant years' data
+    def __filter_commodities_data(self, commodities_data):
         commodities_data = commodities_data[commodities_data["year"].between(self.start_year, self.end_year,
                                                                              inclusive="both")]
 
         # Exclude programs that are not included at present
-        commodities_data = commodities_data[
+        return commodities_data[
             (commodities_data["program_description"] != "Ad hoc or Supplemental") &
             (commodities_data["program_description"] != "Market Facilitation Program (MFP)") &
             (commodities_data["program_description"] != "Coronavirus Food Assistance Program (CFAP)")
             ]
 
+    def parse_and_process(self):
+        if self.chunk_size is None:
+            # Import CSV file into a Pandas DataFrame
+            with measure_stage("commodities", "load"):
+                commodities_data = read_csv_cached(self.program_csv_filepath, self.column_dtypes_maps["program"])
+            with measure_stage("commodities", "normalize"):
+                commodities_data = self.__normalize_commodities_data(commodities_data)
+
+            # Filter only relevant years' data
+            with measure_stage("commodities", "filter"):
+                commodities_data = self.__filter_commodities_data(commodities_data)
+        else:
+            # Read the CSV file in chunks and keep only the payments summed by year, state and program description,
+            # everything below only needs these sums
+            with measure_stage("commodities", "load"):
+                commodities_data = read_csv_grouped_sums(
+                    self.program_csv_filepath, ["year", "state", "program_description"], ["payments"],
+                    self.chunk_size, self.column_dtypes_maps["program"],
+                    lambda chunk: self.__filter_commodities_data(self.__normalize_commodities_data(chunk)))
+
         # Group data by state, program description, and payment
-        payments_by_program_by_state_for_year = \
-            commodities_data[
-                ["year", "state", "program_description", "payments"]
-            ].groupby(
-                ["year", "state", "program_description"]
-            )["payments"].sum()
+        with measure_stage("commodities", "aggregate"):
+            payments_by_program_by_state_for_year = \
+                commodities_data[
+                    ["year", "state", "program_description", "payments"]
+                ].groupby(
+                    ["year", "state", "program_description"]
+                )["payments"].sum()
 
         # Import base acres CSV file
-        base_acres_data = pd.read_csv(self.base_acres_csv_filepath)
-        base_acres_data = base_acres_data.replace({
-            "ARC-CO": "Agriculture Risk Coverage County Option (ARC-CO)",
-            "ARCCO": "Agriculture Risk Coverage County Option (ARC-CO)",
-            "PLC": "Price Loss Coverage (PLC)",
-        })
-
-        # Rename column names to make it more uniform
-        base_acres_data.rename(columns={"State Name": "state",
-                                        "Year": "year",
-                                        "Program": "program_description",
-                                        "Enrolled Base": "base_acres"}, inplace=True)
+        with measure_stage("commodities", "load"):
+            base_acres_data = read_csv_cached(self.base_acres_csv_filepath, self.column_dtypes_maps["base_acres"])
+        with measure_stage("commodities", "normalize"):
+            base_acres_data = normalize_categorical_columns(base_acres_data, ["Program"], {
+                "ARC-CO": "Agriculture Risk Coverage County Option (ARC-CO)",
+                "ARCCO": "Agriculture Risk Coverage County Option (ARC-CO)",
+                "PLC": "Price Loss Coverage (PLC)",
+            })
+
+            # Rename column names to make it more uniform
+            base_acres_data.rename(columns={"State Name": "state",
+                                            "Year": "year",
+                                            "Program": "program_description",
+                                            "Enrolled Base": "base_acres"}, inplace=True)
 
         # Filter only relevant years' data
-        base_acres_data = base_acres_data[base_acres_data["year"].between(self.start_year, self.end_year,
-                                                                          inclusive="both")]
+        with measure_stage("commodities", "filter"):
+            base_acres_data = base_acres_data[base_acres_data["year"].between(self.start_year, self.end_year,
+                                                                              inclusive="both")]
 
         # Import farmer count CSV file
-        farm_payee_count_data = pd.read_csv(self.farm_payee_count_csv_filepath)
-        farm_payee_count_data = farm_payee_count_data.replace({
-            "AGRICULTURAL RISK COVERAGE - INDIVIDUAL": "Agriculture Risk Coverage Individual Coverage (ARC-IC)",
-            "AGRICULTURAL RISK COVERAGE PROG - COUNTY": "Agriculture Risk Coverage County Option (ARC-CO)",
-            "AGRICULTURAL RISK COVERAGE -COUNTY PILOT": "Agriculture Risk Coverage County Option (ARC-CO)",
-
-            "PRICE LOSS COVERAGE PROGRAM": "Price Loss Coverage (PLC)",
-
-            "DAIRY MARGIN COVERAGE PROGRAM": "Dairy Margin Coverage Program (DMC)",
-            "DAIRY MARGIN COVERAGE": "Dairy Margin Coverage Program (DMC)",
-            "MARGIN PROTECTION PROGRAM - DAIRY": "Dairy Margin Coverage Program (DMC)",
-            "MARGIN PROTECTION  - DAIRY": "Dairy Margin Coverage Program (DMC)",
-
-            "TREE ASSISTANCE PROGRAM": "Tree Assistance Program (TAP)",
-            "TREE ASSISTANCE PROGRAM - PECAN": "Tree Assistance Program (TAP)",
-
-            "LIVESTOCK FORAGE DISASTER  PROGRAM": "Livestock Forage Disaster Program (LFP)",
-            "LIVESTOCK FORAGE DISASTER PROGRAM": "Livestock Forage Disaster Program (LFP)",
-            "LIVESTOCK FORAGE PROGRAM": "Livestock Forage Disaster Program (LFP)",
-
-            "LIVESTOCK INDEMNITY PROGRAM": "Livestock Indemnity Program (LIP)",
-
-            "EMERGENCY ASSISTANCE LIVESTOCK, HONEYBEE, FISH":
-                "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
-            "EMERG ASSIST LIVESTOCK BEES FISH (ELAP)":
-                "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
-            "\"EMERGENCY ASSISTANCE LIVESTOCK, HONEYBEE, FISH\"":
-                "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
-        })
-
-        # Rename column names to make it more uniform
-        farm_payee_count_data.rename(columns={"State": "state",
-                                              "Year": "year",
-                                              "Program": "program_description",
-                                              "Payee Count": "recipient_count"}, inplace=True)
+        with measure_stage("commodities", "load"):
+            farm_payee_count_data = read_csv_cached(self.farm_payee_count_csv_filepath,
+                                                    self.column_dtypes_maps["farm_payee_count"])
+        with measure_stage("commodities", "normalize"):
+            farm_payee_count_data = normalize_categorical_columns(farm_payee_count_data, ["Program"], {
+                "AGRICULTURAL RISK COVERAGE - INDIVIDUAL": "Agriculture Risk Coverage Individual Coverage (ARC-IC)",
+                "AGRICULTURAL RISK COVERAGE PROG - COUNTY": "Agriculture Risk Coverage County Option (ARC-CO)",
+                "AGRICULTURAL RISK COVERAGE -COUNTY PILOT": "Agriculture Risk Coverage County Option (ARC-CO)",
+
+                "PRICE LOSS COVERAGE PROGRAM": "Price Loss Coverage (PLC)",
+
+                "DAIRY MARGIN COVERAGE PROGRAM": "Dairy Margin Coverage Program (DMC)",
+                "DAIRY MARGIN COVERAGE": "Dairy Margin Coverage Program (DMC)",
+                "MARGIN PROTECTION PROGRAM - DAIRY": "Dairy Margin Coverage Program (DMC)",
+                "MARGIN PROTECTION  - DAIRY": "Dairy Margin Coverage Program (DMC)",
+
+                "TREE ASSISTANCE PROGRAM": "Tree Assistance Program (TAP)",
+                "TREE ASSISTANCE PROGRAM - PECAN": "Tree Assistance Program (TAP)",
+
+                "LIVESTOCK FORAGE DISASTER  PROGRAM": "Livestock Forage Disaster Program (LFP)",
+                "LIVESTOCK FORAGE DISASTER PROGRAM": "Livestock Forage Disaster Program (LFP)",
+                "LIVESTOCK FORAGE PROGRAM": "Livestock Forage Disaster Program (LFP)",
+
+                "LIVESTOCK INDEMNITY PROGRAM": "Livestock Indemnity Program (LIP)",
+
+                "EMERGENCY ASSISTANCE LIVESTOCK, HONEYBEE, FISH":
+                    "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
+                "EMERG ASSIST LIVESTOCK BEES FISH (ELAP)":
+                    "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
+                "\"EMERGENCY ASSISTANCE LIVESTOCK, HONEYBEE, FISH\"":
+                    "Emergency Assistance for Livestock, Honeybees, and Farm-Raised Fish (ELAP)",
+            })
+
+            # Rename column names to make it more uniform
+            farm_payee_count_data.rename(columns={"State": "state",
+                                                  "Year": "year",
+                                                  "Program": "program_description",
+                                                  "Payee Count": "recipient_count"}, inplace=True)
 
         # Filter only relevant years' data
-        farm_payee_count_data = farm_payee_count_data[farm_payee_count_data["year"].between(
-            self.start_year, self.end_year, inclusive="both")]
+        with measure_stage("commodities", "filter"):
+            farm_payee_count_data = farm_payee_count_data[farm_payee_count_data["year"].between(
+                self.start_year, self.end_year, inclusive="both")]
 
         # 1. Generate map data
-        if True:
+        with measure_stage("commodities", "build JSON"):
             # Iterate through all tuples
             for data_tuple, payment in payments_by_program_by_state_for_year.items():
                 year, state_name, program_description = data_tuple
@@ -379,14 +396,16 @@ class CommoditiesDataParser:
 
             # remap state names to abbreviations
             self.processed_data_dict = \
-                self.remap_state_name_to_abbreviation(self.processed_data_dict)
+                self.state_lookup.remap_state_names_to_abbreviations(self.processed_data_dict)
 
-            # Write processed_data_dict as JSON data
-            with open("commodities_map_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(self.processed_data_dict, indent=2))
+        # Write processed_data_dict as JSON data
+        with measure_stage("commodities", "serialize"):
+            output_json = serialize_json(self.processed_data_dict, indent=2)
+        with measure_stage("commodities", "write"):
+            write_serialized_json("commodities_map_data.json", output_json, self.processed_data_dict)
 
         # 2. Generate state distribution data
-        if True:
+        with measure_stage("commodities", "build JSON"):
             total_payments_by_state = commodities_data[
                 ["state", "payments"]].groupby(["state"])["payments"].sum()
 
@@ -412,8 +431,7 @@ class CommoditiesDataParser:
 
             self.state_distribution_data_dict[str(self.start_year) + "-" + str(self.end_year)] = []
 
-            for state in self.us_state_abbreviations:
-                state_name = self.us_state_abbreviations[state]
+            for state, state_name in self.state_lookup.names_by_abbreviation.items():
                 yearly_state_payment = total_payments_by_state[state_name]
 
                 new_data_entry = {
@@ -533,12 +551,15 @@ class CommoditiesDataParser:
                                                                  key=lambda x: x["totalPaymentInPercentageNationwide"],
                                                                  reverse=True)
 
-            # Write processed_data_dict as JSON data
-            with open("commodities_state_distribution_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(self.state_distribution_data_dict, indent=2))
+        # Write processed_data_dict as JSON data
+        with measure_stage("commodities", "serialize"):
+            output_json = serialize_json(self.state_distribution_data_dict, indent=2)
+        with measure_stage("commodities", "write"):
+            write_serialized_json("commodities_state_distribution_data.json", output_json,
+                                  self.state_distribution_data_dict)
 
         # 3. Generate practice categories data for the donut chart
-        if True:
+        with measure_stage("commodities", "build JSON"):
             self.programs_data_dict = {
                 "programs": [
                     {
@@ -605,26 +626,11 @@ class CommoditiesDataParser:
                     total_for_program[program["programName"]] / total_payments_at_national_level * 100, 2)
                 program["subPrograms"].sort(key=lambda x: x["totalPaymentInPercentage"], reverse=True)
 
-            # Write processed_data_dict as JSON data
-            with open("commodities_subprograms_data.json", "w") as output_json_file:
-                output_json_file.write(json.dumps(self.programs_data_dict, indent=2))
-
-    def remap_state_name_to_abbreviation(self, input_dict):
-        # remap state names to abbreviations
-        # Create a copy of the keys to avoid the "dictionary keys changed during iteration" error
-        state_names = list(input_dict.keys())
-
-        # Iterate over the state names
-        for state_name in state_names:
-            # Check if the value of state_name is in the values of the us_state_abbreviation dictionary
-            if state_name in self.us_state_abbreviations.values():
-                # Replace the state_name with the corresponding abbreviation
-                state_abbr = \
-                    [abbr for abbr, name in self.us_state_abbreviations.items() if name == state_name][0]
-                # Create a new entry with the updated key
-                input_dict[state_abbr] = input_dict.pop(state_name)
-
-        return input_dict
+        # Write processed_data_dict as JSON data
+        with measure_stage("commodities", "serialize"):
+            output_json = serialize_json(self.programs_data_dict, indent=2)
+        with measure_stage("commodities", "write"):
+            write_serialized_json("commodities_subprograms_data.json", output_json, self.programs_data_dict)
 
 
 if __name__ == '__main__':
@@ -632,3 +638,5 @@ if __name__ == '__main__':
                                                     "baseacres_commodity_county_program.csv",
                                                     "commodity_payments_counts.csv")
     commodities_data_parser.parse_and_process()
+    emit_report()
+    emit_output_summary()
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = "build_manifest.json"
+
+
+def compute_file_hash(filepath):
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def compute_metadata_hash(metadata):
+    # Sort keys so that the hash does not depend on the order the maps were declared in
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, data_folder):
+        self.data_folder = data_folder
+        self.manifest_filepath = os.path.join(data_folder, MANIFEST_FILENAME)
+        self.entries = dict()
+
+        if os.path.exists(self.manifest_filepath):
+            with open(self.manifest_filepath) as manifest_file:
+                self.entries = json.load(manifest_file)
+
+    def get_build_inputs(self, output_filename):
+        entry = self.entries.get(output_filename)
+        return None if entry is None else entry["inputs"]
+
+    def is_up_to_date(self, output_filenames, build_inputs):
+        for output_filename in output_filenames:
+            entry = self.entries.get(output_filename)
+            if entry is None or entry["inputs"] != build_inputs:
+                return False
+
+            # Rebuild outputs that were deleted or edited by hand since the last run
+            output_filepath = os.path.join(self.data_folder, output_filename)
+            if not os.path.exists(output_filepath) or compute_file_hash(output_filepath) != entry["outputHash"]:
+                return False
+        return True
+
+    def update(self, output_filenames, build_inputs):
+        for output_filename in output_filenames:
+            self.entries[output_filename] = {
+                "inputs": build_inputs,
+                "outputHash": compute_file_hash(os.path.join(self.data_folder, output_filename))
+            }
+
+    def save(self):
+        with open(self.manifest_filepath, "w") as manifest_file:
+            manifest_file.write(json.dumps(self.entries, indent=2, sort_keys=True))
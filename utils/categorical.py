@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+
+def normalize_categorical_columns(data_frame, column_names, value_names_map):
+    # Only the declared categorical columns are normalized, each value is mapped once per distinct value through the
+    # categories of the column instead of once per cell of every column of the frame
+    data_frame = data_frame.copy()
+    for column_name in column_names:
+        if column_name not in data_frame.columns or len(value_names_map) == 0:
+            continue
+
+        column = data_frame[column_name].astype("category")
+        new_category_names = [value_names_map.get(category, category) for category in column.cat.categories]
+
+        # Several values can be mapped to the same name, their categories are merged
+        categories = list(dict.fromkeys(new_category_names))
+        category_codes = {category: code for code, category in enumerate(categories)}
+        new_codes = np.array([category_codes[category] for category in new_category_names] + [-1])
+        column = pd.Categorical.from_codes(new_codes[column.cat.codes], categories=categories)
+
+        # The column goes back to plain values, so that grouping by it only keeps the combinations in the data
+        data_frame[column_name] = pd.Series(column, index=data_frame.index).astype(object)
+    return data_frame
@@ -0,0 +1,22 @@
+import pandas as pd
+
+
+def read_csv_grouped_sums(csv_filepath, group_columns, sum_columns, chunk_size, column_dtypes_map=None,
+                          prepare_chunk=None):
+    # Only the running sums by group are kept between chunks, so memory use depends on the number of groups and the
+    # chunk size instead of the number of rows in the file. Each chunk is normalized and filtered on its own first.
+    grouped_sums = None
+    for chunk in pd.read_csv(csv_filepath, dtype=column_dtypes_map, chunksize=chunk_size):
+        if prepare_chunk is not None:
+            chunk = prepare_chunk(chunk)
+        chunk_sums = chunk.groupby(group_columns)[sum_columns].sum()
+        if grouped_sums is None:
+            grouped_sums = chunk_sums
+        else:
+            grouped_sums = grouped_sums.add(chunk_sums, fill_value=0)
+
+    if grouped_sums is None:
+        return pd.DataFrame(columns=group_columns + sum_columns)
+
+    # One row per group, with the same columns as the file, so that it can be grouped again like the whole file
+    return grouped_sums.sort_index().reset_index()
@@ -0,0 +1,84 @@
+import json
+import math
+
+# Lists of objects that all have the same keys are written as {COLUMNS_KEY: {key: [values]}}, so that every key is
+# written once per list instead of once per object. Float columns whose values all have at most two decimals are
+# written as integers in hundredths, with their scale in SCALES_KEY.
+COLUMNS_KEY = "$columns"
+SCALES_KEY = "$scales"
+HUNDREDTHS_SCALE = 100
+
+# Larger values would lose precision when scaled
+MAX_SCALED_VALUE = 2 ** 53 / HUNDREDTHS_SCALE
+
+
+def encode_columnar(value):
+    if isinstance(value, dict):
+        return {key: encode_columnar(item) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+    if not _is_table(value):
+        return [encode_columnar(item) for item in value]
+
+    columns = dict()
+    scales = dict()
+    for key in value[0]:
+        column = [item[key] for item in value]
+        if _has_hundredths_only(column):
+            columns[key] = [int(round(item * HUNDREDTHS_SCALE)) for item in column]
+            scales[key] = HUNDREDTHS_SCALE
+        else:
+            columns[key] = [encode_columnar(item) for item in column]
+
+    encoded_value = {COLUMNS_KEY: columns}
+    if len(scales) > 0:
+        encoded_value[SCALES_KEY] = scales
+    return encoded_value
+
+
+def decode_columnar(value):
+    if isinstance(value, list):
+        return [decode_columnar(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if COLUMNS_KEY not in value:
+        return {key: decode_columnar(item) for key, item in value.items()}
+
+    columns = value[COLUMNS_KEY]
+    scales = value.get(SCALES_KEY, dict())
+    decoded_columns = dict()
+    for key, column in columns.items():
+        if key in scales:
+            decoded_columns[key] = [item / scales[key] for item in column]
+        else:
+            decoded_columns[key] = [decode_columnar(item) for item in column]
+
+    row_count = len(next(iter(decoded_columns.values())))
+    return [{key: decoded_columns[key][index] for key in decoded_columns} for index in range(row_count)]
+
+
+def read_columnar_json_file(input_filepath):
+    with open(input_filepath) as input_json_file:
+        return decode_columnar(json.load(input_json_file))
+
+
+def _is_table(value):
+    # A single object is smaller as it is
+    if len(value) < 2 or not all(isinstance(item, dict) for item in value):
+        return False
+    keys = list(value[0])
+    return len(keys) > 0 and COLUMNS_KEY not in keys and all(list(item) == keys for item in value)
+
+
+def _has_hundredths_only(column):
+    # Scaled values are decoded as floats, so int columns are left as they are
+    return all(_is_exact_in_hundredths(item) for item in column)
+
+
+def _is_exact_in_hundredths(item):
+    if not isinstance(item, float) or not abs(item) < MAX_SCALED_VALUE:
+        return False
+
+    # The value must come back exactly the same from the scaled integer, -0.0 would come back as 0.0
+    decoded_item = int(round(item * HUNDREDTHS_SCALE)) / HUNDREDTHS_SCALE
+    return decoded_item == item and math.copysign(1.0, decoded_item) == math.copysign(1.0, item)
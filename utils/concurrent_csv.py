@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def load_csv_files_concurrently(load_tasks, load_csv_file):
+    # Runs load_csv_file(*load_task) for every task on its own thread and returns the results in the order of the
+    # tasks. The first item of every task is the path of the CSV file. pandas releases the GIL while it parses a file,
+    # so the reads overlap, which matters most when the data folder is on a network mount.
+    with ThreadPoolExecutor(max_workers=max(len(load_tasks), 1)) as executor:
+        futures = [executor.submit(load_csv_file, *load_task) for load_task in load_tasks]
+
+    # Every task has finished here, the first failing one in task order is reported with the file it was loading
+    results = []
+    for load_task, future in zip(load_tasks, futures):
+        try:
+            results.append(future.result())
+        except Exception as error:
+            raise RuntimeError("Failed to load " + load_task[0] + ": " + str(error)) from error
+    return results
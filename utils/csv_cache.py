@@ -0,0 +1,86 @@
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.build_manifest import compute_file_hash, compute_metadata_hash
+
+# pyarrow is optional, without it every CSV file is parsed as text on each run
+try:
+    import pyarrow  # noqa: F401
+
+    CACHE_ENABLED = True
+except ImportError:
+    CACHE_ENABLED = False
+
+CACHE_FOLDER_NAME = ".csv_cache"
+
+
+def read_csv_cached(csv_filepath, column_dtypes_map=None):
+    if not CACHE_ENABLED:
+        _report_cache_disabled()
+        return pd.read_csv(csv_filepath, dtype=column_dtypes_map)
+
+    cache_folder = os.path.join(os.path.dirname(csv_filepath), CACHE_FOLDER_NAME)
+    cache_filepath = os.path.join(cache_folder, os.path.basename(csv_filepath) + ".feather")
+    cache_info_filepath = os.path.join(cache_folder, os.path.basename(csv_filepath) + ".json")
+
+    source_stat = os.stat(csv_filepath)
+    schema_hash = compute_metadata_hash(column_dtypes_map)
+
+    cache_info = None
+    if os.path.exists(cache_filepath) and os.path.exists(cache_info_filepath):
+        with open(cache_info_filepath) as cache_info_file:
+            cache_info = json.load(cache_info_file)
+
+    if cache_info is not None and cache_info["schema"] == schema_hash:
+        if cache_info["mtime"] == source_stat.st_mtime_ns and cache_info["size"] == source_stat.st_size:
+            return _read_cache_file(cache_filepath)
+
+        # The file was touched or copied but its content may still be the same, in that case only refresh the mtime
+        source_hash = compute_file_hash(csv_filepath)
+        if cache_info["hash"] == source_hash:
+            cache_info["mtime"] = source_stat.st_mtime_ns
+            _write_cache_info(cache_info_filepath, cache_info)
+            return _read_cache_file(cache_filepath)
+    else:
+        source_hash = compute_file_hash(csv_filepath)
+
+    data = pd.read_csv(csv_filepath, dtype=column_dtypes_map)
+
+    # Write to temporary files first so that a parser reading the cache never sees a partially written file
+    os.makedirs(cache_folder, exist_ok=True)
+    data.to_feather(cache_filepath + ".tmp")
+    os.replace(cache_filepath + ".tmp", cache_filepath)
+    _write_cache_info(cache_info_filepath, {
+        "mtime": source_stat.st_mtime_ns,
+        "size": source_stat.st_size,
+        "hash": source_hash,
+        "schema": schema_hash
+    })
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def _report_cache_disabled():
+    # Cached, so that it is only printed once per process
+    print("pyarrow is not installed, CSV files are parsed without the Feather cache (pip install -r requirements.txt)",
+          file=sys.stderr)
+
+
+def _read_cache_file(cache_filepath):
+    data = pd.read_feather(cache_filepath)
+
+    # Arrow returns missing text values as None, read_csv returns them as NaN
+    for column_name in data.columns[data.dtypes == object]:
+        data[column_name] = data[column_name].fillna(np.nan)
+    return data
+
+
+def _write_cache_info(cache_info_filepath, cache_info):
+    with open(cache_info_filepath + ".tmp", "w") as cache_info_file:
+        cache_info_file.write(json.dumps(cache_info, indent=2))
+    os.replace(cache_info_filepath + ".tmp", cache_info_filepath)
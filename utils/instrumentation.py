@@ -0,0 +1,103 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Instrumentation is off unless enabled in the process running the parsers, main.py --instrument enables it from the
+# settings of every parser job. The report file is optional, otherwise only a table is printed to stderr.
+instrumentation_settings = {
+    "enabled": False,
+    "report_filepath": None
+}
+
+stage_records = []
+open_stages = []
+
+
+def is_enabled():
+    return instrumentation_settings["enabled"]
+
+
+def configure(enabled, report_filepath=None):
+    instrumentation_settings["enabled"] = enabled
+    instrumentation_settings["report_filepath"] = report_filepath
+
+
+@contextmanager
+def measure_stage(parser_name, stage_name):
+    if not is_enabled():
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    # The tracemalloc peak is global, so it is reset for every stage and an enclosing stage keeps the highest peak of
+    # the stages nested in it
+    start_memory, enclosing_peak_memory = tracemalloc.get_traced_memory()
+    open_stages.append({"enclosingPeakMemory": enclosing_peak_memory, "nestedPeakMemory": 0})
+    tracemalloc.reset_peak()
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - start_wall_time
+        cpu_time = time.process_time() - start_cpu_time
+        open_stage = open_stages.pop()
+        peak_memory = max(tracemalloc.get_traced_memory()[1], open_stage["nestedPeakMemory"])
+        if open_stages:
+            open_stages[-1]["nestedPeakMemory"] = max(open_stages[-1]["nestedPeakMemory"], peak_memory)
+
+        stage_records.append({
+            "parser": parser_name,
+            "stage": stage_name,
+            "wallTimeSeconds": round(wall_time, 6),
+            "cpuTimeSeconds": round(cpu_time, 6),
+            "peakMemoryBytes": max(peak_memory - start_memory, 0)
+        })
+
+        # Let an enclosing stage see the peak from before this stage was entered
+        if open_stages:
+            open_stages[-1]["nestedPeakMemory"] = max(open_stages[-1]["nestedPeakMemory"],
+                                                      open_stage["enclosingPeakMemory"])
+
+
+def pop_stage_records():
+    records = list(stage_records)
+    stage_records.clear()
+    return records
+
+
+def summarize_stage_records(records):
+    # Stages that run several times in a parser, e.g. one write per output file, are added up
+    summary = dict()
+    for record in records:
+        key = (record.get("job", record["parser"]), record["stage"])
+        if key not in summary:
+            summary[key] = {"calls": 0, "wallTimeSeconds": 0.0, "cpuTimeSeconds": 0.0, "peakMemoryBytes": 0}
+        summary[key]["calls"] += 1
+        summary[key]["wallTimeSeconds"] += record["wallTimeSeconds"]
+        summary[key]["cpuTimeSeconds"] += record["cpuTimeSeconds"]
+        summary[key]["peakMemoryBytes"] = max(summary[key]["peakMemoryBytes"], record["peakMemoryBytes"])
+    return summary
+
+
+def emit_report(records=None):
+    if not is_enabled():
+        return
+    if records is None:
+        records = pop_stage_records()
+
+    print("{:<24} {:<20} {:>6} {:>10} {:>10} {:>12}".format("Parser", "Stage", "Calls", "Wall (s)", "CPU (s)",
+                                                            "Peak (MB)"), file=sys.stderr)
+    for (parser_name, stage_name), stage_summary in summarize_stage_records(records).items():
+        print("{:<24} {:<20} {:>6} {:>10.3f} {:>10.3f} {:>12.2f}".format(
+            parser_name, stage_name, stage_summary["calls"], stage_summary["wallTimeSeconds"],
+            stage_summary["cpuTimeSeconds"], stage_summary["peakMemoryBytes"] / 1024 / 1024), file=sys.stderr)
+
+    report_filepath = instrumentation_settings["report_filepath"]
+    if report_filepath:
+        with open(report_filepath, "w") as report_file:
+            report_file.write(json.dumps({"stages": records}, indent=2))
@@ -0,0 +1,341 @@
+import gzip
+import json
+import os
+import re
+import shutil
+from contextlib import contextmanager
+
+from utils.columnar_json import encode_columnar
+
+# brotli is optional, it is only needed for the brotli sidecar files
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# orjson is optional, it is only needed for the orjson encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# msgpack is optional, it is only needed for the MessagePack copies
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# The json encoder writes the same bytes as json.dumps, orjson is faster but writes NaN as null, non-ASCII characters
+# unescaped and some floats in another notation (1e16 instead of 1e+16)
+JSON_ENCODERS = ["json", "orjson"]
+
+COLUMNAR_JSON_EXTENSION = ".columnar.json"
+MSGPACK_EXTENSION = ".msgpack"
+
+# Settings of the process writing the outputs, set with configure_outputs by the scripts and, from the settings of
+# their job, by the main.py parser jobs: the encoder, and whether a compact columnar copy and a MessagePack copy (for
+# binary consumers) of every output are also written
+output_settings = {
+    "json_encoder": "json",
+    "columnar_copies": False,
+    "msgpack_copies": False
+}
+
+# orjson only indents by two spaces, its indentation is widened for other indents
+INDENTATION_PATTERN = re.compile(r"^( +)", re.MULTILINE)
+
+# Outputs are written to a temporary file next to them first, which only replaces the output when their bytes differ,
+# so that unchanged outputs keep their modification time. Outputs whose bytes differ but that hold the same JSON
+# document, e.g. after switching to --compact or another encoder, are replaced and reported as reformatted.
+TEMPORARY_EXTENSION = ".tmp"
+OUTPUT_STATUSES = ["changed", "reformatted", "unchanged", "new"]
+COMPARISON_CHUNK_SIZE = 1024 * 1024
+
+output_records = []
+
+SIDECAR_EXTENSIONS = {
+    "gzip": ".gz",
+    "brotli": ".br"
+}
+
+
+class StreamingJsonWriter:
+    # Writes the same bytes as json.dumps(value, indent=indent), but only serializes one value below stream_depth at a
+    # time, so the whole document is never held in memory as a single string
+    def __init__(self, output_file, indent=None, compact=False):
+        self.output_file = output_file
+        self.compact = compact
+        self.indent = None if compact else indent
+        if compact:
+            self.item_separator, self.key_separator = ",", ":"
+        elif indent is not None:
+            self.item_separator, self.key_separator = ",", ": "
+        else:
+            self.item_separator, self.key_separator = ", ", ": "
+
+    def write(self, value, stream_depth=0, level=0):
+        if stream_depth <= 0 or not isinstance(value, (dict, list)) or len(value) == 0:
+            self.output_file.write(self.__dumps(value, level))
+            return
+
+        if isinstance(value, dict):
+            opening_bracket, closing_bracket, items = "{", "}", value.items()
+        else:
+            opening_bracket, closing_bracket, items = "[", "]", ((None, item) for item in value)
+
+        self.output_file.write(opening_bracket)
+        for index, (key, item) in enumerate(items):
+            if index > 0:
+                self.output_file.write(self.item_separator)
+            self.output_file.write(self.__newline(level + 1))
+            if key is not None:
+                self.output_file.write(json.dumps(str(key)) + self.key_separator)
+            self.write(item, stream_depth - 1, level + 1)
+        self.output_file.write(self.__newline(level) + closing_bracket)
+
+    def __dumps(self, value, level):
+        if self.indent is None:
+            return serialize_json(value, compact=self.compact)
+
+        # Nested values are dumped on their own, so shift every line after the first to the current depth
+        return serialize_json(value, indent=self.indent).replace("\n", "\n" + " " * (self.indent * level))
+
+    def __newline(self, level):
+        if self.indent is None:
+            return ""
+        return "\n" + " " * (self.indent * level)
+
+
+def configure_outputs(json_encoder="json", columnar_copies=False, msgpack_copies=False):
+    # An unusable encoder or missing msgpack fails here already, before any output is written
+    if json_encoder not in JSON_ENCODERS:
+        raise ValueError("Unknown JSON encoder: " + json_encoder + " (choose from " + ", ".join(JSON_ENCODERS) + ")")
+    if json_encoder == "orjson" and orjson is None:
+        raise ImportError("orjson must be installed to use the orjson JSON encoder")
+    if msgpack_copies and msgpack is None:
+        raise ImportError("msgpack must be installed to write MessagePack copies")
+
+    output_settings["json_encoder"] = json_encoder
+    output_settings["columnar_copies"] = columnar_copies
+    output_settings["msgpack_copies"] = msgpack_copies
+
+
+def get_json_encoder():
+    return output_settings["json_encoder"]
+
+
+def add_output_arguments(argument_parser):
+    # The output options of main.py and of the CSP and EQIP scripts. No defaults are given, so that a parser created
+    # with argument_default=argparse.SUPPRESS does not reset options given before a subcommand.
+    argument_parser.add_argument("--compact", action="store_true",
+                                 help="write the CSP and EQIP map data without indentation")
+    argument_parser.add_argument("--sidecar", action="append", choices=list(SIDECAR_EXTENSIONS),
+                                 help="also write a compressed copy of the CSP and EQIP map data (can be repeated)")
+    argument_parser.add_argument("--columnar", action="store_true",
+                                 help="also write a compact columnar copy of every output")
+    argument_parser.add_argument("--msgpack", action="store_true",
+                                 help="also write a MessagePack copy of every output (requires msgpack)")
+    argument_parser.add_argument("--json-encoder", choices=JSON_ENCODERS,
+                                 help="serialize the outputs with this encoder (default: json, orjson requires orjson "
+                                      "and is faster but not byte compatible)")
+
+
+def apply_output_arguments(arguments, argument_parser):
+    # Applies the output options to the outputs written by this process, a missing orjson or msgpack is reported as a
+    # usage error before any parser runs
+    try:
+        configure_outputs(arguments.json_encoder or "json", arguments.columnar, arguments.msgpack)
+    except ImportError as error:
+        argument_parser.error(str(error))
+
+
+def _to_serializable(value):
+    # NumPy scalars and arrays are written as the Python values they hold. NumPy is only imported once such a value
+    # is met, so that the command line starts without it.
+    import numpy as np
+
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("Object of type " + type(value).__name__ + " is not JSON serializable")
+
+
+def serialize_json(value, indent=None, compact=False):
+    # Returns the same text as json.dumps(value, indent=indent), or with separators=(",", ":") when compact
+    if get_json_encoder() == "orjson" and (compact or indent is not None):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if compact:
+            return orjson.dumps(value, default=_to_serializable, option=options).decode("utf-8")
+
+        output_json = orjson.dumps(value, default=_to_serializable,
+                                   option=options | orjson.OPT_INDENT_2).decode("utf-8")
+        if indent != 2:
+            output_json = INDENTATION_PATTERN.sub(lambda match: " " * (len(match.group(1)) // 2 * indent), output_json)
+        return output_json
+
+    if compact:
+        return json.dumps(value, separators=(",", ":"), default=_to_serializable)
+    return json.dumps(value, indent=indent, default=_to_serializable)
+
+
+@contextmanager
+def open_output_file(output_filepath, mode="w"):
+    # Opens the temporary file of an output, which replaces the output on success if their contents differ
+    temporary_filepath = output_filepath + TEMPORARY_EXTENSION
+    try:
+        with open(temporary_filepath, mode) as output_file:
+            yield output_file
+        replace_if_changed(temporary_filepath, output_filepath)
+    finally:
+        if os.path.exists(temporary_filepath):
+            os.remove(temporary_filepath)
+
+
+def replace_if_changed(temporary_filepath, output_filepath):
+    if not os.path.exists(output_filepath):
+        status = "new"
+    elif _has_same_bytes(temporary_filepath, output_filepath):
+        status = "unchanged"
+    elif _is_same_json(temporary_filepath, output_filepath):
+        status = "reformatted"
+    else:
+        status = "changed"
+
+    if status == "unchanged":
+        os.remove(temporary_filepath)
+    else:
+        os.replace(temporary_filepath, output_filepath)
+    output_records.append({"output": output_filepath, "status": status})
+    return status
+
+
+def _has_same_bytes(first_filepath, second_filepath):
+    # filecmp.cmp is not used, its cache could return the result of an earlier temporary file with the same size and
+    # modification time
+    if os.path.getsize(first_filepath) != os.path.getsize(second_filepath):
+        return False
+    with open(first_filepath, "rb") as first_file, open(second_filepath, "rb") as second_file:
+        while True:
+            first_chunk = first_file.read(COMPARISON_CHUNK_SIZE)
+            if first_chunk != second_file.read(COMPARISON_CHUNK_SIZE):
+                return False
+            if first_chunk == b"":
+                return True
+
+
+def _is_same_json(temporary_filepath, output_filepath):
+    # Only used to report the output, e.g. when only the indentation or the encoder's number notation changed. Key
+    # order is kept, the outputs are ordered for the dashboard.
+    if not output_filepath.endswith(".json"):
+        return False
+    try:
+        return _read_canonical_json(temporary_filepath) == _read_canonical_json(output_filepath)
+    except ValueError:
+        return False
+
+
+def _read_canonical_json(input_filepath):
+    with open(input_filepath) as input_json_file:
+        return json.dumps(json.load(input_json_file), separators=(",", ":"))
+
+
+def pop_output_records():
+    records = list(output_records)
+    output_records.clear()
+    return records
+
+
+def emit_output_summary(records=None):
+    # Prints how many outputs had each status, and which ones were written
+    if records is None:
+        records = pop_output_records()
+
+    print("Outputs: " + ", ".join(str(sum(record["status"] == status for record in records)) + " " + status
+                                  for status in OUTPUT_STATUSES))
+    for record in records:
+        if record["status"] != "unchanged":
+            print("{:<10} {}".format(record["status"], os.path.relpath(record["output"])))
+
+
+def write_serialized_json(output_filepath, output_json, value, sidecar_compressions=()):
+    # Writes an output serialized by serialize_json, its copies are written from the value it was serialized from
+    with open_output_file(output_filepath) as output_json_file:
+        output_json_file.write(output_json)
+
+    write_output_copies(output_filepath, value, sidecar_compressions)
+
+
+def is_columnar_copies_enabled():
+    return output_settings["columnar_copies"]
+
+
+def get_columnar_filepath(output_filepath):
+    return os.path.splitext(output_filepath)[0] + COLUMNAR_JSON_EXTENSION
+
+
+def write_columnar_copy(output_filepath, value, sidecar_compressions=()):
+    # Written next to the nested output, without indentation, and read back with columnar_json.decode_columnar
+    if not is_columnar_copies_enabled():
+        return
+
+    columnar_filepath = get_columnar_filepath(output_filepath)
+    with open_output_file(columnar_filepath) as output_json_file:
+        output_json_file.write(serialize_json(encode_columnar(value), compact=True))
+
+    for compression in sidecar_compressions:
+        write_compressed_sidecar(columnar_filepath, compression)
+
+
+def is_msgpack_copies_enabled():
+    return output_settings["msgpack_copies"]
+
+
+def get_msgpack_filepath(output_filepath):
+    return os.path.splitext(output_filepath)[0] + MSGPACK_EXTENSION
+
+
+def write_msgpack_copy(output_filepath, value):
+    # Written next to the output with the same nested layout, NumPy values are packed as the Python values they hold
+    if not is_msgpack_copies_enabled():
+        return
+
+    msgpack_filepath = get_msgpack_filepath(output_filepath)
+    if msgpack is None:
+        raise ImportError("msgpack must be installed to write " + msgpack_filepath)
+    with open_output_file(msgpack_filepath, "wb") as output_msgpack_file:
+        output_msgpack_file.write(msgpack.packb(value, default=_to_serializable))
+
+
+def write_output_copies(output_filepath, value, sidecar_compressions=()):
+    write_columnar_copy(output_filepath, value, sidecar_compressions)
+    write_msgpack_copy(output_filepath, value)
+
+
+def write_json_file(output_filepath, value, indent=None, compact=False, stream_depth=0, sidecar_compressions=()):
+    with open_output_file(output_filepath) as output_json_file:
+        StreamingJsonWriter(output_json_file, indent, compact).write(value, stream_depth)
+
+    for compression in sidecar_compressions:
+        write_compressed_sidecar(output_filepath, compression)
+
+    write_output_copies(output_filepath, value, sidecar_compressions)
+
+
+def write_compressed_sidecar(filepath, compression):
+    sidecar_filepath = filepath + SIDECAR_EXTENSIONS[compression]
+    with open(filepath, "rb") as input_file:
+        if compression == "gzip":
+            # mtime is fixed so that unchanged data produces an unchanged sidecar, the name stored in the header is the
+            # one of the sidecar, not of its temporary file
+            with open_output_file(sidecar_filepath, "wb") as sidecar_file, \
+                    gzip.GzipFile(sidecar_filepath, "wb", compresslevel=9, fileobj=sidecar_file, mtime=0) as gzip_file:
+                shutil.copyfileobj(input_file, gzip_file)
+        else:
+            if brotli is None:
+                raise ImportError("brotli must be installed to write " + sidecar_filepath)
+            compressor = brotli.Compressor()
+            with open_output_file(sidecar_filepath, "wb") as sidecar_file:
+                for chunk in iter(lambda: input_file.read(1024 * 1024), b""):
+                    sidecar_file.write(compressor.process(chunk))
+                sidecar_file.write(compressor.finish())
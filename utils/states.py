@@ -0,0 +1,112 @@
+import math
+
+# Abbreviation, name and FIPS code of every state, in the order the parsers list them in their outputs
+US_STATES = [
+    ("AL", "Alabama", "01"),
+    ("AK", "Alaska", "02"),
+    ("AZ", "Arizona", "04"),
+    ("AR", "Arkansas", "05"),
+    ("CA", "California", "06"),
+    ("CO", "Colorado", "08"),
+    ("CT", "Connecticut", "09"),
+    ("DE", "Delaware", "10"),
+    ("FL", "Florida", "12"),
+    ("GA", "Georgia", "13"),
+    ("HI", "Hawaii", "15"),
+    ("ID", "Idaho", "16"),
+    ("IL", "Illinois", "17"),
+    ("IN", "Indiana", "18"),
+    ("IA", "Iowa", "19"),
+    ("KS", "Kansas", "20"),
+    ("KY", "Kentucky", "21"),
+    ("LA", "Louisiana", "22"),
+    ("ME", "Maine", "23"),
+    ("MD", "Maryland", "24"),
+    ("MA", "Massachusetts", "25"),
+    ("MI", "Michigan", "26"),
+    ("MN", "Minnesota", "27"),
+    ("MS", "Mississippi", "28"),
+    ("MO", "Missouri", "29"),
+    ("MT", "Montana", "30"),
+    ("NE", "Nebraska", "31"),
+    ("NV", "Nevada", "32"),
+    ("NH", "New Hampshire", "33"),
+    ("NJ", "New Jersey", "34"),
+    ("NM", "New Mexico", "35"),
+    ("NY", "New York", "36"),
+    ("NC", "North Carolina", "37"),
+    ("ND", "North Dakota", "38"),
+    ("OH", "Ohio", "39"),
+    ("OK", "Oklahoma", "40"),
+    ("OR", "Oregon", "41"),
+    ("PA", "Pennsylvania", "42"),
+    ("RI", "Rhode Island", "44"),
+    ("SC", "South Carolina", "45"),
+    ("SD", "South Dakota", "46"),
+    ("TN", "Tennessee", "47"),
+    ("TX", "Texas", "48"),
+    ("UT", "Utah", "49"),
+    ("VT", "Vermont", "50"),
+    ("VA", "Virginia", "51"),
+    ("WA", "Washington", "53"),
+    ("WV", "West Virginia", "54"),
+    ("WI", "Wisconsin", "55"),
+    ("WY", "Wyoming", "56")
+]
+
+# Territories and other areas that some of the data sources report next to the states, those without a FIPS code
+# have None
+US_TERRITORIES = [
+    ("DC", "District of Columbia", "11"),
+    ("AS", "American Samoa", "60"),
+    ("MP", "Northern Mariana Islands", "69"),
+    ("PW", "Palau", "70"),
+    ("PR", "Puerto Rico", "72"),
+    ("VI", "Virgin Islands of the U.S.", "78"),
+    ("PB", "Pacific Basin", None),
+    ("AA", "Armed Forces Americas (Except Canada)", None),
+    ("AE", "Armed Forces Africa/Canada/Europe/Middle East", None),
+    ("AP", "Armed Forces Pacific", None)
+]
+
+US_STATE_ABBREVIATIONS = [abbreviation for abbreviation, name, fips_code in US_STATES]
+
+
+class StateLookup:
+    def __init__(self, abbreviations=None):
+        # Only the given states and territories are looked up, in the given order, by default the 50 states
+        if abbreviations is None:
+            abbreviations = US_STATE_ABBREVIATIONS
+        entries = {abbreviation: (name, fips_code) for abbreviation, name, fips_code in US_STATES + US_TERRITORIES}
+
+        self.names_by_abbreviation = {abbreviation: entries[abbreviation][0] for abbreviation in abbreviations}
+        self.abbreviations_by_name = {name: abbreviation for abbreviation, name in self.names_by_abbreviation.items()}
+        self.fips_codes_by_abbreviation = {abbreviation: entries[abbreviation][1] for abbreviation in abbreviations
+                                           if entries[abbreviation][1] is not None}
+        self.abbreviations_by_fips_code = {fips_code: abbreviation for abbreviation, fips_code in
+                                           self.fips_codes_by_abbreviation.items()}
+
+    def get_abbreviation(self, state_name):
+        return self.abbreviations_by_name[state_name]
+
+    def get_name(self, state_abbreviation):
+        return self.names_by_abbreviation[state_abbreviation]
+
+    def get_fips_code(self, state_abbreviation):
+        return self.fips_codes_by_abbreviation[state_abbreviation]
+
+    def get_abbreviation_by_fips_code(self, fips_code):
+        # A missing code, e.g. an empty cell read as NaN, has no state
+        if fips_code is None or (isinstance(fips_code, float) and math.isnan(fips_code)):
+            return None
+        # FIPS codes may come in as numbers from the CSV files, e.g. 1 or 1.0 for "01"
+        if not isinstance(fips_code, str):
+            fips_code = str(int(fips_code))
+        return self.abbreviations_by_fips_code[fips_code.zfill(2)]
+
+    def remap_state_names_to_abbreviations(self, input_dict):
+        # Keys that are not state names are kept as they are, remapped keys are moved to the end of the dictionary
+        for state_name in list(input_dict.keys()):
+            if state_name in self.abbreviations_by_name:
+                input_dict[self.abbreviations_by_name[state_name]] = input_dict.pop(state_name)
+        return input_dict
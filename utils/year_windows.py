@@ -0,0 +1,85 @@
+def get_year_window_key(start_year, end_year):
+    return str(start_year) + "-" + str(end_year)
+
+
+def check_year_window_in_data(start_year, end_year, data_years, data_name="the data"):
+    # Fails with the years that are missing instead of a KeyError, or of silently empty totals, deep in a parser
+    data_years = set(data_years)
+    missing_years = [year for year in range(start_year, end_year + 1) if year not in data_years]
+    if len(missing_years) > 0:
+        covered_years = get_year_window_key(min(data_years), max(data_years)) if len(data_years) > 0 else "no years"
+        raise ValueError("The year window " + get_year_window_key(start_year, end_year) + " is not covered by " +
+                         data_name + ", which has no data for " + ", ".join(str(year) for year in missing_years) +
+                         " (it covers " + covered_years + ")")
+
+
+def get_program_years(column_names, program_names):
+    # Years that have a "<program> <year>" column for every program, as in the all programs files
+    program_years = None
+    for program_name in program_names:
+        years = set(int(column_name[len(program_name) + 1:]) for column_name in column_names
+                    if column_name.startswith(program_name + " ") and column_name[len(program_name) + 1:].isdigit())
+        program_years = years if program_years is None else program_years & years
+    return program_years or set()
+
+
+def parse_year_windows(year_windows_text, start_year, end_year):
+    # Extra year windows computed by a parser along with its own start to end year window, from a comma separated list
+    # of START-END windows or of window lengths for rolling windows, e.g. 2014-2018,5
+    year_windows = []
+    for year_window_text in year_windows_text.split(","):
+        year_window_text = year_window_text.strip()
+        if year_window_text == "":
+            continue
+        if "-" in year_window_text:
+            window_start_year, window_end_year = year_window_text.split("-")
+            year_windows.append((int(window_start_year), int(window_end_year)))
+        else:
+            # Rolling windows of this many years within the start and end years
+            window_length = int(year_window_text)
+            year_windows.extend([(year, year + window_length - 1)
+                                 for year in range(start_year, end_year - window_length + 2)])
+
+    for window_start_year, window_end_year in year_windows:
+        if window_start_year > window_end_year:
+            raise ValueError("Invalid year window: " + get_year_window_key(window_start_year, window_end_year))
+    return year_windows
+
+
+def get_year_windows(start_year, end_year, year_windows=None):
+    # The parser's own window comes first, outputs that are not keyed by years are only generated for it
+    all_year_windows = [(start_year, end_year)]
+    for year_window in year_windows or []:
+        if tuple(year_window) not in all_year_windows:
+            all_year_windows.append(tuple(year_window))
+    return all_year_windows
+
+
+class YearlySums:
+    def __init__(self, data, year_column, group_columns, value_columns):
+        # Every value is summed by year and group once, each year window is then aggregated from these yearly sums
+        # instead of the rows of the data. Groups keep the order of the data so that the yearly sums of data that
+        # already has one row per year and group are the rows of the data, in the same order.
+        self.year_column = year_column
+        self.value_columns = value_columns
+        self.data = data.groupby([year_column] + group_columns, sort=False, as_index=False,
+                                 dropna=False)[value_columns].sum()
+        self.years = set(self.data[year_column].unique().tolist())
+
+        # Window totals by (start year, end year, group columns), computed once and shared by every output
+        self.window_totals_map = dict()
+
+    def get_window_data(self, start_year, end_year):
+        check_year_window_in_data(start_year, end_year, self.years)
+        return self.data[self.data[self.year_column].between(start_year, end_year, inclusive="both")]
+
+    def get_window_totals(self, start_year, end_year, group_columns=()):
+        # Roll up the yearly sums of a year window to the given groups, or to one total per value without groups
+        key = (start_year, end_year, tuple(group_columns))
+        if key not in self.window_totals_map:
+            window_data = self.get_window_data(start_year, end_year)
+            if len(group_columns) == 0:
+                self.window_totals_map[key] = window_data[self.value_columns].sum()
+            else:
+                self.window_totals_map[key] = window_data.groupby(list(group_columns))[self.value_columns].sum()
+        return self.window_totals_map[key]